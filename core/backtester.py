@@ -0,0 +1,362 @@
+import logging
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from utils.calculator import share_weights_array
+
+logger = logging.getLogger(__name__)
+
+# Размер первого окна поиска пересечения уровня; дальше окно удваивается
+SCAN_WINDOW = 256
+
+
+@dataclass
+class Candles:
+    """Свечи OHLC в виде массивов NumPy (open_time в мс)"""
+    open_time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    @property
+    def interval_sec(self) -> float:
+        if len(self.open_time) < 2:
+            return 60.0
+        return float(np.median(np.diff(self.open_time))) / 1000
+
+
+def load_candles(path: str) -> Candles:
+    """
+    Загружает свечи из CSV (формат выгрузки Binance klines, с заголовком или без)
+    или Parquet (колонки open_time, open, high, low, close).
+    """
+    if path.endswith('.parquet'):
+        import pandas as pd
+        frame = pd.read_parquet(path, columns=['open_time', 'open', 'high', 'low', 'close'])
+        data = frame.to_numpy(dtype=np.float64)
+    else:
+        with open(path, encoding='utf-8') as f:
+            first = f.readline().split(',')[0]
+        try:
+            float(first)
+            skip = 0
+        except ValueError:
+            skip = 1
+        data = np.loadtxt(path, delimiter=',', usecols=(0, 1, 2, 3, 4), skiprows=skip, ndmin=2)
+
+    open_time = data[:, 0].astype(np.int64)
+    # В новых выгрузках Binance время в микросекундах
+    if len(open_time) and open_time[0] > 10 ** 14:
+        open_time = open_time // 1000
+    return Candles(
+        open_time=open_time,
+        open=np.ascontiguousarray(data[:, 1]),
+        high=np.ascontiguousarray(data[:, 2]),
+        low=np.ascontiguousarray(data[:, 3]),
+        close=np.ascontiguousarray(data[:, 4])
+    )
+
+
+@dataclass
+class BacktestConfig:
+    deposit: float = 10000.0
+    deposit_percent: float = 99.99
+    dca_count: int = 3
+    dca_step_percent: float = 2.8
+    martingale_coef: float = 1.0
+    # (процент профита, процент объема позиции) для каждого TP
+    tp_levels: Tuple[Tuple[float, float], ...] = ((1.9, 33), (3.4, 33), (4.9, 33))
+    commission_rate: float = 0.0015
+    # Пауза между циклами в свечах
+    cycle_pause: int = 0
+
+    @classmethod
+    def from_settings(cls, settings: dict, deposit: float = 10000.0) -> 'BacktestConfig':
+        """Конфигурация из настроек стратегии в формате GUI/OrderManager"""
+        return cls(
+            deposit=deposit,
+            deposit_percent=float(settings.get('deposit_percent', 99.99)),
+            dca_count=int(settings.get('dca_count', 3)),
+            dca_step_percent=float(settings.get('dca_step_percent', 2.8)),
+            martingale_coef=float(settings.get('martingale_coef', 1)),
+            tp_levels=tuple(
+                (float(settings.get(f'tp{i}_percent', default_percent)), float(settings.get(f'tp{i}_volume', 33)))
+                for i, default_percent in enumerate((1.9, 3.4, 4.9), 1)
+            )
+        )
+
+    def to_settings(self) -> dict:
+        """Параметры стратегии в формате настроек (обратное from_settings, без депозита)"""
+        settings = {
+            'deposit_percent': self.deposit_percent,
+            'dca_count': self.dca_count,
+            'dca_step_percent': self.dca_step_percent,
+            'martingale_coef': self.martingale_coef,
+        }
+        for i, (percent, volume) in enumerate(self.tp_levels, 1):
+            settings[f'tp{i}_percent'] = percent
+            settings[f'tp{i}_volume'] = volume
+        return settings
+
+
+@dataclass
+class CycleResult:
+    start_index: int
+    end_index: int
+    start_time: int
+    end_time: int
+    duration_sec: float
+    pnl: float
+    dca_filled: int
+    max_cost: float
+    closed: bool
+
+
+@dataclass
+class BacktestResult:
+    final_equity: float
+    total_pnl: float
+    total_return_percent: float
+    max_drawdown_percent: float
+    fees: float
+    cycles: List[CycleResult] = field(default_factory=list)
+    equity: Optional[np.ndarray] = None
+    # Доля времени с открытой позицией и средняя/максимальная стоимость позиции
+    exposure_time: float = 0.0
+    avg_position_value: float = 0.0
+    max_position_value: float = 0.0
+
+    @property
+    def completed_cycles(self) -> int:
+        return sum(1 for c in self.cycles if c.closed)
+
+    @property
+    def win_rate(self) -> float:
+        closed = [c for c in self.cycles if c.closed]
+        return sum(1 for c in closed if c.pnl > 0) / len(closed) if closed else 0.0
+
+    @property
+    def avg_cycle_duration(self) -> float:
+        closed = [c.duration_sec for c in self.cycles if c.closed]
+        return float(np.mean(closed)) if closed else 0.0
+
+    @property
+    def max_cycle_duration(self) -> float:
+        return max((c.duration_sec for c in self.cycles), default=0.0)
+
+    def summary(self) -> dict:
+        return {
+            'final_equity': self.final_equity,
+            'total_pnl': self.total_pnl,
+            'total_return_percent': self.total_return_percent,
+            'max_drawdown_percent': self.max_drawdown_percent,
+            'fees': self.fees,
+            'cycles': len(self.cycles),
+            'completed_cycles': self.completed_cycles,
+            'win_rate': self.win_rate,
+            'avg_cycle_duration': self.avg_cycle_duration,
+            'max_cycle_duration': self.max_cycle_duration,
+            'exposure_time': self.exposure_time,
+            'avg_position_value': self.avg_position_value,
+            'max_position_value': self.max_position_value,
+        }
+
+
+def _first_at_or_below(values: np.ndarray, start: int, level: float) -> int:
+    """Первый индекс >= start, где values <= level, или -1"""
+    end = len(values)
+    size = SCAN_WINDOW
+    while start < end:
+        stop = min(start + size, end)
+        mask = values[start:stop] <= level
+        idx = int(mask.argmax())
+        if mask[idx]:
+            return start + idx
+        start = stop
+        size *= 2
+    return -1
+
+
+def _first_at_or_above(values: np.ndarray, start: int, level: float) -> int:
+    """Первый индекс >= start, где values >= level, или -1"""
+    end = len(values)
+    size = SCAN_WINDOW
+    while start < end:
+        stop = min(start + size, end)
+        mask = values[start:stop] >= level
+        idx = int(mask.argmax())
+        if mask[idx]:
+            return start + idx
+        start = stop
+        size *= 2
+    return -1
+
+
+def entry_shares(total_deposit: float, dca_count: int, martingale_coef: float, commission_rate: float) -> np.ndarray:
+    """Доли входа как в utils.calculator.split_deposit, в float64"""
+    return total_deposit * (1 - commission_rate) * share_weights_array(dca_count, martingale_coef)
+
+
+class Backtester:
+    """
+    Бэктест цикла OrderManager (OrderManager.step) на свечах.
+
+    Цикл: рыночный вход по open свечи, лестница DCA ниже цены входа, лестница TP
+    от средней цены. После исполнения DCA лестница TP пересобирается на новую
+    позицию (как _cancel_tp_orders + _create_tp_orders). Последний TP закрывает
+    остаток позиции, после чего начинается новый цикл.
+
+    Исполнения ищутся векторно по массивам low/high: Python-цикл идет по
+    событиям (входы, DCA, TP), а не по свечам. Если в одной свече задеты и DCA,
+    и TP, первым считается DCA (консервативно).
+    """
+
+    def __init__(self, candles: Candles, config: BacktestConfig):
+        self.candles = candles
+        self.config = config
+
+    def run(self) -> BacktestResult:
+        cfg = self.config
+        c = self.candles
+        n = len(c)
+        fee = cfg.commission_rate
+        tp_percents = np.array([p for p, _ in cfg.tp_levels], dtype=np.float64) / 100
+        tp_volumes = np.array([v for _, v in cfg.tp_levels], dtype=np.float64) / 100
+        dca_offsets = 1 - cfg.dca_step_percent / 100 * np.arange(1, cfg.dca_count + 1, dtype=np.float64)
+
+        # Изменения кэша и монет по свечам - из них векторно строится кривая капитала
+        cash_delta = np.zeros(n, dtype=np.float64)
+        coins_delta = np.zeros(n, dtype=np.float64)
+        cash = cfg.deposit
+        fees = 0.0
+        cycles: List[CycleResult] = []
+
+        start = 0
+        while start < n:
+            entry_price = c.open[start]
+            shares = entry_shares(cash * cfg.deposit_percent / 100, cfg.dca_count, cfg.martingale_coef, fee)
+            cycle_cash = cash
+
+            # --- Рыночный вход ---
+            qty = shares[0] / entry_price * (1 - fee)
+            cash -= qty * entry_price
+            coins = qty * (1 - fee)
+            fees += qty * fee * entry_price
+            cost = qty * entry_price
+            filled_qty = qty
+            cash_delta[start] -= qty * entry_price
+            coins_delta[start] += coins
+            max_cost = cost
+
+            dca_prices = entry_price * dca_offsets
+            dca_qty = shares[1:] / dca_prices * (1 - fee)
+            next_dca = 0
+            dca_from = start
+
+            tp_prices, tp_qty = self._tp_ladder(cost / filled_qty, coins, tp_percents, tp_volumes, fee)
+            next_tp = 0
+            tp_from = start + 1
+            end = -1
+
+            while True:
+                d = _first_at_or_below(c.low, dca_from, dca_prices[next_dca]) if next_dca < cfg.dca_count else -1
+                t = _first_at_or_above(c.high, tp_from, tp_prices[next_tp]) if next_tp < len(tp_prices) else -1
+                if d == -1 and t == -1:
+                    break
+
+                if d != -1 and (t == -1 or d <= t):
+                    # Исполняются все уровни DCA, до которых дошел low свечи
+                    while next_dca < cfg.dca_count and dca_prices[next_dca] >= c.low[d]:
+                        price, q = dca_prices[next_dca], dca_qty[next_dca]
+                        if q * price > cash:
+                            q = cash / price
+                        cash -= q * price
+                        coins += q * (1 - fee)
+                        fees += q * fee * price
+                        cost += q * price
+                        filled_qty += q
+                        cash_delta[d] -= q * price
+                        coins_delta[d] += q * (1 - fee)
+                        next_dca += 1
+                    max_cost = max(max_cost, cost)
+                    dca_from = d + 1
+                    # TP пересобираются от новой средней цены
+                    tp_prices, tp_qty = self._tp_ladder(cost / filled_qty, coins, tp_percents, tp_volumes, fee)
+                    next_tp = 0
+                    tp_from = d + 1
+                    continue
+
+                while next_tp < len(tp_prices) and tp_prices[next_tp] <= c.high[t]:
+                    price = tp_prices[next_tp]
+                    q = coins if next_tp == len(tp_prices) - 1 else min(tp_qty[next_tp], coins)
+                    proceeds = q * price * (1 - fee)
+                    cash += proceeds
+                    coins -= q
+                    fees += q * price * fee
+                    cash_delta[t] += proceeds
+                    coins_delta[t] -= q
+                    next_tp += 1
+                if next_tp == len(tp_prices):
+                    end = t
+                    break
+                tp_from = t + 1
+
+            closed = end != -1
+            last = end if closed else n - 1
+            pnl = cash - cycle_cash if closed else cash + coins * c.close[last] - cycle_cash
+            cycles.append(CycleResult(
+                start_index=start,
+                end_index=last,
+                start_time=int(c.open_time[start]),
+                end_time=int(c.open_time[last]),
+                duration_sec=(last - start + 1) * c.interval_sec,
+                pnl=float(pnl),
+                dca_filled=next_dca,
+                max_cost=float(max_cost),
+                closed=closed
+            ))
+            if not closed:
+                break
+            start = end + 1 + cfg.cycle_pause
+
+        cash_curve = cfg.deposit + np.cumsum(cash_delta)
+        coins_curve = np.cumsum(coins_delta)
+        position_value = coins_curve * c.close
+        equity = cash_curve + position_value
+        peak = np.maximum.accumulate(equity)
+        drawdown = 1 - equity / peak
+        in_market = coins_curve > 1e-12
+
+        final_equity = float(equity[-1]) if n else cfg.deposit
+        return BacktestResult(
+            final_equity=final_equity,
+            total_pnl=final_equity - cfg.deposit,
+            total_return_percent=(final_equity / cfg.deposit - 1) * 100,
+            max_drawdown_percent=float(drawdown.max()) * 100 if n else 0.0,
+            fees=float(fees),
+            cycles=cycles,
+            equity=equity,
+            exposure_time=float(in_market.mean()) if n else 0.0,
+            avg_position_value=float(position_value[in_market].mean()) if in_market.any() else 0.0,
+            max_position_value=float(position_value.max()) if n else 0.0
+        )
+
+    @staticmethod
+    def _tp_ladder(avg_price: float, coins: float, tp_percents: np.ndarray,
+                   tp_volumes: np.ndarray, fee: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Цены и объемы TP как в OrderManager._create_tp_orders"""
+        return avg_price * (1 + tp_percents + fee), coins * tp_volumes
+
+
+def run_backtest(path: str, settings: dict, deposit: float = 10000.0) -> BacktestResult:
+    """Бэктест настроек стратегии на файле свечей"""
+    candles = load_candles(path)
+    result = Backtester(candles, BacktestConfig.from_settings(settings, deposit)).run()
+    logger.info(f"Бэктест {path}: {result.summary()}")
+    return result
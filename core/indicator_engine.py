@@ -0,0 +1,482 @@
+import math
+from array import array
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+# --- Потоковые индикаторы: O(1) на тик ---
+
+class RingBuffer:
+    """Кольцевой буфер фиксированного размера на array('d')"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._data = array('d', [0.0] * size)
+        self._pos = 0
+        self.count = 0
+
+    def append(self, value: float) -> Optional[float]:
+        """Добавляет значение; возвращает вытесненное, если буфер был полон"""
+        evicted = self._data[self._pos] if self.count == self.size else None
+        self._data[self._pos] = value
+        self._pos = (self._pos + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+        return evicted
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.size
+
+    def values(self) -> list:
+        """Значения от старого к новому"""
+        if self.count < self.size:
+            return list(self._data[:self.count])
+        return list(self._data[self._pos:]) + list(self._data[:self._pos])
+
+
+class EMA:
+    """Экспоненциальная средняя; первое значение - SMA за period"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.value: Optional[float] = None
+        self._count = 0
+        self._sum = 0.0
+
+    def update(self, x: float) -> Optional[float]:
+        self._count += 1
+        if self.value is not None:
+            self.value += self.alpha * (x - self.value)
+        else:
+            self._sum += x
+            if self._count == self.period:
+                self.value = self._sum / self.period
+        return self.value
+
+    def warm_up(self, values: np.ndarray):
+        result = ema(values, self.period)
+        self._count = len(values)
+        if len(values) >= self.period:
+            self.value = float(result[-1])
+        else:
+            self._sum = float(np.sum(values))
+
+
+class RSI:
+    """RSI Уайлдера"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.value: Optional[float] = None
+        self._prev: Optional[float] = None
+        self._count = 0
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+
+    def update(self, x: float) -> Optional[float]:
+        if self._prev is None:
+            self._prev = x
+            return None
+        change = x - self._prev
+        self._prev = x
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        self._count += 1
+        if self._count <= self.period:
+            self._avg_gain += gain / self.period
+            self._avg_loss += loss / self.period
+            if self._count < self.period:
+                return None
+        else:
+            self._avg_gain += (gain - self._avg_gain) / self.period
+            self._avg_loss += (loss - self._avg_loss) / self.period
+        self.value = _rsi_value(self._avg_gain, self._avg_loss)
+        return self.value
+
+    def warm_up(self, values: np.ndarray):
+        if len(values) <= self.period:
+            for x in values:
+                self.update(float(x))
+            return
+        avg_gain, avg_loss = _rsi_averages(np.asarray(values, dtype=np.float64), self.period)
+        self._avg_gain, self._avg_loss = float(avg_gain[-1]), float(avg_loss[-1])
+        self._prev = float(values[-1])
+        self._count = len(values) - 1
+        self.value = _rsi_value(self._avg_gain, self._avg_loss)
+
+
+class ATR:
+    """Средний истинный диапазон Уайлдера"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.value: Optional[float] = None
+        self._prev_close: Optional[float] = None
+        self._count = 0
+        self._sum = 0.0
+
+    def update(self, high: float, low: float, close: float) -> Optional[float]:
+        if self._prev_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        self._count += 1
+        if self.value is not None:
+            self.value += (tr - self.value) / self.period
+        else:
+            self._sum += tr
+            if self._count == self.period:
+                self.value = self._sum / self.period
+        return self.value
+
+    def warm_up(self, high: np.ndarray, low: np.ndarray, close: np.ndarray):
+        if len(close) < self.period:
+            for h, l, c in zip(high, low, close):
+                self.update(float(h), float(l), float(c))
+            return
+        self.value = float(atr(high, low, close, self.period)[-1])
+        self._prev_close = float(close[-1])
+        self._count = len(close)
+
+
+class Bollinger:
+    """Полосы Боллинджера по скользящему окну (стандартное отклонение генеральной совокупности)"""
+
+    def __init__(self, period: int = 20, k: float = 2.0):
+        self.period = period
+        self.k = k
+        self._window = RingBuffer(period)
+        self._shift: Optional[float] = None
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self.middle: Optional[float] = None
+        self.upper: Optional[float] = None
+        self.lower: Optional[float] = None
+
+    def update(self, x: float) -> Optional[Tuple[float, float, float]]:
+        if self._shift is None:
+            # Сдвиг к первому значению уменьшает потерю точности в сумме квадратов
+            self._shift = x
+        d = x - self._shift
+        evicted = self._window.append(d)
+        self._sum += d
+        self._sum_sq += d * d
+        if evicted is not None:
+            self._sum -= evicted
+            self._sum_sq -= evicted * evicted
+        if not self._window.full:
+            return None
+        mean = self._sum / self.period
+        std = math.sqrt(max(self._sum_sq / self.period - mean * mean, 0.0))
+        self.middle = mean + self._shift
+        self.upper = self.middle + self.k * std
+        self.lower = self.middle - self.k * std
+        return self.middle, self.upper, self.lower
+
+    def warm_up(self, values: np.ndarray):
+        for x in values[-self.period:]:
+            self.update(float(x))
+
+
+class VWAP:
+    """VWAP: накопительный (period=None) или по скользящему окну"""
+
+    def __init__(self, period: Optional[int] = None):
+        self.period = period
+        self._pv = RingBuffer(period) if period else None
+        self._v = RingBuffer(period) if period else None
+        self._sum_pv = 0.0
+        self._sum_v = 0.0
+        self.value: Optional[float] = None
+
+    def update(self, price: float, volume: float) -> Optional[float]:
+        pv = price * volume
+        self._sum_pv += pv
+        self._sum_v += volume
+        if self._pv is not None:
+            evicted_pv = self._pv.append(pv)
+            evicted_v = self._v.append(volume)
+            if evicted_pv is not None:
+                self._sum_pv -= evicted_pv
+                self._sum_v -= evicted_v
+        if self._sum_v > 0:
+            self.value = self._sum_pv / self._sum_v
+        return self.value
+
+    def warm_up(self, price: np.ndarray, volume: np.ndarray):
+        if self.period:
+            for p, v in zip(price[-self.period:], volume[-self.period:]):
+                self.update(float(p), float(v))
+            return
+        self._sum_pv = float(np.dot(price, volume))
+        self._sum_v = float(np.sum(volume))
+        if self._sum_v > 0:
+            self.value = self._sum_pv / self._sum_v
+
+
+class RollingExtremum:
+    """Скользящий минимум/максимум на монотонной очереди - амортизированно O(1)"""
+
+    def __init__(self, period: int, mode: str = 'min'):
+        self.period = period
+        self._is_min = mode == 'min'
+        self._deque = deque()  # (индекс, значение), значения монотонны
+        self._index = 0
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> float:
+        dq = self._deque
+        if self._is_min:
+            while dq and dq[-1][1] >= x:
+                dq.pop()
+        else:
+            while dq and dq[-1][1] <= x:
+                dq.pop()
+        dq.append((self._index, x))
+        if dq[0][0] <= self._index - self.period:
+            dq.popleft()
+        self._index += 1
+        self.value = dq[0][1]
+        return self.value
+
+    def warm_up(self, values: np.ndarray):
+        for x in values[-self.period:]:
+            self.update(float(x))
+
+
+class RollingMin(RollingExtremum):
+    def __init__(self, period: int):
+        super().__init__(period, 'min')
+
+
+class RollingMax(RollingExtremum):
+    def __init__(self, period: int):
+        super().__init__(period, 'max')
+
+
+class IndicatorEngine:
+    """
+    Набор индикаторов одного символа с обновлением на каждом тике/свече.
+    Для прогрева по истории используется пакетный NumPy-путь.
+    Самостоятельная библиотека: стратегия и бэктестер ее пока не используют.
+    """
+
+    def __init__(self, ema_period: int = 20, rsi_period: int = 14, atr_period: int = 14,
+                 bollinger_period: int = 20, bollinger_k: float = 2.0,
+                 vwap_period: Optional[int] = None, range_period: int = 60):
+        self.ema = EMA(ema_period)
+        self.rsi = RSI(rsi_period)
+        self.atr = ATR(atr_period)
+        self.bollinger = Bollinger(bollinger_period, bollinger_k)
+        self.vwap = VWAP(vwap_period)
+        self.rolling_min = RollingMin(range_period)
+        self.rolling_max = RollingMax(range_period)
+        self.last_price: Optional[float] = None
+
+    def update(self, price: float, volume: float = 0.0,
+               high: Optional[float] = None, low: Optional[float] = None):
+        """Обновление по тику (high/low не заданы) или по закрытой свече"""
+        high = price if high is None else high
+        low = price if low is None else low
+        self.last_price = price
+        self.ema.update(price)
+        self.rsi.update(price)
+        self.atr.update(high, low, price)
+        self.bollinger.update(price)
+        self.vwap.update(price, volume)
+        self.rolling_min.update(low)
+        self.rolling_max.update(high)
+
+    def warm_up(self, close: np.ndarray, high: Optional[np.ndarray] = None,
+                low: Optional[np.ndarray] = None, volume: Optional[np.ndarray] = None):
+        """Прогрев по истории свечей без поштучного пересчета"""
+        close = np.asarray(close, dtype=np.float64)
+        high = close if high is None else np.asarray(high, dtype=np.float64)
+        low = close if low is None else np.asarray(low, dtype=np.float64)
+        volume = np.zeros_like(close) if volume is None else np.asarray(volume, dtype=np.float64)
+        if not len(close):
+            return
+        self.last_price = float(close[-1])
+        self.ema.warm_up(close)
+        self.rsi.warm_up(close)
+        self.atr.warm_up(high, low, close)
+        self.bollinger.warm_up(close)
+        self.vwap.warm_up(close, volume)
+        self.rolling_min.warm_up(low)
+        self.rolling_max.warm_up(high)
+
+    def volatility_percent(self) -> Optional[float]:
+        """ATR в процентах от цены - для подстройки шага DCA под волатильность"""
+        if self.atr.value is None or not self.last_price:
+            return None
+        return self.atr.value / self.last_price * 100
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        return {
+            'price': self.last_price,
+            'ema': self.ema.value,
+            'rsi': self.rsi.value,
+            'atr': self.atr.value,
+            'bb_middle': self.bollinger.middle,
+            'bb_upper': self.bollinger.upper,
+            'bb_lower': self.bollinger.lower,
+            'vwap': self.vwap.value,
+            'rolling_min': self.rolling_min.value,
+            'rolling_max': self.rolling_max.value,
+        }
+
+
+# --- Пакетный путь: те же значения по целым массивам ---
+
+def _ewm(values: np.ndarray, alpha: float, initial: float) -> np.ndarray:
+    """
+    y[t] = (1 - alpha) * y[t-1] + alpha * x[t], y[-1] = initial.
+    Рекурсия раскрывается через cumsum блоками, чтобы степени (1 - alpha)
+    не выходили за пределы float64.
+    """
+    n = len(values)
+    out = np.empty(n, dtype=np.float64)
+    if n == 0:
+        return out
+    decay = 1.0 - alpha
+    if decay <= 0:
+        out[:] = values
+        return out
+    block = max(1, int(100 * math.log(10) / -math.log(decay)))
+    prev = initial
+    for start in range(0, n, block):
+        x = values[start:start + block]
+        k = np.arange(len(x), dtype=np.float64)
+        powers = decay ** k
+        weighted = np.cumsum(x / powers) * alpha
+        y = powers * (decay * prev + weighted)
+        out[start:start + len(x)] = y
+        prev = y[-1]
+    return out
+
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if len(values) < period:
+        return out
+    seed = values[:period].mean()
+    out[period - 1] = seed
+    out[period:] = _ewm(values[period:], 2 / (period + 1), seed)
+    return out
+
+
+def _rsi_value(avg_gain, avg_loss):
+    if np.isscalar(avg_gain):
+        return 100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+
+
+def _rsi_averages(values: np.ndarray, period: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Средние прирост/падение Уайлдера, начиная с индекса period"""
+    change = np.diff(values)
+    gains = np.clip(change, 0, None)
+    losses = np.clip(-change, 0, None)
+    avg_gain = np.empty(len(change) - period + 1)
+    avg_loss = np.empty(len(change) - period + 1)
+    avg_gain[0] = gains[:period].mean()
+    avg_loss[0] = losses[:period].mean()
+    avg_gain[1:] = _ewm(gains[period:], 1 / period, avg_gain[0])
+    avg_loss[1:] = _ewm(losses[period:], 1 / period, avg_loss[0])
+    return avg_gain, avg_loss
+
+
+def rsi(values: np.ndarray, period: int = 14) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if len(values) <= period:
+        return out
+    avg_gain, avg_loss = _rsi_averages(values, period)
+    out[period:] = _rsi_value(avg_gain, avg_loss)
+    return out
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(len(close), np.nan)
+    if len(close) < period:
+        return out
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    tr[0] = high[0] - low[0]
+    seed = tr[:period].mean()
+    out[period - 1] = seed
+    out[period:] = _ewm(tr[period:], 1 / period, seed)
+    return out
+
+
+def bollinger(values: np.ndarray, period: int = 20, k: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    values = np.asarray(values, dtype=np.float64)
+    middle = np.full(len(values), np.nan)
+    upper = middle.copy()
+    lower = middle.copy()
+    if len(values) < period:
+        return middle, upper, lower
+    shifted = values - values[0]
+    csum = np.concatenate(([0.0], np.cumsum(shifted)))
+    csum_sq = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+    window_sum = csum[period:] - csum[:-period]
+    window_sq = csum_sq[period:] - csum_sq[:-period]
+    mean = window_sum / period
+    std = np.sqrt(np.maximum(window_sq / period - mean * mean, 0.0))
+    middle[period - 1:] = mean + values[0]
+    upper[period - 1:] = middle[period - 1:] + k * std
+    lower[period - 1:] = middle[period - 1:] - k * std
+    return middle, upper, lower
+
+
+def vwap(price: np.ndarray, volume: np.ndarray, period: Optional[int] = None) -> np.ndarray:
+    price = np.asarray(price, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    csum_pv = np.cumsum(price * volume)
+    csum_v = np.cumsum(volume)
+    if period:
+        csum_pv[period:] = csum_pv[period:] - csum_pv[:-period].copy()
+        csum_v[period:] = csum_v[period:] - csum_v[:-period].copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(csum_v > 0, csum_pv / csum_v, np.nan)
+
+
+def _rolling_extremum(values: np.ndarray, period: int, reduce) -> np.ndarray:
+    """
+    Скользящий экстремум за O(n) (алгоритм ван Херка/Гиля-Вермана):
+    префиксный и суффиксный экстремумы по блокам длины period.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n == 0:
+        return values.copy()
+    fill = np.inf if reduce is np.minimum else -np.inf
+    padded_len = -(-n // period) * period
+    padded = np.full(padded_len, fill)
+    padded[:n] = values
+    blocks = padded.reshape(-1, period)
+    prefix = reduce.accumulate(blocks, axis=1).ravel()
+    suffix = reduce.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    out = np.empty(n)
+    # Пока окно не заполнено - экстремум по всем значениям с начала
+    head = min(period - 1, n)
+    out[:head] = reduce.accumulate(values[:head])
+    ends = np.arange(period - 1, n)
+    out[period - 1:] = reduce(suffix[ends - period + 1], prefix[ends])
+    return out
+
+
+def rolling_min(values: np.ndarray, period: int) -> np.ndarray:
+    return _rolling_extremum(values, period, np.minimum)
+
+
+def rolling_max(values: np.ndarray, period: int) -> np.ndarray:
+    return _rolling_extremum(values, period, np.maximum)
@@ -0,0 +1,296 @@
+import os
+import json
+import math
+import random
+import logging
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .backtester import Backtester, BacktestConfig, Candles
+
+logger = logging.getLogger(__name__)
+
+# Метрики бэктеста, сохраняемые в результатах перебора
+RESULT_METRICS = (
+    'final_equity', 'total_pnl', 'total_return_percent', 'max_drawdown_percent', 'fees',
+    'cycles', 'completed_cycles', 'win_rate', 'avg_cycle_duration', 'max_cycle_duration',
+    'exposure_time', 'avg_position_value', 'max_position_value'
+)
+
+# Свечи, подключенные в процессе-воркере к общей памяти
+_worker_candles: Optional[Candles] = None
+_worker_shm = None
+
+
+class SharedCandles:
+    """
+    Свечи в общей памяти: массивы создаются один раз в родительском процессе,
+    воркеры подключаются к ним по имени без копирования через pickle.
+    """
+    COLUMNS = ('open_time', 'open', 'high', 'low', 'close')
+
+    def __init__(self, candles: Candles):
+        self.length = len(candles)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, len(self.COLUMNS) * self.length * 8))
+        data = np.ndarray((len(self.COLUMNS), self.length), dtype=np.float64, buffer=self._shm.buf)
+        for i, column in enumerate(self.COLUMNS):
+            # Время в мс точно представимо в float64
+            data[i] = getattr(candles, column)
+        self.name = self._shm.name
+
+    @classmethod
+    def attach(cls, name: str, length: int):
+        shm = shared_memory.SharedMemory(name=name)
+        data = np.ndarray((len(cls.COLUMNS), length), dtype=np.float64, buffer=shm.buf)
+        candles = Candles(
+            open_time=data[0].astype(np.int64),
+            open=data[1],
+            high=data[2],
+            low=data[3],
+            close=data[4]
+        )
+        return shm, candles
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+
+def _init_worker(shm_name: str, length: int):
+    global _worker_candles, _worker_shm
+    _worker_shm, _worker_candles = SharedCandles.attach(shm_name, length)
+
+
+def _evaluate(params: dict, deposit: float) -> dict:
+    config = BacktestConfig.from_settings(params, deposit)
+    summary = Backtester(_worker_candles, config).run().summary()
+    return {metric: float(summary[metric]) for metric in RESULT_METRICS}
+
+
+def params_key(params: dict) -> str:
+    """Канонический ключ комбинации параметров для чекпоинтов"""
+    return json.dumps({k: params[k] for k in sorted(params)}, sort_keys=True)
+
+
+class ResultStore:
+    """
+    Колоночное хранилище результатов: каталог с частями part-NNNNN.npz,
+    в каждой части - по массиву на параметр и метрику плюс ключи комбинаций.
+    Часть пишется атомарно, поэтому после прерывания перебор продолжается
+    с последней сохраненной части.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _parts(self) -> List[Path]:
+        return sorted(self.path.glob('part-*.npz'))
+
+    def completed_keys(self) -> set:
+        keys = set()
+        for part in self._parts():
+            with np.load(part) as data:
+                keys.update(data['key'].tolist())
+        return keys
+
+    def append(self, rows: List[dict]):
+        if not rows:
+            return
+        columns = {name: np.array([row[name] for row in rows]) for name in rows[0]}
+        index = len(self._parts())
+        target = self.path / f'part-{index:05d}.npz'
+        tmp = self.path / f'.part-{index:05d}.tmp.npz'
+        np.savez(tmp, **columns)
+        os.replace(tmp, target)
+
+    def load(self) -> Dict[str, np.ndarray]:
+        """
+        Все результаты, склеенные по колонкам. Колонки, которых нет в части
+        (записанной перебором другого пространства), заполняются NaN.
+        """
+        parts = []
+        for part in self._parts():
+            with np.load(part) as data:
+                parts.append({name: data[name] for name in data.files})
+        names = list(dict.fromkeys(name for columns in parts for name in columns))
+        results = {}
+        for name in names:
+            chunks = []
+            for columns in parts:
+                length = len(columns['key'])
+                chunks.append(columns[name] if name in columns else np.full(length, np.nan))
+            results[name] = np.concatenate(chunks)
+        return results
+
+
+class ParameterSweep:
+    """
+    Перебор настроек стратегии (dca_count, dca_step_percent, martingale_coef,
+    tpN_percent/tpN_volume) через бэктест в пуле процессов.
+
+    Пространство параметров: для grid_search - списки значений, для random_search
+    и bayesian_search - диапазоны (low, high); если обе границы int, параметр
+    целочисленный. Параметры, не указанные в пространстве, берутся из base_settings
+    (иначе - значения BacktestConfig по умолчанию); в результаты пишется полный набор.
+    Внутри with пул процессов и общая память переиспользуются между вызовами.
+    """
+
+    def __init__(self, candles: Candles, results_path: str, base_settings: Optional[dict] = None,
+                 deposit: float = 10000.0, workers: Optional[int] = None, checkpoint_every: int = 200,
+                 objective: str = 'total_return_percent'):
+        self.candles = candles
+        self.store = ResultStore(results_path)
+        self.base_settings = dict(base_settings or {})
+        self.deposit = deposit
+        self.workers = workers or os.cpu_count() or 1
+        self.checkpoint_every = checkpoint_every
+        self.objective = objective
+        self._shared: Optional[SharedCandles] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self):
+        self._shared = SharedCandles(self.candles)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                         initargs=(self._shared.name, self._shared.length))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._pool.shutdown()
+        self._shared.close()
+        self._pool = None
+        self._shared = None
+
+    # --- Генерация комбинаций ---
+
+    def grid_search(self, space: Dict[str, Sequence]) -> int:
+        names = list(space)
+        combos = (dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names)))
+        return self.run(combos)
+
+    def random_search(self, space: Dict[str, tuple], count: int, seed: int = 0) -> int:
+        rng = random.Random(seed)
+        return self.run(self._sample(space, rng) for _ in range(count))
+
+    def bayesian_search(self, space: Dict[str, tuple], iterations: int, initial: int = 50, batch: int = None,
+                        candidates: int = 64, gamma: float = 0.2, seed: int = 0) -> int:
+        """
+        Оптимизация в духе TPE: после случайного старта каждая партия выбирается
+        из кандидатов с максимальным отношением плотностей «лучших» и «остальных»
+        уже посчитанных точек.
+        """
+        if self._pool is None:
+            with self:
+                return self.bayesian_search(space, iterations, initial, batch, candidates, gamma, seed)
+        rng = random.Random(seed)
+        batch = batch or self.workers
+        evaluated = self.run(self._sample(space, rng) for _ in range(initial))
+        while evaluated < initial + iterations:
+            observed = self._observed(space)
+            if len(observed) < 2:
+                proposals = [self._sample(space, rng) for _ in range(batch)]
+            else:
+                proposals = self._propose(space, observed, rng, batch, candidates, gamma)
+            done = self.run(proposals)
+            if done == 0:
+                # Все предложения уже посчитаны - разбавляем случайными точками
+                done = self.run(self._sample(space, rng) for _ in range(batch))
+            evaluated += max(done, 1)
+        return evaluated
+
+    def _sample(self, space: Dict[str, tuple], rng: random.Random) -> dict:
+        params = {}
+        for name, (low, high) in space.items():
+            if isinstance(low, int) and isinstance(high, int):
+                params[name] = rng.randint(low, high)
+            else:
+                params[name] = round(rng.uniform(low, high), 4)
+        return params
+
+    def _observed(self, space: Dict[str, tuple]) -> List[tuple]:
+        results = self.store.load()
+        if not results or any(name not in results for name in space):
+            return []
+        scores = results[self.objective]
+        points = np.stack([results[name].astype(np.float64) for name in space], axis=1)
+        finite = np.isfinite(scores) & np.isfinite(points).all(axis=1)
+        return list(zip(points[finite], scores[finite]))
+
+    def _propose(self, space: Dict[str, tuple], observed: List[tuple], rng: random.Random,
+                 batch: int, candidates: int, gamma: float) -> List[dict]:
+        names = list(space)
+        lows = np.array([space[n][0] for n in names], dtype=np.float64)
+        spans = np.array([space[n][1] - space[n][0] for n in names], dtype=np.float64)
+        spans[spans == 0] = 1.0
+        observed.sort(key=lambda item: item[1], reverse=True)
+        points = (np.array([p for p, _ in observed]) - lows) / spans
+        split = max(1, int(math.ceil(gamma * len(points))))
+        good, bad = points[:split], points[split:] if len(points) > split else points
+        bandwidth = max(0.05, len(points) ** (-1 / (len(names) + 4)) * 0.3)
+
+        pool = [self._sample(space, rng) for _ in range(candidates * batch)]
+        x = (np.array([[p[n] for n in names] for p in pool], dtype=np.float64) - lows) / spans
+
+        def log_density(samples: np.ndarray, centers: np.ndarray) -> np.ndarray:
+            dist = ((samples[:, None, :] - centers[None, :, :]) / bandwidth) ** 2
+            return np.log(np.exp(-0.5 * dist.sum(axis=2)).mean(axis=1) + 1e-300)
+
+        score = log_density(x, good) - log_density(x, bad)
+        chosen = np.argsort(score)[::-1][:batch]
+        return [pool[i] for i in chosen]
+
+    # --- Выполнение ---
+
+    def run(self, combos: Iterable[dict]) -> int:
+        """
+        Считает комбинации, пропуская уже сохраненные. Возвращает число новых результатов.
+        """
+        done = self.store.completed_keys()
+        pending = {}
+        for params in combos:
+            # Полный набор параметров стратегии: схема колонок одна для любых пространств
+            settings = BacktestConfig.from_settings({**self.base_settings, **params}).to_settings()
+            key = params_key(settings)
+            if key not in done and key not in pending:
+                pending[key] = settings
+        if not pending:
+            return 0
+        if self._pool is None:
+            with self:
+                return self.run(pending.values())
+
+        rows: List[dict] = []
+        completed = 0
+        futures = {self._pool.submit(_evaluate, settings, self.deposit): (key, settings)
+                   for key, settings in pending.items()}
+        try:
+            for future in as_completed(futures):
+                key, settings = futures[future]
+                try:
+                    metrics = future.result()
+                except Exception as e:
+                    logger.error(f"Ошибка бэктеста {key}: {e}")
+                    continue
+                rows.append({'key': key, **{k: float(v) for k, v in settings.items()}, **metrics})
+                completed += 1
+                if len(rows) >= self.checkpoint_every:
+                    self.store.append(rows)
+                    rows = []
+        finally:
+            # Досчитанное до прерывания сохраняется в чекпоинт
+            self.store.append(rows)
+        logger.info(f"Перебор параметров: посчитано {completed} из {len(pending)} комбинаций")
+        return completed
+
+    def best(self, top: int = 10) -> List[dict]:
+        """Лучшие комбинации по целевой метрике"""
+        results = self.store.load()
+        if not results:
+            return []
+        order = np.argsort(results[self.objective])[::-1][:top]
+        return [{name: values[i].item() for name, values in results.items()} for i in order]
@@ -1,11 +1,17 @@
 import time
 import logging
-from decimal import Decimal, ROUND_DOWN
+from decimal import Decimal
 from enum import Enum
 from typing import Optional, List, Dict, Callable
 from dataclasses import dataclass, field
 import threading
 
+from exchange.base_exchange import OrderRequest
+from infra.metrics import metrics
+from utils.calculator import LadderPlan, plan_ladder
+from utils.fixed_point import FixedFilters, as_decimal, floor_to, from_fixed, to_fixed
+from .risk_control import RiskCheckError
+
 logger = logging.getLogger(__name__)
 
 class OrderStatus(Enum):
@@ -25,6 +31,17 @@ class CycleStage(Enum):
     MONITORING = "monitoring"
     CYCLE_WAIT = "cycle_wait"
 
+# Соответствие статусов Binance статусам ордера
+EXCHANGE_STATUS_MAP = {
+    'NEW': OrderStatus.PENDING,
+    'PENDING_CANCEL': OrderStatus.PENDING,
+    'PARTIALLY_FILLED': OrderStatus.PARTIALLY_FILLED,
+    'FILLED': OrderStatus.FILLED,
+    'CANCELED': OrderStatus.CANCELLED,
+    'REJECTED': OrderStatus.CANCELLED,
+    'EXPIRED': OrderStatus.CANCELLED,
+}
+
 @dataclass
 class Order:
     id: str
@@ -37,6 +54,12 @@ class Order:
     filled_amount: Decimal = Decimal('0')
     avg_price: Decimal = Decimal('0')
     created_at: float = 0.0
+    # perf_counter_ns момента ответа биржи на создание - для метрики ack -> fill
+    acked_ns: int = field(default=0, repr=False, compare=False)
+
+    @property
+    def is_open(self) -> bool:
+        return self.status in (OrderStatus.PENDING, OrderStatus.PARTIALLY_FILLED)
 
 @dataclass
 class Position:
@@ -54,15 +77,32 @@ class Position:
             self.tp_orders = []
 
 class OrderManager:
-    # Константы для ожидания между этапами
+    # Максимальное ожидание между этапами (сек); переход происходит раньше,
+    # как только выполнено условие этапа. Переопределяются ключами config
+    # wait_after_market, wait_after_dca, wait_after_tp_cancel, wait_between_cycles
     WAIT_AFTER_MARKET = 5
     WAIT_AFTER_DCA = 10
     WAIT_AFTER_TP_CANCEL = 3
     WAIT_BETWEEN_CYCLES = 15
+    # Длительность мониторинга (config: monitoring_duration) и период опроса REST без потока
+    MONITORING_DURATION = 30
+    MONITORING_POLL_INTERVAL = 1
+    # Повторные попытки выставить лестницу после отката
+    LADDER_RETRIES = 1
+    # Дробление входа по стакану (config: max_entry_slippage_percent, max_entry_children,
+    # entry_child_interval): пауза между дочерними ордерами дает стакану восстановиться
+    MAX_ENTRY_CHILDREN = 5
+    ENTRY_CHILD_INTERVAL = 1
     
     # Комиссия биржи с запасом
     COMMISSION_RATE = Decimal('0.0015')  # 0.15% (0.11% + запас)
 
+    # Сколько событий по еще не зарегистрированным ордерам держать в буфере
+    MAX_UNMATCHED_EVENTS = 1000
+
+    # Запас по времени при запросе истории ордеров (расхождение часов с биржей)
+    RECONCILE_TIME_MARGIN = 60
+
     def __init__(self, exchange, config: dict):
         self.exchange = exchange
         self.config = config
@@ -71,25 +111,96 @@ class OrderManager:
         self.current_stage = CycleStage.IDLE
         self._running = False
         self._thread = None
-        self.hard_stop_requested = False
+        # Состояние конечного автомата цикла: момент, раньше которого шаг не выполняется
+        self._stage_deadline = 0.0
+        # Условие досрочного перехода с этапа ожидания
+        self._stage_condition: Optional[Callable[[], bool]] = None
+        self._monitoring_until = 0.0
+        self._market_order: Optional[Order] = None
+        # Дочерние ордера входа, еще не отправленные: следующий уходит шагом по таймеру
+        self._entry_children: List[Decimal] = []
+        self._entry_count = 0
+        self._entry_price = Decimal('0')
+        # План лестницы (доли, цены, количества) считается один раз на цикл при входе
+        self._ladder_plan: Optional[LadderPlan] = None
+        self._cancelling: List[Order] = []
+        self._resume_stage: Optional[CycleStage] = None
+        self._scheduler = None
+        self._stage_handlers = {
+            CycleStage.IDLE: self._step_start_cycle,
+            CycleStage.CYCLE_WAIT: self._step_start_cycle,
+            CycleStage.MARKET_ORDER: self._step_entry_child,
+            CycleStage.WAITING_MARKET: self._step_dca_orders,
+            CycleStage.WAITING_DCA: self._step_cancel_tp,
+            CycleStage.WAITING_TP_CANCEL: self._step_tp_orders,
+            CycleStage.MONITORING: self._step_monitoring,
+        }
+        # Остановка и пробуждение цикла событиями вместо опроса флагов
+        self._stop_event = threading.Event()
+        self._wakeup = threading.Event()
         self.soft_stop_enabled = False
+
+        # Поток исполнений ордеров (user data stream) и защита состояния от гонок с ним
+        self.user_stream = None
+        self._lock = threading.RLock()
+        self._unmatched_events: Dict[str, dict] = {}
+
+        # Журнал состояния для восстановления после перезапуска (infra.state.StateStore)
+        self.state_store = None
+        # Пре-трейд риск-контроль (core.risk_control.RiskEngine)
+        self.risk = None
         
         # Коллбэки для уведомлений
         self.on_stage_change: Optional[Callable] = None
         self.on_position_update: Optional[Callable] = None
         self.on_orders_update: Optional[Callable] = None
+        # on_fill(symbol, side, qty, price, fee) - для статистики (infra.stats.StatsEngine.on_fill)
+        self.on_fill: Optional[Callable] = None
+        # on_cycle_complete(symbol) - конец цикла (infra.stats.StatsEngine.on_cycle_complete)
+        self.on_cycle_complete: Optional[Callable] = None
 
     def start(self):
+        if not self._prepare_start():
+            return
+        self._thread = threading.Thread(target=self._trading_cycle, daemon=True)
+        self._thread.start()
+        logger.info("OrderManager запущен")
+
+    def _prepare_start(self) -> bool:
         if self._running:
             logger.warning("OrderManager уже запущен")
-            return
-        
+            return False
+
         self._running = True
         self.hard_stop_requested = False
         self.soft_stop_enabled = False
-        self._thread = threading.Thread(target=self._trading_cycle, daemon=True)
-        self._thread.start()
-        logger.info("OrderManager запущен")
+        self.current_stage = CycleStage.IDLE
+        self._stage_deadline = 0.0
+        self._stage_condition = None
+        self._entry_children = []
+        self._wakeup.clear()
+        if self._resume_stage is not None:
+            self._resume(self._resume_stage)
+            self._resume_stage = None
+        return True
+
+    @property
+    def hard_stop_requested(self) -> bool:
+        return self._stop_event.is_set()
+
+    @hard_stop_requested.setter
+    def hard_stop_requested(self, value: bool):
+        if value:
+            self._stop_event.set()
+            self._wake()
+        else:
+            self._stop_event.clear()
+
+    def _wake(self):
+        """Пересмотреть условия текущего этапа, не дожидаясь таймаута"""
+        self._wakeup.set()
+        if self._scheduler is not None:
+            self._scheduler.wake(self)
 
     def stop(self):
         if not self._running:
@@ -97,7 +208,7 @@ class OrderManager:
         
         self._running = False
         self.hard_stop_requested = True
-        if self._thread and self._thread.is_alive():
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
             self._thread.join(timeout=5)
         logger.info("OrderManager остановлен")
 
@@ -111,402 +222,949 @@ class OrderManager:
 
     def _trading_cycle(self):
         try:
-            while self._running and not self.hard_stop_requested:
-                if self.soft_stop_enabled:
-                    logger.info("Мягкий стоп - завершение после цикла")
+            while True:
+                delay = self.step()
+                if delay is None:
+                    break
+                if delay > 0 and not self._wait_with_stop_check(delay):
                     break
-
-                self._execute_strategy_cycle()
-
-                if self._running and not self.hard_stop_requested:
-                    self._update_stage(CycleStage.CYCLE_WAIT)
-                    self._wait_with_stop_check(self.WAIT_BETWEEN_CYCLES)
 
         except Exception as e:
-            logger.critical(f"Critical error in trading cycle: {e}")
+            logger.critical("Critical error in trading cycle: %s", e)
         finally:
-            self._running = False
-            self._update_stage(CycleStage.IDLE)
-
-    def _update_stage(self, stage: CycleStage):
-        self.current_stage = stage
-        if self.on_stage_change:
-            self.on_stage_change(stage.value)
-        logger.debug(f"Этап изменен: {stage.value}")
+            self._finish()
 
-    def _calculate_entry_shares(self, total_deposit: Decimal, dca_count: int, martingale_coef: Decimal) -> List[Decimal]:
+    def _finish(self):
+        self._running = False
+        if self._entry_children:
+            logger.warning("Вход прерван остановкой: выставлено %s из %s частей",
+                           self._entry_count - len(self._entry_children), self._entry_count)
+            self._entry_children = []
+        # Остановка не пишется в журнал: после перезапуска цикл продолжится с прерванного этапа
+        self._update_stage(CycleStage.IDLE, journal=False)
+
+    def step(self) -> Optional[float]:
         """
-        Расчет долей для входа с учетом комиссии
+        Выполняет один шаг цикла стратегии, не блокируясь на ожиданиях.
+        Возвращает, через сколько секунд вызвать следующий шаг, или None, если работа завершена.
+        Позволяет вести много символов из одного планировщика вместо потока на каждый.
         """
+        if self.hard_stop_requested or not self._running:
+            return None
+        remaining = self._stage_deadline - time.monotonic()
+        if remaining > 0 and not self._stage_condition_met():
+            return remaining
+        handler = self._stage_handlers.get(self.current_stage, self._step_start_cycle)
+        return handler()
+
+    def _stage_condition_met(self) -> bool:
+        condition = self._stage_condition
+        if condition is None:
+            return False
         try:
-            # Учитываем комиссию в общем депозите
-            available_deposit = total_deposit * (Decimal('1') - self.COMMISSION_RATE)
-            
-            # Расчет геометрической прогрессии для мартингейла
-            if martingale_coef == Decimal('1'):
-                # Равные доли
-                share_size = available_deposit / Decimal(str(dca_count + 1))
-                shares = [share_size] * (dca_count + 1)
-            else:
-                # Геометрическая прогрессия
-                sum_progression = (Decimal('1') - martingale_coef ** (dca_count + 1)) / (Decimal('1') - martingale_coef)
-                first_share = available_deposit / sum_progression
-                shares = [first_share * (martingale_coef ** i) for i in range(dca_count + 1)]
-            
-            logger.info(f"Рассчитаны доли: {[float(s) for s in shares]}")
-            return shares
+            return condition()
         except Exception as e:
-            logger.error(f"Ошибка расчета долей: {e}")
-            return []
+            logger.error("Ошибка проверки условия этапа %s: %s", self.current_stage.value, e)
+            return False
+
+    def _timeout(self, key: str, default: float) -> float:
+        return float(self.config.get(key, default))
 
-    def _execute_strategy_cycle(self):
+    def _enter_wait(self, stage: CycleStage, seconds: float,
+                    condition: Optional[Callable[[], bool]] = None) -> float:
+        """
+        Переход на этап ожидания: следующий шаг выполнится, когда выполнится
+        condition (проверяется при событиях ордеров) или истечет seconds.
+        """
+        self._stage_condition = condition
+        self._update_stage(stage)
+        self._stage_deadline = time.monotonic() + seconds
+        if condition is not None and self._stage_condition_met():
+            return 0
+        return seconds
+
+    def _step_start_cycle(self) -> Optional[float]:
+        if self.soft_stop_enabled:
+            logger.info("Мягкий стоп - завершение после цикла")
+            return None
         if not self._create_market_order():
-            return
+            return self._enter_wait(CycleStage.CYCLE_WAIT, self._timeout('wait_between_cycles', self.WAIT_BETWEEN_CYCLES))
+        return self._continue_entry()
 
-        self._update_stage(CycleStage.WAITING_MARKET)
-        if not self._wait_with_stop_check(self.WAIT_AFTER_MARKET):
-            return
+    def _step_entry_child(self) -> float:
+        self._place_entry_child()
+        return self._continue_entry()
 
+    def _continue_entry(self) -> float:
+        """
+        Следующий дочерний ордер входа - отдельным шагом через entry_child_interval,
+        чтобы пауза для восстановления стакана не занимала поток планировщика
+        """
+        if self._entry_children:
+            interval = self._timeout('entry_child_interval', self.ENTRY_CHILD_INTERVAL)
+            self._stage_condition = None
+            self._stage_deadline = time.monotonic() + interval
+            return interval
+        return self._enter_wait(CycleStage.WAITING_MARKET, self._timeout('wait_after_market', self.WAIT_AFTER_MARKET),
+                                self._market_order_done)
+
+    def _step_dca_orders(self) -> float:
         self._create_dca_orders()
+        # Лестница выставляется синхронно: ответ биржи и есть подтверждение, ждать нечего
+        return self._enter_wait(CycleStage.WAITING_DCA, self._timeout('wait_after_dca', self.WAIT_AFTER_DCA),
+                                lambda: True)
 
-        self._update_stage(CycleStage.WAITING_DCA)
-        if not self._wait_with_stop_check(self.WAIT_AFTER_DCA):
-            return
-
+    def _step_cancel_tp(self) -> float:
         self._cancel_tp_orders()
+        return self._enter_wait(CycleStage.WAITING_TP_CANCEL, self._timeout('wait_after_tp_cancel', self.WAIT_AFTER_TP_CANCEL),
+                                self._cancels_acknowledged)
 
-        self._update_stage(CycleStage.WAITING_TP_CANCEL)
-        if not self._wait_with_stop_check(self.WAIT_AFTER_TP_CANCEL):
-            return
-
+    def _step_tp_orders(self) -> float:
+        if not self._cancels_acknowledged() and not self._stream_connected():
+            # Без потока итог неподтвержденных отмен можно узнать только сверкой
+            self.update_orders_status()
         self._create_tp_orders()
-
+        self._monitoring_until = time.monotonic() + self._timeout('monitoring_duration', self.MONITORING_DURATION)
+        self._stage_condition = self._tp_orders_filled
         self._update_stage(CycleStage.MONITORING)
+        return 0
 
-        monitoring_duration = 30
-        for _ in range(monitoring_duration):
-            if self.hard_stop_requested or not self._running:
-                break
-            self._monitor_orders_during_cycle()
-            time.sleep(1)
+    def _step_monitoring(self) -> float:
+        self._monitor_orders_during_cycle()
+        now = time.monotonic()
+        if self._stage_condition_met() or now >= self._monitoring_until:
+            return self._enter_wait(CycleStage.CYCLE_WAIT, self._timeout('wait_between_cycles', self.WAIT_BETWEEN_CYCLES))
+        delay = min(self.MONITORING_POLL_INTERVAL, self._monitoring_until - now)
+        self._stage_deadline = now + delay
+        return delay
+
+    # --- Условия перехода между этапами ---
+
+    def _market_order_done(self) -> bool:
+        return self._market_order is None or not self._market_order.is_open
+
+    def _cancels_acknowledged(self) -> bool:
+        return not any(order.is_open for order in self._cancelling)
+
+    def _tp_orders_filled(self) -> bool:
+        tp_orders = self.position.tp_orders
+        return bool(tp_orders) and all(order.status == OrderStatus.FILLED for order in tp_orders)
+
+    def _update_stage(self, stage: CycleStage, journal: bool = True):
+        self.current_stage = stage
+        if journal:
+            self._journal('stage', {'stage': stage.value})
+            if stage == CycleStage.CYCLE_WAIT:
+                self._prune_closed_orders()
+                self.save_snapshot()
+                self._notify_cycle_complete()
+        if self.on_stage_change:
+            self.on_stage_change(stage.value)
+        logger.debug("Этап изменен: %s", stage.value)
+
+    def _prune_closed_orders(self):
+        """
+        Убирает исполненные и отмененные ордера из active_orders и списков позиции
+        в конце цикла, чтобы они не копились между циклами (открытые остаются).
+        """
+        with self._lock:
+            closed = [order_id for order_id, order in self.active_orders.items() if not order.is_open]
+            for order_id in closed:
+                del self.active_orders[order_id]
+            self.position.entry_orders = [order for order in self.position.entry_orders if order.is_open]
+            self.position.tp_orders = [order for order in self.position.tp_orders if order.is_open]
+            self._cancelling = []
+        if closed:
+            logger.debug("Из активных ордеров убрано закрытых: %s", len(closed))
+            self._notify_orders_update()
+
+    def _plan_ladder(self, base_price: Decimal) -> LadderPlan:
+        """План лестницы на цикл от текущего баланса"""
+        balance = as_decimal(self.exchange.get_balance('USDT'))
+        deposit_percent = as_decimal(self.config.get('deposit_percent', 99.99)) / Decimal('100')
+        dca_count = int(self.config.get('dca_count', 3))
+        martingale_coef = as_decimal(self.config.get('martingale_coef', 1))
+        dca_step_percent = as_decimal(self.config.get('dca_step_percent', 2.8))
+
+        logger.info("Параметры для входа: balance=%s, deposit_percent=%s, dca_count=%s, martingale_coef=%s",
+                    balance, deposit_percent, dca_count, martingale_coef)
+
+        plan = plan_ladder(balance * deposit_percent, base_price, dca_count, martingale_coef, dca_step_percent,
+                           self.exchange.get_fixed_filters(self.position.symbol), self.COMMISSION_RATE)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Рассчитаны доли: %s", [float(s) for s in plan.shares])
+        return plan
 
     def _create_market_order(self) -> bool:
         try:
             self._update_stage(CycleStage.MARKET_ORDER)
 
-            balance = Decimal(str(self.exchange.get_balance('USDT')))
-            deposit_percent = Decimal(str(self.config.get('deposit_percent', 99.99))) / Decimal('100')
-            dca_count = int(self.config.get('dca_count', 3))
-            martingale_coef = Decimal(str(self.config.get('martingale_coef', 1)))
-            total_deposit = balance * deposit_percent
+            self._ladder_plan = None
+            # Трасса tick-to-order: цена -> расчет объема -> отправка -> ответ биржи
+            trace = metrics.trace(self.position.symbol)
+            current_price = as_decimal(self.exchange.get_book_price(self.position.symbol, 'buy'))
+            trace.mark('price')
+            if self.risk is not None:
+                self.risk.update_price(self.position.symbol, current_price)
+            plan = self._plan_ladder(current_price)
+
+            # При зеркале стакана объем считаем по VWAP, а не по лучшей цене
+            book = self.exchange.get_depth_book(self.position.symbol)
+            expected_price = current_price
+            if book is not None:
+                estimate = book.estimate_quote_fill('buy', plan.entry.quote_amount)
+                if estimate.levels > 0:
+                    expected_price = estimate.vwap
+                    logger.info("Оценка входа по стакану: VWAP=%.8f, проскальзывание %.3f%%, уровней %s",
+                                estimate.vwap, estimate.slippage_percent, estimate.levels)
+
+            fixed = self.exchange.get_fixed_filters(self.position.symbol)
+            if expected_price != current_price:
+                plan.reprice_entry(expected_price, fixed, self.COMMISSION_RATE)
+            if not plan.entry.valid:
+                logger.error("Рассчитанное количество на %.2f USDT меньше minQty %s или minNotional %s",
+                             plan.entry.quote_amount, from_fixed(fixed.min_qty), from_fixed(fixed.min_notional))
+                return False
+            quantity = plan.entry.quantity
+            self._ladder_plan = plan
 
-            logger.info(f"Параметры для входа: balance={balance}, deposit_percent={deposit_percent}, dca_count={dca_count}, martingale_coef={martingale_coef}")
+            if self.risk is not None:
+                self.risk.check_order(self.position.symbol, 'buy', 'market', quantity)
 
-            shares = self._calculate_entry_shares(total_deposit, dca_count, martingale_coef)
-            if not shares or len(shares) < 1:
-                logger.error("Ошибка создания ордера: массив shares пустой или недостаточной длины")
-                return False
-            
-            order_size_usdt = shares[0]
-            current_price = Decimal(str(self.exchange.get_current_price(self.position.symbol)))
-            
-            # Получаем информацию о лоте
-            lot_info = self.exchange._get_symbol_lot_info(self.position.symbol)
-            min_qty = Decimal(str(lot_info['minQty']))
-            step_size = Decimal(str(lot_info['stepSize']))
-            
-            # Рассчитываем количество с учетом комиссии
-            gross_quantity = order_size_usdt / current_price
-            # Уменьшаем на комиссию
-            net_quantity = gross_quantity * (Decimal('1') - self.COMMISSION_RATE)
-            
-            # Округляем до step_size
-            quantity = (net_quantity // step_size) * step_size
-            
-            if quantity < min_qty:
-                logger.error(f"Рассчитанное количество {quantity} меньше минимального {min_qty}")
-                return False
+            self._entry_children = self._split_entry(book, quantity, expected_price, fixed)
+            self._entry_count = len(self._entry_children)
+            self._entry_price = expected_price
+            trace.mark('sizing')
+            return self._place_entry_child(trace)
 
-            logger.info(f"Создание рыночного ордера: количество={quantity}, цена~{current_price}")
+        except Exception as e:
+            logger.error("Ошибка создания ордера: %s", e)
+            return False
 
-            order_data = self.exchange.create_order(
-                symbol=self.position.symbol,
-                side='buy',
-                order_type='market',
-                quantity=quantity
-            )
+    def _place_entry_child(self, trace=None) -> bool:
+        """Отправляет очередной дочерний рыночный ордер входа"""
+        if not self._entry_children:
+            return False
+        child_quantity = self._entry_children.pop(0)
+        index = self._entry_count - len(self._entry_children)
+        try:
+            logger.info("Создание рыночного ордера: количество=%s, цена~%.8f (часть %s/%s)",
+                        child_quantity, self._entry_price, index, self._entry_count)
+
+            with metrics.span('order_ack', self.position.symbol):
+                order_data = self.exchange.create_order(
+                    symbol=self.position.symbol,
+                    side='buy',
+                    order_type='market',
+                    quantity=child_quantity
+                )
+            if trace is not None:
+                trace.total()
 
             order = Order(
-                id=order_data['id'],
+                id=str(order_data['id']),
                 symbol=self.position.symbol,
                 side='buy',
                 type='market',
-                amount=Decimal(str(order_data['amount'])),
-                status=OrderStatus.FILLED if order_data['status'] == 'FILLED' else OrderStatus.PENDING,
-                filled_amount=Decimal(str(order_data.get('filled_qty', order_data['amount']))),
-                avg_price=Decimal(str(order_data.get('avg_price', order_data['price']))),
+                amount=as_decimal(order_data['amount']),
                 created_at=time.time()
             )
 
-            self.active_orders[order.id] = order
-            self.position.entry_orders.append(order)
-            self._update_position_from_order(order)
+            self._market_order = order
+            self._register_order(order, self.position.entry_orders, order_data)
             self._notify_orders_update()
 
-            logger.info(f"Рыночный ордер создан: {order.id}, размер: {order.amount} по цене {order.avg_price}")
+            logger.info("Рыночный ордер создан: %s, размер: %s по цене %s", order.id, order.amount, order.avg_price)
             return True
 
         except Exception as e:
-            logger.error(f"Ошибка создания ордера: {e}")
+            logger.error("Ошибка создания ордера: %s", e)
+            if index > 1:
+                logger.warning("Вход остановлен: выставлено %s из %s частей", index - 1, self._entry_count)
+            self._entry_children = []
             return False
 
+    def _split_entry(self, book, quantity: Decimal, price: Decimal, fixed: FixedFilters) -> List[Decimal]:
+        """
+        Делит вход на дочерние рыночные ордера, если по стакану проскальзывание
+        превысит max_entry_slippage_percent. Без стакана или лимита - один ордер.
+        Части меньше minQty или minNotional присоединяются к соседней.
+        """
+        max_slippage = self.config.get('max_entry_slippage_percent')
+        if book is None or not max_slippage:
+            return [quantity]
+        max_children = int(self.config.get('max_entry_children', self.MAX_ENTRY_CHILDREN))
+        price_units = to_fixed(price)
+        children = [floor_to(to_fixed(child), fixed.step)
+                    for child in book.split_order('buy', quantity, as_decimal(max_slippage), max_children)]
+        children = [units for units in children if units > 0]
+        if len(children) < 2:
+            return [quantity]
+        # Остаток от округления добавляем к последнему ордеру
+        children[-1] += to_fixed(quantity) - sum(children)
+
+        merged = []
+        carry = 0
+        for units in children:
+            units += carry
+            if units >= fixed.min_qty and fixed.meets_notional(units, price_units):
+                merged.append(units)
+                carry = 0
+            else:
+                carry = units
+        if carry:
+            # Хвост не проходит фильтры сам - добавляем к предыдущей части
+            if merged:
+                merged[-1] += carry
+            else:
+                merged.append(carry)
+
+        children = [from_fixed(units) for units in merged]
+        if len(children) > 1:
+            logger.info("Вход разбит на %s ордеров: %s", len(children), ', '.join(map(str, children)))
+        return children
+
     def _create_dca_orders(self):
         try:
             self._update_stage(CycleStage.DCA_ORDERS)
 
-            balance = Decimal(str(self.exchange.get_balance('USDT')))
-            deposit_percent = Decimal(str(self.config.get('deposit_percent', 99.99))) / Decimal('100')
-            dca_count = int(self.config.get('dca_count', 3))
-            martingale_coef = Decimal(str(self.config.get('martingale_coef', 1)))
-            dca_step_percent = Decimal(str(self.config.get('dca_step_percent', 2.8))) / Decimal('100')
-            total_deposit = balance * deposit_percent
-
-            shares = self._calculate_entry_shares(total_deposit, dca_count, martingale_coef)
-            current_price = Decimal(str(self.exchange.get_current_price(self.position.symbol)))
-            
-            # Получаем информацию о лоте
-            lot_info = self.exchange._get_symbol_lot_info(self.position.symbol)
-            min_qty = Decimal(str(lot_info['minQty']))
-            step_size = Decimal(str(lot_info['stepSize']))
-
-            if len(shares) < 2:
-                logger.error(f"Недостаточно долей для выставления DCA. len(shares)={len(shares)} (min 2 нужно).")
-                return
-
-            max_dca = min(dca_count, len(shares) - 1)
-            for i in range(1, max_dca + 1):
-                dca_price = current_price * (Decimal('1') - dca_step_percent * Decimal(str(i)))
-                dca_amount_usdt = shares[i]
-                
-                # Рассчитываем количество с учетом комиссии
-                gross_quantity = dca_amount_usdt / dca_price
-                net_quantity = gross_quantity * (Decimal('1') - self.COMMISSION_RATE)
-                dca_amount_coins = (net_quantity // step_size) * step_size
-
-                if dca_amount_coins < min_qty:
-                    logger.warning(f"DCA ордер {i} не создан: рассчитано количество монет {dca_amount_coins} < minQty {min_qty}")
-                    continue
-
-                try:
-                    order_data = self.exchange.create_order(
-                        symbol=self.position.symbol,
-                        side='buy',
-                        order_type='limit',
-                        quantity=dca_amount_coins,
-                        price=dca_price
-                    )
-                except Exception as e:
-                    logger.error(f"Ошибка создания DCA ордера {i}: {e}")
-                    continue
+            # План считается при входе; после восстановления состояния его нет - считаем заново
+            plan = self._ladder_plan
+            if plan is None:
+                current_price = as_decimal(self.exchange.get_current_price(self.position.symbol))
+                if self.risk is not None:
+                    self.risk.update_price(self.position.symbol, current_price)
+                plan = self._ladder_plan = self._plan_ladder(current_price)
 
-                order = Order(
-                    id=order_data['id'],
-                    symbol=self.position.symbol,
-                    side='buy',
-                    type='limit',
-                    amount=Decimal(str(order_data['amount'])),
-                    price=dca_price,
-                    status=OrderStatus.PENDING if order_data['status'] == 'NEW' else OrderStatus.FILLED,
-                    filled_amount=Decimal(str(order_data.get('filled_qty', 0))),
-                    avg_price=Decimal(str(order_data.get('avg_price', dca_price))),
-                    created_at=time.time()
-                )
+            if not plan.dca:
+                logger.error("Недостаточно долей для выставления DCA (dca_count=0)")
+                return
 
-                self.active_orders[order.id] = order
-                self.position.entry_orders.append(order)
+            for level in plan.dca:
+                if not level.valid:
+                    logger.warning("DCA ордер %s не создан: на %.2f USDT меньше minQty или minNotional",
+                                   level.index, level.quote_amount)
 
-            logger.info(f"Создано DCA ордеров: {max_dca}")
+            created = self._place_orders(lambda filled: self._dca_levels(plan, filled),
+                                         self.position.entry_orders, 'DCA')
+            logger.info("Создано DCA ордеров: %s", created)
             self._notify_orders_update()
 
         except Exception as e:
-            logger.error(f"Ошибка создания DCA ордеров: {e}")
+            logger.error("Ошибка создания DCA ордеров: %s", e)
+
+    def _dca_levels(self, plan: LadderPlan, filled: Dict[int, Decimal]) -> List[tuple]:
+        """
+        Уровни DCA из плана цикла. filled - объемы, исполненные по уровням
+        в откаченных попытках: повтор докупает только остаток уровня.
+        """
+        fixed = self.exchange.get_fixed_filters(self.position.symbol)
+        levels = []
+        for level in plan.dca:
+            if not level.valid:
+                continue
+            quantity = level.quantity
+            if filled.get(level.index):
+                units = fixed.round_quantity(to_fixed(quantity - filled[level.index]))
+                if not units or not fixed.meets_notional(units, to_fixed(level.price)):
+                    continue
+                quantity = from_fixed(units)
+            levels.append((level.index, OrderRequest(self.position.symbol, 'buy', 'limit', quantity, level.price)))
+        return levels
 
     def _create_tp_orders(self):
         try:
             self._update_stage(CycleStage.TP_ORDERS)
+            created = self._place_orders(self._tp_levels, self.position.tp_orders, 'TP')
+            logger.info("Создано TP ордеров: %s", created)
+            self._notify_orders_update()
 
-            if self.position.size <= 0:
-                logger.warning("Нет позиции для создания TP ордеров")
-                return
-
-            tp_levels = [
-                {'percent': Decimal(str(self.config.get('tp1_percent', 1.9))), 'volume': Decimal(str(self.config.get('tp1_volume', 33)))},
-                {'percent': Decimal(str(self.config.get('tp2_percent', 3.4))), 'volume': Decimal(str(self.config.get('tp2_volume', 33)))},
-                {'percent': Decimal(str(self.config.get('tp3_percent', 4.9))), 'volume': Decimal(str(self.config.get('tp3_volume', 33)))}
-            ]
-
-            # Получаем информацию о лоте
-            lot_info = self.exchange._get_symbol_lot_info(self.position.symbol)
-            min_qty = Decimal(str(lot_info['minQty']))
-            step_size = Decimal(str(lot_info['stepSize']))
-
-            for i, tp_level in enumerate(tp_levels, 1):
-                # Учитываем комиссию при расчете TP цены
-                tp_price = self.position.avg_price * (Decimal('1') + tp_level['percent'] / Decimal('100') + self.COMMISSION_RATE)
-                tp_amount = self.position.size * tp_level['volume'] / Decimal('100')
-                tp_amount = (tp_amount // step_size) * step_size
-
-                if tp_amount < min_qty:
-                    logger.warning(f"TP ордер {i} не создан: рассчитано количество монет {tp_amount} < minQty {min_qty}")
-                    continue
+        except Exception as e:
+            logger.error("Ошибка создания TP ордеров: %s", e)
 
+    def _tp_levels(self, filled: Dict[int, Decimal] = None) -> List[tuple]:
+        """
+        Уровни TP от текущей позиции. Считаются заново на каждой попытке: продажи,
+        исполненные в откаченной попытке, уже уменьшили позицию.
+        """
+        # Объем, который еще продают TP с неподтвержденной отменой, повторно не выставляем
+        with self._lock:
+            reserved = sum((order.amount - order.filled_amount for order in self.position.tp_orders
+                            if order.is_open), Decimal('0'))
+            free_size = self.position.size - reserved
+            avg_price = self.position.avg_price
+        if free_size <= 0:
+            logger.warning("Нет позиции для создания TP ордеров")
+            return []
+        if reserved > 0:
+            logger.warning("TP ордера с неподтвержденной отменой продают %s, новая лестница на %s",
+                           reserved, free_size)
+
+        tp_levels = [
+            {'percent': Decimal(str(self.config.get('tp1_percent', 1.9))), 'volume': Decimal(str(self.config.get('tp1_volume', 33)))},
+            {'percent': Decimal(str(self.config.get('tp2_percent', 3.4))), 'volume': Decimal(str(self.config.get('tp2_volume', 33)))},
+            {'percent': Decimal(str(self.config.get('tp3_percent', 4.9))), 'volume': Decimal(str(self.config.get('tp3_volume', 33)))}
+        ]
+
+        fixed = self.exchange.get_fixed_filters(self.position.symbol)
+        position_units = to_fixed(free_size)
+
+        levels = []
+        # Объем уровней ниже minQty/minNotional переносится на следующий уровень
+        carry = 0
+        for i, tp_level in enumerate(tp_levels, 1):
+            # Учитываем комиссию при расчете TP цены
+            tp_price = avg_price * (Decimal('1') + tp_level['percent'] / Decimal('100') + self.COMMISSION_RATE)
+            tp_units = floor_to(position_units * int(tp_level['volume'] * 100) // 10000 + carry, fixed.step)
+
+            if tp_units < fixed.min_qty or not fixed.meets_notional(tp_units, to_fixed(tp_price)):
+                logger.warning("TP ордер %s: %s%% позиции ниже minQty %s / minNotional %s, объем перенесен",
+                               i, tp_level['volume'], from_fixed(fixed.min_qty), from_fixed(fixed.min_notional))
+                carry = tp_units
+                continue
+
+            carry = 0
+            levels.append((i, OrderRequest(self.position.symbol, 'sell', 'limit',
+                                           from_fixed(fixed.round_quantity(tp_units)), tp_price)))
+
+        if carry and levels:
+            # Хвост последних уровней добавляем к последнему выставляемому
+            i, request = levels[-1]
+            quantity = from_fixed(fixed.round_quantity(to_fixed(request.quantity) + carry))
+            levels[-1] = (i, OrderRequest(request.symbol, 'sell', 'limit', quantity, request.price))
+        elif carry:
+            logger.warning("TP не созданы: позиция %s дешевле minNotional %s", free_size, from_fixed(fixed.min_notional))
+        return levels
+
+    def _place_orders(self, build_levels: Callable[[Dict[int, Decimal]], List[tuple]],
+                      bucket: List[Order], label: str) -> int:
+        """
+        Выставляет лестницу лимитных ордеров: все уровни уходят на биржу одновременно.
+        Лестница выставляется целиком или никак - если какой-то уровень не принят,
+        уже выставленные отменяются и попытка повторяется.
+        build_levels(filled) возвращает пары (номер уровня, OrderRequest); перед повтором
+        уровни строятся заново с учетом объемов, исполненных в откаченной попытке.
+        Возвращает число созданных ордеров.
+        """
+        filled: Dict[int, Decimal] = {}
+        retries = int(self.config.get('ladder_retries', self.LADDER_RETRIES))
+        for attempt in range(retries + 1):
+            levels = build_levels(filled)
+            if not levels:
+                return 0
+            if self.risk is not None:
                 try:
-                    order_data = self.exchange.create_order(
-                        symbol=self.position.symbol,
-                        side='sell',
-                        order_type='limit',
-                        quantity=tp_amount,
-                        price=tp_price
-                    )
-                except Exception as e:
-                    logger.error(f"Ошибка создания TP ордера {i}: {e}")
-                    continue
-
-                order = Order(
-                    id=order_data['id'],
-                    symbol=self.position.symbol,
-                    side='sell',
-                    type='limit',
-                    amount=Decimal(str(order_data['amount'])),
-                    price=tp_price,
-                    status=OrderStatus.PENDING if order_data['status'] == 'NEW' else OrderStatus.FILLED,
-                    filled_amount=Decimal(str(order_data.get('filled_qty', 0))),
-                    avg_price=Decimal(str(order_data.get('avg_price', tp_price))),
-                    created_at=time.time()
-                )
+                    self.risk.check_orders(self.position.symbol, [
+                        (request.side, request.order_type, request.quantity, request.price) for _, request in levels
+                    ])
+                except RiskCheckError as e:
+                    logger.error("Лестница %s отклонена риск-контролем: %s", label, e)
+                    return 0
+            placed, failed = self._submit_ladder(levels, bucket, label)
+            if not failed:
+                return len(placed)
+            self._rollback_ladder(placed, bucket, label)
+            for i, order in placed:
+                # Ордер с неудачной отменой остается на бирже целиком - уровень им уже покрыт
+                covered = order.amount if order.is_open else order.filled_amount
+                if covered > 0:
+                    filled[i] = filled.get(i, Decimal('0')) + covered
+            if self.hard_stop_requested:
+                break
+            if attempt < retries:
+                logger.warning("Лестница %s: не выставлено уровней %s, повтор", label, failed)
+        logger.error("Лестница %s не выставлена", label)
+        return 0
+
+    def _submit_ladder(self, levels: List[tuple], bucket: List[Order], label: str) -> tuple:
+        """Возвращает пары (номер уровня, Order) принятых ордеров и число отклоненных"""
+        results = self.exchange.create_orders([request for _, request in levels])
+        placed: List[tuple] = []
+        failed = 0
+        for (i, request), order_data in zip(levels, results):
+            if isinstance(order_data, Exception):
+                logger.error("Ошибка создания %s ордера %s: %s", label, i, order_data)
+                failed += 1
+                continue
 
-                self.active_orders[order.id] = order
-                self.position.tp_orders.append(order)
+            order = Order(
+                id=str(order_data['id']),
+                symbol=request.symbol,
+                side=request.side,
+                type=request.order_type,
+                amount=as_decimal(order_data['amount']),
+                price=request.price,
+                created_at=time.time()
+            )
 
-            logger.info(f"Создано TP ордеров: {len(self.position.tp_orders)}")
-            self._notify_orders_update()
+            self._register_order(order, bucket, order_data)
+            placed.append((i, order))
+        return placed, failed
 
-        except Exception as e:
-            logger.error(f"Ошибка создания TP ордеров: {e}")
+    def _rollback_ladder(self, placed: List[tuple], bucket: List[Order], label: str):
+        """
+        Отменяет выставленную часть лестницы. Ответ на отмену применяется к ордеру,
+        поэтому успевшие исполниться объемы попадают в позицию. Закрытые ордера
+        убираются из списка лестницы; ордер, состояние которого не удалось
+        узнать, остается в нем до сверки.
+        """
+        open_orders = [order for _, order in placed if order.is_open]
+        if open_orders:
+            results = self.exchange.cancel_orders([(order.id, order.symbol) for order in open_orders])
+            failed = []
+            for order, result in zip(open_orders, results):
+                if isinstance(result, Exception):
+                    logger.error("Откат %s: не удалось отменить ордер %s: %s", label, order.id, result)
+                    failed.append(order)
+                    continue
+                self._apply_order_info(order, result)
+            # Отмена не прошла - ордер мог успеть исполниться; повтор считается от его фактического состояния
+            if failed:
+                infos = self.exchange.get_orders_info([(order.id, order.symbol) for order in failed])
+                for order, info in zip(failed, infos):
+                    if isinstance(info, Exception):
+                        # Ордер остается активным, его состояние уточнит сверка
+                        continue
+                    self._apply_order_info(order, info)
+            logger.info("Откат %s: отменено ордеров %s", label, len(open_orders) - len(failed))
+        with self._lock:
+            dropped = [order for _, order in placed if not order.is_open and order in bucket]
+            for order in dropped:
+                bucket.remove(order)
+            if dropped:
+                self._journal('orders_dropped', {'ids': [order.id for order in dropped]})
 
     def _cancel_tp_orders(self):
+        """
+        Отменяет открытые TP перед пересчетом лестницы. Ответ на отмену применяется
+        к ордеру, поэтому исполненный до отмены объем попадает в позицию. Ордера,
+        отмену которых биржа не подтвердила, остаются в tp_orders и _cancelling,
+        пока их итоговый статус не придет из потока или сверки.
+        """
         try:
-            for order in self.position.tp_orders:
-                if order.status == OrderStatus.PENDING:
-                    try:
-                        self.exchange.cancel_order(order.id, order.symbol)
-                        order.status = OrderStatus.CANCELLED
-                        logger.info(f"TP ордер отменен: {order.id}")
-                    except Exception as e:
-                        logger.error(f"Ошибка отмены TP ордера {order.id}: {e}")
-            
-            # Очищаем список TP ордеров
-            self.position.tp_orders.clear()
+            open_orders = [order for order in self.position.tp_orders if order.is_open]
+            if open_orders:
+                results = self.exchange.cancel_orders([(order.id, order.symbol) for order in open_orders])
+                for order, result in zip(open_orders, results):
+                    if isinstance(result, Exception):
+                        logger.error("Ошибка отмены TP ордера %s: %s", order.id, result)
+                        continue
+                    self._apply_order_info(order, result)
+                    logger.info("TP ордер отменен: %s", order.id)
+
+            # Закрытые TP убираем, неотмененные остаются до подтверждения
+            with self._lock:
+                self._cancelling = [order for order in open_orders if order.is_open]
+                self.position.tp_orders = [order for order in self.position.tp_orders if order.is_open]
+                self._journal('tp_cleared', {'keep': [order.id for order in self.position.tp_orders]})
             self._notify_orders_update()
-            
+
         except Exception as e:
-            logger.error(f"Ошибка отмены TP ордеров: {e}")
+            logger.error("Ошибка отмены TP ордеров: %s", e)
 
-    def _update_position_from_order(self, order: Order):
-        if order.status != OrderStatus.FILLED:
-            return
+    def _register_order(self, order: Order, bucket: List[Order], order_data: dict):
+        """
+        Регистрирует созданный ордер и применяет к нему ответ биржи.
+        События исполнения, пришедшие из потока раньше ответа на создание, применяются сразу после.
+        """
+        with self._lock:
+            if not order.acked_ns:
+                order.acked_ns = time.perf_counter_ns()
+            self.active_orders[order.id] = order
+            bucket.append(order)
+            self._apply_order_info(order, order_data)
+            event = self._unmatched_events.pop(order.id, None)
+            if event is not None:
+                self._apply_execution_report(order, event)
+            self._journal('order', self._order_state(order))
+
+    def _apply_order_info(self, order: Order, order_info: dict) -> bool:
+        """Применяет к ордеру данные REST-ответа биржи (create/get_order_info)"""
+        status = EXCHANGE_STATUS_MAP.get(order_info.get('status'), order.status)
+        default_filled = order.amount if status == OrderStatus.FILLED else order.filled_amount
+        filled_amount = as_decimal(order_info.get('filled_qty', default_filled))
+        avg_price = as_decimal(order_info.get('avg_price') or order_info.get('price') or order.price or 0)
+        return self._apply_order_update(order, status, filled_amount, avg_price)
+
+    def _apply_execution_report(self, order: Order, event: dict) -> bool:
+        """Применяет к ордеру событие executionReport из пользовательского потока"""
+        status = EXCHANGE_STATUS_MAP.get(event.get('X'), order.status)
+        filled_amount = Decimal(event.get('z', '0'))
+        quote_amount = Decimal(event.get('Z', '0'))
+        avg_price = quote_amount / filled_amount if filled_amount > 0 else order.avg_price
+        return self._apply_order_update(order, status, filled_amount, avg_price)
+
+    def _apply_order_update(self, order: Order, status: OrderStatus, filled_amount: Decimal, avg_price: Decimal) -> bool:
+        """
+        Единая точка изменения состояния ордера.
+        В позицию попадает только прирост исполненного объема, поэтому повторные
+        и запоздалые обновления (поток + REST-сверка) не учитываются дважды.
+        """
+        with self._lock:
+            if not order.is_open:
+                return False
+            if filled_amount < order.filled_amount:
+                # Устаревшее обновление пришло после более свежего
+                return False
 
-        if order.side == 'buy':
-            # Если позиции не было - просто устанавливаем значения
-            if self.position.size == 0:
-                self.position.size = order.filled_amount
-                self.position.avg_price = order.avg_price
-            else:
-                total_cost = self.position.size * self.position.avg_price + order.filled_amount * order.avg_price
-                self.position.size += order.filled_amount
-                # Защита от деления на ноль
-                if self.position.size > 0:
-                    self.position.avg_price = total_cost / self.position.size
+            fill_qty = filled_amount - order.filled_amount
+            fill_price = Decimal('0')
+            if fill_qty > 0:
+                fill_cost = filled_amount * avg_price - order.filled_amount * order.avg_price
+                fill_price = fill_cost / fill_qty
+
+            changed = fill_qty > 0 or status != order.status
+            order.status = status
+            order.filled_amount = filled_amount
+            if filled_amount > 0:
+                order.avg_price = avg_price
+
+            if fill_qty > 0:
+                self._apply_fill(order.side, fill_qty, fill_price)
+                if order.status == OrderStatus.FILLED:
+                    logger.info("Ордер %s исполнен: %s по цене %s", order.id, order.filled_amount, order.avg_price)
+                    if order.acked_ns:
+                        metrics.observe_ns(f'fill_{order.type}', time.perf_counter_ns() - order.acked_ns, order.symbol)
+            if changed:
+                self._journal('order', self._order_state(order))
+                self._wake()
+            return changed
+
+    def _apply_fill(self, side: str, quantity: Decimal, price: Decimal):
+        with self._lock:
+            if side == 'buy':
+                # Если позиции не было - просто устанавливаем значения
+                if self.position.size == 0:
+                    self.position.size = quantity
+                    self.position.avg_price = price
                 else:
+                    total_cost = self.position.size * self.position.avg_price + quantity * price
+                    self.position.size += quantity
+                    # Защита от деления на ноль
+                    if self.position.size > 0:
+                        self.position.avg_price = total_cost / self.position.size
+                    else:
+                        self.position.avg_price = Decimal('0')
+
+            elif side == 'sell':
+                self.position.size -= quantity
+                # После продажи всей позиции сбрасываем среднюю цену
+                if self.position.size <= 0:
+                    self.position.size = Decimal('0')
                     self.position.avg_price = Decimal('0')
 
-        elif order.side == 'sell':
-            self.position.size -= order.filled_amount
-            # После продажи всей позиции сбрасываем среднюю цену
-            if self.position.size <= 0:
-                self.position.size = Decimal('0')
-                self.position.avg_price = Decimal('0')
+            self._journal('position', {'size': str(self.position.size), 'avg_price': str(self.position.avg_price)})
 
+        self._notify_fill(side, quantity, price)
         self._notify_position_update()
-        logger.info(f"Позиция обновлена: размер={self.position.size}, средняя цена={self.position.avg_price}")
+        logger.info("Позиция обновлена: размер=%s, средняя цена=%s", self.position.size, self.position.avg_price)
 
-    def _wait_with_stop_check(self, seconds: int) -> bool:
-        for _ in range(seconds):
-            if self.hard_stop_requested or not self._running:
-                return False
-            time.sleep(1)
+    # --- Журнал состояния и восстановление ---
+
+    def attach_state_store(self, store):
+        """
+        Подключает журнал состояния. Изменения ордеров, позиции и этапа
+        пишутся в него асинхронно, в конце каждого цикла сохраняется снимок.
+        """
+        self.state_store = store
+
+    def _journal(self, kind: str, payload: dict):
+        store = self.state_store
+        if store is None:
+            return
+        store.record(self.position.symbol, kind, payload)
+        if store.needs_snapshot(self.position.symbol):
+            self.save_snapshot()
+
+    def save_snapshot(self):
+        store = self.state_store
+        if store is None:
+            return
+        # Снимок ставится в очередь под той же блокировкой, под которой поток исполнений
+        # журналирует события: событие не окажется ни в снимке, ни после него в журнале
+        with self._lock:
+            store.snapshot(self.position.symbol, self._snapshot_state())
+
+    def _snapshot_state(self) -> dict:
+        with self._lock:
+            return {
+                'stage': self.current_stage.value,
+                'position': {'size': str(self.position.size), 'avg_price': str(self.position.avg_price)},
+                'entry_orders': [self._order_state(order) for order in self.position.entry_orders],
+                'tp_orders': [self._order_state(order) for order in self.position.tp_orders]
+            }
+
+    @staticmethod
+    def _order_state(order: Order) -> dict:
+        return {
+            'id': order.id,
+            'symbol': order.symbol,
+            'side': order.side,
+            'type': order.type,
+            'amount': str(order.amount),
+            'price': str(order.price) if order.price is not None else None,
+            'status': order.status.value,
+            'filled_amount': str(order.filled_amount),
+            'avg_price': str(order.avg_price),
+            'created_at': order.created_at
+        }
+
+    @staticmethod
+    def _order_from_state(state: dict) -> Order:
+        return Order(
+            id=state['id'],
+            symbol=state['symbol'],
+            side=state['side'],
+            type=state['type'],
+            amount=Decimal(state['amount']),
+            price=Decimal(state['price']) if state['price'] is not None else None,
+            status=OrderStatus(state['status']),
+            filled_amount=Decimal(state['filled_amount']),
+            avg_price=Decimal(state['avg_price']),
+            created_at=state['created_at']
+        )
+
+    def recover_state(self) -> bool:
+        """
+        Восстанавливает позицию, ордера и этап цикла из журнала (снимок + события после него)
+        и сверяет ордера с биржей. Вызывается до start(). Возвращает False, если состояния нет.
+        """
+        if self.state_store is None or self._running:
+            return False
+        snapshot, events = self.state_store.load(self.position.symbol)
+        if snapshot is None and not events:
+            return False
+
+        with self._lock:
+            entry_orders: Dict[str, Order] = {}
+            tp_orders: Dict[str, Order] = {}
+            stage = CycleStage.IDLE
+            if snapshot is not None:
+                stage = CycleStage(snapshot['stage'])
+                self.position.size = Decimal(snapshot['position']['size'])
+                self.position.avg_price = Decimal(snapshot['position']['avg_price'])
+                entry_orders = {s['id']: self._order_from_state(s) for s in snapshot['entry_orders']}
+                tp_orders = {s['id']: self._order_from_state(s) for s in snapshot['tp_orders']}
+
+            for kind, payload in events:
+                if kind == 'order':
+                    bucket = tp_orders if payload['side'] == 'sell' else entry_orders
+                    bucket[payload['id']] = self._order_from_state(payload)
+                elif kind == 'position':
+                    self.position.size = Decimal(payload['size'])
+                    self.position.avg_price = Decimal(payload['avg_price'])
+                elif kind == 'stage':
+                    stage = CycleStage(payload['stage'])
+                elif kind == 'tp_cleared':
+                    keep = set(payload.get('keep', ()))
+                    tp_orders = {order_id: order for order_id, order in tp_orders.items() if order_id in keep}
+                elif kind == 'orders_dropped':
+                    for order_id in payload['ids']:
+                        entry_orders.pop(order_id, None)
+                        tp_orders.pop(order_id, None)
+
+            self.position.entry_orders = list(entry_orders.values())
+            self.position.tp_orders = list(tp_orders.values())
+            self.active_orders = {order.id: order for order in self.position.entry_orders + self.position.tp_orders}
+            market_orders = [order for order in self.position.entry_orders if order.type == 'market']
+            self._market_order = market_orders[-1] if market_orders else None
+            self._resume_stage = stage
+            self.current_stage = stage
+
+        logger.info("Состояние %s восстановлено: этап %s, позиция %s по %s, ордеров %s",
+                    self.position.symbol, stage.value, self.position.size, self.position.avg_price,
+                    len(self.active_orders))
+        # Исполнения, пропущенные за время простоя, подтягиваются сверкой с биржей
+        self.update_orders_status()
+        self.save_snapshot()
+        self._notify_position_update()
+        self._notify_orders_update()
         return True
 
+    def _resume(self, stage: CycleStage):
+        """Продолжение цикла с восстановленного этапа"""
+        # Сбой посреди выставления: лестницу DCA не повторяем (могли уйти дубли),
+        # а TP пересобираем от фактической позиции
+        if stage in (CycleStage.DCA_ORDERS, CycleStage.TP_ORDERS):
+            stage = CycleStage.WAITING_DCA
+        elif stage == CycleStage.MARKET_ORDER:
+            stage = CycleStage.WAITING_MARKET if self.position.size > 0 else CycleStage.IDLE
+        self.current_stage = stage
+        if stage == CycleStage.MONITORING:
+            self._monitoring_until = time.monotonic() + self._timeout('monitoring_duration', self.MONITORING_DURATION)
+            self._stage_condition = self._tp_orders_filled
+        elif stage == CycleStage.WAITING_TP_CANCEL:
+            self._cancelling = [order for order in self.position.tp_orders if order.is_open]
+
+    def attach_user_stream(self, stream):
+        """
+        Подключает поток исполнений ордеров. Пока поток подключен, мониторинг
+        не опрашивает биржу по каждому ордеру, а сверка через REST выполняется
+        только после переподключения.
+        """
+        self.user_stream = stream
+        stream.add_listener(self._on_user_event)
+        stream.add_reconnect_listener(self._on_stream_reconnect)
+
+    def _stream_connected(self) -> bool:
+        return self.user_stream is not None and self.user_stream.is_connected()
+
+    def _on_user_event(self, event: dict):
+        if event.get('e') != 'executionReport' or event.get('s') != self.position.symbol:
+            return
+        order_id = str(event.get('i'))
+        with self._lock:
+            order = self.active_orders.get(order_id)
+            if order is None:
+                # Ответ на создание ордера еще не получен - применим событие при регистрации
+                if len(self._unmatched_events) >= self.MAX_UNMATCHED_EVENTS:
+                    self._unmatched_events.pop(next(iter(self._unmatched_events)))
+                self._unmatched_events[order_id] = event
+                return
+            changed = self._apply_execution_report(order, event)
+        if changed:
+            self._notify_orders_update()
+
+    def _on_stream_reconnect(self):
+        logger.info("Поток исполнений переподключен - сверка ордеров через REST")
+        self.update_orders_status()
+
+    def _wait_with_stop_check(self, seconds: float) -> bool:
+        """
+        Ждет до seconds секунд. Возвращается раньше при событии ордера или остановке.
+        """
+        if self._wakeup.wait(seconds):
+            self._wakeup.clear()
+        return not self.hard_stop_requested and self._running
+
+    def _notify_fill(self, side: str, quantity: Decimal, price: Decimal):
+        if self.on_fill:
+            try:
+                # Комиссия оценивается по ставке с запасом
+                self.on_fill(self.position.symbol, side, quantity, price, quantity * price * self.COMMISSION_RATE)
+            except Exception as e:
+                logger.error("Ошибка обработки исполнения: %s", e)
+
+    def _notify_cycle_complete(self):
+        if self.on_cycle_complete:
+            try:
+                self.on_cycle_complete(self.position.symbol)
+            except Exception as e:
+                logger.error("Ошибка обработки конца цикла: %s", e)
+
+    def attach_risk_engine(self, risk):
+        """Подключает риск-контроль: ордера проверяются до отправки на биржу"""
+        self.risk = risk
+        risk.register(self)
+        self._sync_risk()
+
+    def _sync_risk(self):
+        """Передает риск-контролю текущую экспозицию: позиция + открытые покупки"""
+        if self.risk is None:
+            return
+        with self._lock:
+            notional = self.position.size * self.position.avg_price
+            for order in self.position.entry_orders:
+                if order.is_open and order.price is not None:
+                    notional += (order.amount - order.filled_amount) * order.price
+        self.risk.update_exposure(self.position.symbol, notional)
+
     def _notify_position_update(self):
+        self._sync_risk()
         if self.on_position_update:
             self.on_position_update(self.position)
 
     def _notify_orders_update(self):
+        self._sync_risk()
         if self.on_orders_update:
             self.on_orders_update(list(self.active_orders.values()))
 
-    def update_orders_status(self):
+    def update_orders_status(self, batched: bool = True):
+        """
+        Сверяет статусы открытых ордеров с биржей.
+        В пакетном режиме делается один снимок openOrders (и при необходимости allOrders)
+        на символ вместо запроса по каждому ордеру.
+        """
+        if batched and hasattr(self.exchange, 'get_open_orders'):
+            self._reconcile_orders_batched()
+            return
         try:
             orders_updated = False
             for order_id, order in list(self.active_orders.items()):
-                if order.status == OrderStatus.PENDING:
+                if order.is_open:
                     try:
                         order_info = self.exchange.get_order_info(order_id, order.symbol)
-                        if order_info:
-                            if order_info['status'] == 'FILLED':
-                                order.status = OrderStatus.FILLED
-                                order.filled_amount = Decimal(str(order_info.get('filled_qty', order.amount)))
-                                order.avg_price = Decimal(str(order_info.get('avg_price', order.price or 0)))
-                                self._update_position_from_order(order)
-                                orders_updated = True
-                                logger.info(f"Ордер {order_id} исполнен: {order.filled_amount} по цене {order.avg_price}")
-                            elif order_info['status'] == 'CANCELED':
-                                order.status = OrderStatus.CANCELLED
-                                orders_updated = True
+                        if order_info and self._apply_order_info(order, order_info):
+                            orders_updated = True
                     except Exception as e:
-                        logger.error(f"Ошибка обновления статуса ордера {order_id}: {e}")
+                        logger.error("Ошибка обновления статуса ордера %s: %s", order_id, e)
+
+            if orders_updated:
+                self._notify_orders_update()
+                self._notify_position_update()
+
+        except Exception as e:
+            logger.error("Ошибка обновления статусов ордеров: %s", e)
+
+    def _reconcile_orders_batched(self):
+        try:
+            orders_by_symbol: Dict[str, List[Order]] = {}
+            for order in list(self.active_orders.values()):
+                if order.is_open:
+                    orders_by_symbol.setdefault(order.symbol, []).append(order)
+
+            orders_updated = False
+            for symbol, orders in orders_by_symbol.items():
+                try:
+                    snapshot = {str(o['id']): o for o in self.exchange.get_open_orders(symbol)}
+
+                    # Ордера, которых нет среди открытых, ищем в истории - там их итоговый статус
+                    closed_orders = [order for order in orders if order.id not in snapshot]
+                    if closed_orders:
+                        start_time = min(order.created_at for order in closed_orders) - self.RECONCILE_TIME_MARGIN
+                        history = self.exchange.get_all_orders(symbol, start_time=int(start_time * 1000))
+                        for order_info in history:
+                            snapshot.setdefault(str(order_info['id']), order_info)
+
+                    for order in orders:
+                        order_info = snapshot.get(order.id)
+                        if order_info is None:
+                            logger.warning("Ордер %s не найден на бирже при сверке", order.id)
+                            continue
+                        if self._apply_order_info(order, order_info):
+                            orders_updated = True
+                except Exception as e:
+                    logger.error("Ошибка пакетной сверки ордеров %s: %s", symbol, e)
 
             if orders_updated:
                 self._notify_orders_update()
                 self._notify_position_update()
 
         except Exception as e:
-            logger.error(f"Ошибка обновления статусов ордеров: {e}")
+            logger.error("Ошибка обновления статусов ордеров: %s", e)
 
     def _monitor_orders_during_cycle(self):
         try:
-            for order in self.position.entry_orders:
-                if order.status == OrderStatus.PENDING:
-                    if self.exchange.is_order_filled(order.id, order.symbol):
-                        order_info = self.exchange.get_order_info(order.id, order.symbol)
-                        if order_info:
-                            order.status = OrderStatus.FILLED
-                            order.filled_amount = Decimal(str(order_info.get('filled_qty', order.amount)))
-                            order.avg_price = Decimal(str(order_info.get('avg_price', order.price or 0)))
-                            self._update_position_from_order(order)
-                            logger.info(f"DCA ордер исполнен: {order.id}")
-            for order in self.position.tp_orders:
-                if order.status == OrderStatus.PENDING:
-                    if self.exchange.is_order_filled(order.id, order.symbol):
-                        order_info = self.exchange.get_order_info(order.id, order.symbol)
-                        if order_info:
-                            order.status = OrderStatus.FILLED
-                            order.filled_amount = Decimal(str(order_info.get('filled_qty', order.amount)))
-                            order.avg_price = Decimal(str(order_info.get('avg_price', order.price or 0)))
-                            self._update_position_from_order(order)
-                            logger.info(f"TP ордер исполнен: {order.id}")
+            # Исполнения приходят из потока - опрашивать биржу не нужно
+            if self._stream_connected():
+                return
+            if hasattr(self.exchange, 'get_open_orders'):
+                self._reconcile_orders_batched()
+            else:
+                orders_updated = False
+                for order in self.position.entry_orders + self.position.tp_orders:
+                    if not order.is_open:
+                        continue
+                    # Один запрос на ордер: статус и исполненный объем берутся из того же ответа
+                    order_info = self.exchange.get_order_info(order.id, order.symbol)
+                    if order_info and self._apply_order_info(order, order_info):
+                        orders_updated = True
+                if orders_updated:
+                    self._notify_orders_update()
         except Exception as e:
-            logger.error(f"Ошибка мониторинга ордеров: {e}")
+            logger.error("Ошибка мониторинга ордеров: %s", e)
+
+    def get_status(self) -> dict:
         return {
             'running': self._running,
             'soft_stop': self.soft_stop_enabled,
@@ -1,6 +1,8 @@
 import logging
 from decimal import Decimal
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional
+
+from utils.fixed_point import as_decimal
 
 class PositionManager:
     # Комиссия биржи с запасом
@@ -8,6 +10,8 @@ class PositionManager:
     
     def __init__(self):
         self.logger = logging.getLogger("PositionManager")
+        # on_fill(side, qty, price, fee) - для статистики исполнений
+        self.on_fill: Optional[Callable] = None
         self.reset_position()
 
     def reset_position(self):
@@ -25,8 +29,8 @@ class PositionManager:
         price: цена исполнения
         """
         try:
-            qty = Decimal(str(qty))
-            price = Decimal(str(price))
+            qty = as_decimal(qty)
+            price = as_decimal(price)
             
             if qty > 0:  # Покупка
                 # Учитываем комиссию при покупке
@@ -67,6 +71,10 @@ class PositionManager:
                     self.total_cost = Decimal('0')
                 else:
                     self.total_cost -= cost_basis
+
+            if self.on_fill and qty != 0:
+                side = 'buy' if qty > 0 else 'sell'
+                self.on_fill(side, abs(qty), price, abs(qty) * price * self.COMMISSION_RATE)
                     
             self.logger.info(f"Позиция обновлена: qty={self.position_qty}, avg_entry_price={self.avg_entry_price}, realized_pnl={self.realized_pnl}")
             
@@ -121,7 +129,7 @@ class PositionManager:
             if self.position_qty <= 0:
                 return Decimal('0')
                 
-            current_price = Decimal(str(current_price))
+            current_price = as_decimal(current_price)
             
             # Текущая стоимость позиции с учетом комиссии при продаже
             current_value = current_price * self.position_qty * (Decimal('1') - self.COMMISSION_RATE)
@@ -167,8 +175,8 @@ class PositionManager:
         """
         dca_levels = []
         try:
-            current_price = Decimal(str(current_price))
-            available_usdt = Decimal(str(available_usdt))
+            current_price = as_decimal(current_price)
+            available_usdt = as_decimal(available_usdt)
             
             # Учитываем комиссию в доступном балансе
             effective_usdt = available_usdt * (Decimal('1') - self.COMMISSION_RATE)
@@ -206,8 +214,8 @@ class PositionManager:
         Проверяет, можно ли разместить ордер
         """
         try:
-            quantity = Decimal(str(quantity))
-            price = Decimal(str(price))
+            quantity = as_decimal(quantity)
+            price = as_decimal(price)
             
             if order_type.lower() == 'buy':
                 return True  # Покупка всегда возможна при наличии средств
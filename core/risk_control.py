@@ -0,0 +1,180 @@
+import logging
+import threading
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RiskCheckError(Exception):
+    """Ордер отклонен риск-контролем"""
+
+
+@dataclass
+class RiskLimits:
+    # Максимальная стоимость позиции + открытых покупок по одному символу (USDT)
+    max_symbol_notional: Optional[Decimal] = None
+    # Максимальная суммарная экспозиция по всем символам (USDT)
+    max_portfolio_exposure: Optional[Decimal] = None
+    # Максимум одновременно открытых циклов (символов с позицией или покупками)
+    max_open_cycles: Optional[int] = None
+    # Дневной убыток (USDT, положительное число), после которого покупки запрещены
+    daily_loss_limit: Optional[Decimal] = None
+    # Допустимое отклонение цены лимитного ордера от последней сделки, %. По умолчанию
+    # не ограничено: глубина лестницы DCA (dca_count * dca_step_percent) может быть любой
+    price_band_percent: Optional[Decimal] = None
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> 'RiskLimits':
+        def decimal_or_none(key, default=None):
+            value = settings.get(key, default)
+            return Decimal(str(value)) if value not in (None, '', 0) else None
+
+        max_cycles = settings.get('max_open_cycles')
+        return cls(
+            max_symbol_notional=decimal_or_none('max_symbol_notional'),
+            max_portfolio_exposure=decimal_or_none('max_portfolio_exposure'),
+            max_open_cycles=int(max_cycles) if max_cycles else None,
+            daily_loss_limit=decimal_or_none('daily_loss_limit'),
+            price_band_percent=decimal_or_none('price_band_percent')
+        )
+
+
+class RiskEngine:
+    """
+    Пре-трейд риск-контроль для всех OrderManager процесса.
+
+    Экспозиция по символам, последние цены и дневной PnL хранятся в памяти
+    и обновляются менеджерами по мере изменений, поэтому проверка ордера -
+    несколько сравнений без запросов к бирже. Продажи (TP) уменьшают риск
+    и проверяются только на ценовой коридор и kill-switch.
+    """
+
+    def __init__(self, limits: RiskLimits = None, pnl_source: Optional[Callable[[], float]] = None):
+        self.limits = limits or RiskLimits()
+        # Источник дневного PnL, например lambda: stats.day_pnl
+        self.pnl_source = pnl_source
+        self._lock = threading.Lock()
+        self._exposure: Dict[str, Decimal] = {}
+        self._total_exposure = Decimal('0')
+        self._last_price: Dict[str, Decimal] = {}
+        self._managers: List = []
+        self.killed = False
+        self.kill_reason = ''
+
+    # --- Обновление состояния ---
+
+    def register(self, manager):
+        """Подключает OrderManager: его ордера проверяются, а kill-switch его остановит"""
+        with self._lock:
+            if manager not in self._managers:
+                self._managers.append(manager)
+
+    def update_price(self, symbol: str, price: Decimal):
+        self._last_price[symbol] = Decimal(str(price))
+
+    def update_exposure(self, symbol: str, notional: Decimal):
+        """Экспозиция символа: стоимость позиции + открытые покупки"""
+        with self._lock:
+            previous = self._exposure.get(symbol, Decimal('0'))
+            if notional > 0:
+                self._exposure[symbol] = notional
+            else:
+                self._exposure.pop(symbol, None)
+            self._total_exposure += notional - previous
+
+    @property
+    def total_exposure(self) -> Decimal:
+        return self._total_exposure
+
+    def open_cycles(self) -> int:
+        return len(self._exposure)
+
+    # --- Проверки ---
+
+    def check_order(self, symbol: str, side: str, order_type: str, quantity: Decimal, price: Decimal = None):
+        """Проверка одного ордера; при нарушении лимита - RiskCheckError"""
+        self.check_orders(symbol, [(side, order_type, quantity, price)])
+
+    def check_orders(self, symbol: str, orders: List[tuple]):
+        """
+        Проверка пачки ордеров по символу (side, order_type, quantity, price):
+        лимиты применяются к суммарной стоимости покупок пачки.
+        """
+        if self.killed:
+            raise RiskCheckError(f"Торговля остановлена kill-switch: {self.kill_reason}")
+        limits = self.limits
+        last_price = self._last_price.get(symbol)
+        buy_notional = Decimal('0')
+        for side, order_type, quantity, price in orders:
+            if price is not None and last_price and limits.price_band_percent is not None:
+                deviation = abs(price - last_price) / last_price * 100
+                if deviation > limits.price_band_percent:
+                    raise RiskCheckError(
+                        f"{symbol}: цена {price} отклоняется от последней {last_price} на {deviation:.2f}% "
+                        f"(допустимо {limits.price_band_percent}%)")
+            if side == 'buy':
+                order_price = price if price is not None else last_price
+                if order_price is None:
+                    raise RiskCheckError(f"{symbol}: нет цены для оценки стоимости покупки")
+                buy_notional += quantity * order_price
+
+        if buy_notional == 0:
+            return
+
+        if limits.daily_loss_limit is not None and self.pnl_source is not None:
+            daily_pnl = Decimal(str(self.pnl_source()))
+            if daily_pnl <= -limits.daily_loss_limit:
+                raise RiskCheckError(f"Дневной убыток {daily_pnl} достиг лимита {limits.daily_loss_limit}")
+
+        with self._lock:
+            current = self._exposure.get(symbol, Decimal('0'))
+            if limits.max_symbol_notional is not None and current + buy_notional > limits.max_symbol_notional:
+                raise RiskCheckError(
+                    f"{symbol}: экспозиция {current + buy_notional:.2f} превысит лимит {limits.max_symbol_notional}")
+            if (limits.max_portfolio_exposure is not None
+                    and self._total_exposure + buy_notional > limits.max_portfolio_exposure):
+                raise RiskCheckError(
+                    f"Суммарная экспозиция {self._total_exposure + buy_notional:.2f} "
+                    f"превысит лимит {limits.max_portfolio_exposure}")
+            if (limits.max_open_cycles is not None and symbol not in self._exposure
+                    and len(self._exposure) >= limits.max_open_cycles):
+                raise RiskCheckError(f"{symbol}: уже открыто циклов {len(self._exposure)} (лимит {limits.max_open_cycles})")
+
+    # --- Kill-switch ---
+
+    def kill_switch(self, reason: str = 'ручная остановка'):
+        """
+        Останавливает все подключенные OrderManager и отменяет все их ордера на бирже.
+        Новые ордера отклоняются до reset_kill_switch().
+        """
+        self.killed = True
+        self.kill_reason = reason
+        logger.critical(f"KILL-SWITCH: {reason}")
+        with self._lock:
+            managers = list(self._managers)
+        for manager in managers:
+            try:
+                manager.stop()
+            except Exception as e:
+                logger.error(f"Ошибка остановки {manager.position.symbol}: {e}")
+
+        cancelled = set()
+        for manager in managers:
+            key = (id(manager.exchange), manager.position.symbol)
+            if key in cancelled:
+                continue
+            cancelled.add(key)
+            try:
+                results = manager.exchange.cancel_all_orders(manager.position.symbol)
+                errors = [r for r in results if isinstance(r, Exception)]
+                logger.warning(f"KILL-SWITCH {manager.position.symbol}: отменено ордеров "
+                               f"{len(results) - len(errors)}, ошибок {len(errors)}")
+            except Exception as e:
+                logger.error(f"KILL-SWITCH: ошибка отмены ордеров {manager.position.symbol}: {e}")
+
+    def reset_kill_switch(self):
+        self.killed = False
+        self.kill_reason = ''
+        logger.warning("Kill-switch сброшен")
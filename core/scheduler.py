@@ -0,0 +1,160 @@
+import time
+import heapq
+import logging
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CycleScheduler:
+    """
+    Планировщик циклов для многих OrderManager в одном процессе.
+
+    Вместо потока со sleep на каждую пару - одна куча таймеров и небольшой
+    пул потоков: когда у менеджера наступает срок, его step() выполняется в пуле,
+    а возвращенная задержка ставит следующий таймер. Один менеджер никогда
+    не выполняется параллельно сам с собой.
+    """
+
+    def __init__(self, workers: int = 4):
+        self.workers = workers
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[float, int, int]] = []
+        self._seq = itertools.count()
+        self._managers: Dict[int, object] = {}
+        # Срок актуального таймера менеджера; записи кучи с другим сроком устарели
+        self._due: Dict[int, float] = {}
+        self._executing: Set[int] = set()
+        self._wake_pending: Set[int] = set()
+        # Номер запуска менеджера: результат шага прежнего запуска не применяется
+        self._generation: Dict[int, int] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread = None
+        self._running = False
+
+    def add(self, manager):
+        """Запускает менеджер под управлением планировщика"""
+        key = id(manager)
+        with self._cond:
+            if not manager._prepare_start():
+                return
+            manager._scheduler = self
+            self._generation[key] = self._generation.get(key, 0) + 1
+            self._managers[key] = manager
+            if key in self._executing:
+                # Шаг прежнего запуска еще выполняется - новый начнется после него
+                self._wake_pending.add(key)
+            else:
+                self._schedule(key, 0)
+        logger.info(f"OrderManager {manager.position.symbol} добавлен в планировщик")
+
+    def remove(self, manager):
+        """Останавливает менеджер; завершится он на ближайшем шаге"""
+        manager.stop()
+
+    def wake(self, manager):
+        """Выполнить шаг менеджера как можно скорее"""
+        key = id(manager)
+        with self._cond:
+            if key not in self._managers:
+                return
+            if key in self._executing:
+                self._wake_pending.add(key)
+            else:
+                self._schedule(key, 0)
+
+    def managers(self) -> list:
+        with self._cond:
+            return list(self._managers.values())
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='cycle')
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        logger.info(f"Планировщик циклов запущен, потоков: {self.workers}")
+
+    def stop(self, timeout: float = 5):
+        """Останавливает все менеджеры и планировщик"""
+        for manager in self.managers():
+            manager.stop()
+            # Остановленный менеджер завершится на ближайшем шаге - не ждем его таймер
+            self.wake(manager)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._managers and self._running and time.monotonic() < deadline:
+                self._cond.wait(0.1)
+            self._running = False
+            self._cond.notify_all()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        logger.info("Планировщик циклов остановлен")
+
+    def _schedule(self, key: int, delay: float):
+        due = time.monotonic() + max(0.0, delay)
+        current = self._due.get(key)
+        if current is not None and current <= due:
+            return
+        self._due[key] = due
+        heapq.heappush(self._heap, (due, next(self._seq), key))
+        self._cond.notify_all()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, _, key = self._heap[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                heapq.heappop(self._heap)
+                if self._due.get(key) != due:
+                    continue
+                del self._due[key]
+                manager = self._managers.get(key)
+                if manager is None:
+                    continue
+                self._executing.add(key)
+                generation = self._generation[key]
+            self._executor.submit(self._run_step, key, manager, generation)
+
+    def _run_step(self, key: int, manager, generation: int):
+        try:
+            delay = manager.step()
+        except Exception as e:
+            logger.critical(f"Critical error in trading cycle {manager.position.symbol}: {e}")
+            delay = None
+
+        with self._cond:
+            self._executing.discard(key)
+            if self._generation.get(key) != generation:
+                # Менеджер перезапущен во время шага: завершение относилось к прежнему запуску
+                if key in self._wake_pending:
+                    self._wake_pending.discard(key)
+                    self._schedule(key, 0)
+                return
+            if delay is None:
+                # Под блокировкой, чтобы add() не перезапустил менеджер между проверкой и завершением
+                manager._finish()
+                manager._scheduler = None
+                self._managers.pop(key, None)
+                self._wake_pending.discard(key)
+                self._cond.notify_all()
+            elif key in self._wake_pending:
+                self._wake_pending.discard(key)
+                self._schedule(key, 0)
+            else:
+                self._schedule(key, delay)
@@ -0,0 +1,223 @@
+import time
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .order_manager import OrderManager
+from .risk_control import RiskEngine
+from .scheduler import CycleScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class TradingService:
+    """
+    Торговля без GUI: OrderManager на каждый символ под общим CycleScheduler,
+    один поток исполнений на все символы. Управление (старт, мягкий и полный
+    стоп, kill-switch, статус, позиции) - методами класса; их вызывают
+    infra.control_api и GUI.
+    Модуль не импортирует Qt.
+    """
+
+    def __init__(self, exchange, config: dict, symbols: Iterable[str] = (), workers: int = 4,
+                 state_store=None, risk=None, stats=None,
+                 on_manager: Optional[Callable[[OrderManager], None]] = None):
+        self.exchange = exchange
+        self.config = dict(config)
+        self.state_store = state_store
+        # Без заданных лимитов риск-контроль нужен только для kill-switch
+        self.risk = risk if risk is not None else RiskEngine()
+        self.stats = stats
+        # Вызывается для каждого нового OrderManager до восстановления состояния (GUI подключает таблицу)
+        self.on_manager = on_manager
+        self.scheduler = CycleScheduler(workers=workers)
+        self.user_stream = None
+        self.managers: Dict[str, OrderManager] = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._opened = False
+        for symbol in symbols:
+            self._get_manager(symbol)
+
+    def open(self):
+        """
+        Запускает поток исполнений, потоки рыночных данных символов и планировщик;
+        циклы символов стартуют через start()
+        """
+        if hasattr(self.exchange, 'create_user_stream'):
+            self.user_stream = self.exchange.create_user_stream()
+            self.user_stream.start()
+            for manager in self.managers.values():
+                manager.attach_user_stream(self.user_stream)
+        self._opened = True
+        self._start_market_data(list(self.managers))
+        self.scheduler.start()
+
+    def _start_market_data(self, symbols: List[str]):
+        """
+        Подписка символов на поток цен (новые добавляются к открытому потоку)
+        и перезапуск потока стакана на все символы сервиса
+        """
+        if not symbols:
+            return
+        if hasattr(self.exchange, 'start_market_data'):
+            try:
+                self.exchange.start_market_data(symbols)
+            except Exception as e:
+                # Без потока цены берутся через REST
+                logger.error(f"Поток рыночных данных {', '.join(symbols)} не запущен: {e}")
+        if hasattr(self.exchange, 'start_depth_stream'):
+            all_symbols = sorted(set(self.managers) | set(symbols))
+            try:
+                self.exchange.start_depth_stream(all_symbols)
+            except Exception as e:
+                # Без зеркала стакана вход считается по лучшей цене
+                logger.error(f"Поток стакана {', '.join(all_symbols)} не запущен: {e}")
+
+    def _get_manager(self, symbol: str) -> OrderManager:
+        symbol = symbol.upper()
+        with self._lock:
+            manager = self.managers.get(symbol)
+            if manager is not None:
+                return manager
+            if self._opened:
+                self._start_market_data([symbol])
+            manager = OrderManager(self.exchange, dict(self.config, symbol=symbol))
+            if self.user_stream is not None:
+                manager.attach_user_stream(self.user_stream)
+            manager.attach_risk_engine(self.risk)
+            if self.stats is not None:
+                manager.on_fill = self.stats.on_fill
+                manager.on_cycle_complete = self.stats.on_cycle_complete
+            if self.on_manager is not None:
+                self.on_manager(manager)
+            if self.state_store is not None:
+                manager.attach_state_store(self.state_store)
+                if manager.recover_state():
+                    logger.info(f"{symbol}: состояние восстановлено из журнала")
+            self.managers[symbol] = manager
+            return manager
+
+    def _select(self, symbol: Optional[str]) -> List[OrderManager]:
+        if symbol:
+            return [self._get_manager(symbol)]
+        with self._lock:
+            return list(self.managers.values())
+
+    # --- Управление ---
+
+    def update_config(self, config: dict):
+        """Новые настройки стратегии; применяются к новым символам и к остановленным циклам"""
+        self.config.update(config)
+        for manager in self._select(None):
+            if not manager.is_running():
+                manager.config.update({k: v for k, v in config.items() if k != 'symbol'})
+
+    def start(self, symbol: Optional[str] = None) -> List[str]:
+        """Запускает циклы символа (или всех символов); новый символ добавляется"""
+        if self.risk.killed:
+            logger.warning(f"Старт отклонен: включен kill-switch ({self.risk.kill_reason})")
+            return []
+        started = []
+        for manager in self._select(symbol):
+            if manager.is_running():
+                continue
+            self.scheduler.add(manager)
+            if manager.is_running():
+                started.append(manager.position.symbol)
+        return started
+
+    def soft_stop(self, symbol: Optional[str] = None) -> List[str]:
+        """Мягкий стоп: текущий цикл доводится до конца"""
+        managers = [m for m in self._select(symbol) if m.is_running()]
+        for manager in managers:
+            manager.enable_soft_stop()
+        return [manager.position.symbol for manager in managers]
+
+    def resume(self, symbol: Optional[str] = None) -> List[str]:
+        """Отмена мягкого стопа"""
+        managers = [m for m in self._select(symbol) if m.is_running() and m.is_soft_stop_enabled()]
+        for manager in managers:
+            manager.disable_soft_stop()
+        return [manager.position.symbol for manager in managers]
+
+    def hard_stop(self, symbol: Optional[str] = None) -> List[str]:
+        """Полный стоп: цикл прерывается, ордера на бирже остаются, состояние сохраняется в журнале"""
+        managers = [m for m in self._select(symbol) if m.is_running()]
+        for manager in managers:
+            manager.stop()
+        return [manager.position.symbol for manager in managers]
+
+    def kill(self, reason: str = 'ручная остановка') -> List[str]:
+        """
+        Kill-switch: останавливает циклы всех символов и отменяет все их ордера на бирже.
+        Новые ордера и старт циклов отклоняются до reset_kill()
+        """
+        symbols = [manager.position.symbol for manager in self._select(None)]
+        self.risk.kill_switch(reason)
+        return symbols
+
+    def reset_kill(self):
+        self.risk.reset_kill_switch()
+
+    def cancel_all(self, symbol: Optional[str] = None) -> int:
+        """Отменяет открытые ордера символа (или всех символов) на бирже; возвращает число отмененных"""
+        cancelled = 0
+        for manager in self._select(symbol):
+            results = self.exchange.cancel_all_orders(manager.position.symbol)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"{manager.position.symbol}: ошибка отмены ордера: {result}")
+                else:
+                    cancelled += 1
+            manager.update_orders_status()
+        return cancelled
+
+    def is_running(self) -> bool:
+        return any(manager.is_running() for manager in self._select(None))
+
+    def close(self):
+        self.scheduler.stop()
+        if self.user_stream is not None:
+            self.user_stream.stop()
+        if self.state_store is not None:
+            self.state_store.close()
+        if self.stats is not None:
+            self.stats.close()
+        # Адаптер останавливает потоки рыночных данных и закрывает пул соединений
+        close = getattr(self.exchange, 'close', None)
+        if close is not None:
+            close()
+
+    # --- Состояние ---
+
+    def status(self) -> dict:
+        result = {
+            'mode': getattr(self.exchange, 'mode', None),
+            'uptime': time.time() - self.started_at,
+            'symbols': {symbol: manager.get_status() for symbol, manager in self._items()},
+        }
+        if self.stats is not None:
+            result['stats'] = self.stats.summary()
+        result['risk'] = {'killed': self.risk.killed, 'reason': self.risk.kill_reason}
+        return result
+
+    def positions(self) -> dict:
+        result = {}
+        for symbol, manager in self._items():
+            position = manager.get_position()
+            result[symbol] = {
+                'size': position.size,
+                'avg_price': position.avg_price,
+                'stage': manager.get_current_stage(),
+                'open_orders': [
+                    {'id': order.id, 'side': order.side, 'type': order.type, 'price': order.price,
+                     'amount': order.amount, 'filled': order.filled_amount, 'status': order.status.value}
+                    for order in manager.get_active_orders() if order.is_open
+                ],
+            }
+        return result
+
+    def _items(self):
+        with self._lock:
+            return sorted(self.managers.items())
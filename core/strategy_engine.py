@@ -1,6 +1,9 @@
 from decimal import Decimal
 import logging
 
+from utils.calculator import split_deposit
+from utils.fixed_point import as_decimal, from_fixed, to_fixed
+
 logger = logging.getLogger(__name__)
 
 COMMISSION_RATE = Decimal('0.0015')  # 0.15% комиссия для всех расчетов
@@ -14,22 +17,15 @@ class StrategyEngine:
 
     def _calculate_entry_shares(self, total_deposit, dca_count, martingale_coef):
         shares = []
-        coef = Decimal(str(martingale_coef))
+        coef = as_decimal(martingale_coef)
         if coef <= 0:
             logger.error(f"Некорректный коэффициент мартингейла: {coef}")
             return []
         if dca_count < 0:
             logger.error(f"Некорректное число DCA: {dca_count}")
             return []
-        if coef == 1:
-            part = total_deposit / Decimal(str(dca_count + 1))
-            shares = [part for _ in range(dca_count + 1)]
-        else:
-            k = coef
-            n = dca_count + 1
-            sum_geom = (1 - k**n) / (1 - k)
-            base = total_deposit / Decimal(str(sum_geom))
-            shares = [base * (k**i) for i in range(n)]
+        # Комиссия здесь учитывается в каждом ордере отдельно
+        shares = split_deposit(total_deposit, dca_count, coef, commission_rate=0)
         logger.info(f"Рассчитанные доли входа (shares) для dca_count={dca_count}, martingale_coef={coef}: {shares}")
         return shares
 
@@ -38,7 +34,7 @@ class StrategyEngine:
         Основной запуск стратегии для одного символа.
         """
         try:
-            balance = Decimal(str(self.exchange.get_balance('USDT')))
+            balance = as_decimal(self.exchange.get_balance('USDT'))
             deposit_percent = Decimal(str(self.config.get('deposit_percent', 99.99))) / Decimal('100')
             dca_count = int(self.config.get('dca_count', 3))
             martingale_coef = Decimal(str(self.config.get('martingale_coef', 1)))
@@ -51,21 +47,19 @@ class StrategyEngine:
 
             # --- Рыночный ордер (market) ---
             order_size_usdt = shares[0] * (Decimal('1') - COMMISSION_RATE)
-            price = Decimal(str(self.exchange.get_price(symbol)))
+            price = as_decimal(self.exchange.get_price(symbol))
             if price <= 0:
                 logger.error("Ошибка: цена инструмента <= 0")
                 return False
 
-            quantity = order_size_usdt / price
-
-            lot_info = self.exchange._get_symbol_lot_info(symbol)
-            min_qty = lot_info['minQty']
-            step_size = lot_info['stepSize']
-            quantity = (quantity // step_size) * step_size
+            fixed = self.exchange.get_fixed_filters(symbol)
+            min_qty = from_fixed(fixed.min_qty)
+            quantity_units = fixed.quantity_for(order_size_usdt, price)
 
-            if quantity < min_qty:
-                logger.error(f"Рыночный ордер не создан: {quantity} < minQty {min_qty}")
+            if not quantity_units:
+                logger.error(f"Рыночный ордер не создан: {order_size_usdt / price} < minQty {min_qty}")
                 return False
+            quantity = from_fixed(quantity_units)
 
             market_order = self.exchange.create_order(
                 symbol=symbol,
@@ -74,8 +68,8 @@ class StrategyEngine:
                 quantity=quantity
             )
 
-            fill_price = Decimal(str(market_order.get("avg_price", price)))
-            fill_qty = Decimal(str(market_order.get("filled_qty", market_order.get("amount", quantity))))
+            fill_price = as_decimal(market_order.get("avg_price", price))
+            fill_qty = as_decimal(market_order.get("filled_qty", market_order.get("amount", quantity)))
             self.position_manager.reset_position()
             self.position_manager.update_position(fill_qty, fill_price)
             logger.info(f"Открыт рыночный ордер: {fill_qty} {symbol} по цене {fill_price}")
@@ -89,12 +83,12 @@ class StrategyEngine:
                 for i in range(1, min(dca_count + 1, len(shares))):
                     dca_price = current_price * (Decimal('1') - dca_step_percent * Decimal(i))
                     dca_amount_usdt = shares[i] * (Decimal('1') - COMMISSION_RATE)
-                    dca_amount_coins = dca_amount_usdt / dca_price
-                    dca_amount_coins = (dca_amount_coins // step_size) * step_size
+                    dca_units = fixed.quantity_for(dca_amount_usdt, dca_price)
 
-                    if dca_amount_coins < min_qty:
-                        logger.warning(f"DCA ордер {i} не создан: {dca_amount_coins} < minQty {min_qty}")
+                    if not dca_units:
+                        logger.warning(f"DCA ордер {i} не создан: {dca_amount_usdt / dca_price} < minQty {min_qty}")
                         continue
+                    dca_amount_coins = from_fixed(dca_units)
 
                     try:
                         dca_order = self.exchange.create_order(
@@ -120,10 +114,11 @@ class StrategyEngine:
                 tp_price = fill_price * (Decimal('1') + tp["percent"] / Decimal('100'))
                 tp_amount = position_size * tp["volume"] / Decimal('100')
                 tp_amount = tp_amount * (Decimal('1') - COMMISSION_RATE)
-                tp_amount = (tp_amount // step_size) * step_size
-                if tp_amount < min_qty:
+                tp_units = fixed.round_quantity(to_fixed(tp_amount))
+                if not tp_units:
                     logger.warning(f"TP ордер {i} не создан: {tp_amount} < minQty {min_qty}")
                     continue
+                tp_amount = from_fixed(tp_units)
                 try:
                     tp_order = self.exchange.create_order(
                         symbol=symbol,
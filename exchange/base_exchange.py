@@ -0,0 +1,135 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import List, Optional, Tuple, Union
+
+from utils.fixed_point import FixedFilters
+
+
+@dataclass
+class OrderRequest:
+    """Параметры одного ордера для пакетного выставления"""
+    symbol: str
+    side: str  # 'buy' or 'sell'
+    order_type: str  # 'market', 'limit'
+    quantity: Decimal
+    price: Optional[Decimal] = None
+
+
+# Результат пакетной операции: ответ биржи или исключение на месте ордера
+BatchResult = List[Union[dict, Exception]]
+
+
+class BaseExchange(ABC):
+    """
+    Интерфейс биржи для OrderManager, StrategyEngine и OrderExecutor.
+
+    Ордера возвращаются в нормализованном виде: id, symbol, side, type, amount,
+    price, status (статусы Binance: NEW, FILLED, ...), filled_qty, avg_price, time.
+    Пакетные методы по умолчанию выполняют операции по очереди; реализации
+    с сетевым клиентом переопределяют их параллельной отправкой.
+    Ошибка одного ордера в пакете не прерывает остальные - исключение
+    возвращается на его месте в списке результатов.
+    """
+
+    # --- Рыночные данные и баланс ---
+
+    @abstractmethod
+    def get_balance(self, asset: str) -> Decimal:
+        """Свободный баланс актива"""
+
+    @abstractmethod
+    def get_current_price(self, symbol: str) -> Decimal:
+        """Последняя цена инструмента"""
+
+    def get_price(self, symbol: str) -> Decimal:
+        return self.get_current_price(symbol)
+
+    def get_book_price(self, symbol: str, side: str) -> Decimal:
+        """Цена исполнения рыночного ордера: лучший ask для покупки, bid для продажи"""
+        return self.get_current_price(symbol)
+
+    def get_depth_book(self, symbol: str):
+        """Синхронизированное зеркало стакана (OrderBookMirror) или None, если стакан не ведется"""
+        return None
+
+    @abstractmethod
+    def get_symbol_filters(self, symbol: str) -> dict:
+        """Фильтры инструмента: minQty, maxQty, stepSize, minPrice, maxPrice, tickSize, minNotional"""
+
+    def _get_symbol_lot_info(self, symbol: str) -> dict:
+        # Старое имя, которое используют StrategyEngine и OrderManager
+        return self.get_symbol_filters(symbol)
+
+    def get_fixed_filters(self, symbol: str) -> FixedFilters:
+        """Фильтры инструмента в целых единицах 1e-8 (utils.fixed_point)"""
+        return FixedFilters.from_filters(self.get_symbol_filters(symbol))
+
+    # --- Ордера ---
+
+    @abstractmethod
+    def create_order(self, symbol: str, side: str, order_type: str,
+                     quantity: Decimal, price: Decimal = None) -> dict:
+        """Выставить ордер"""
+
+    @abstractmethod
+    def cancel_order(self, order_id, symbol: str) -> dict:
+        """Отменить ордер"""
+
+    @abstractmethod
+    def get_order_info(self, order_id, symbol: str) -> dict:
+        """Текущее состояние ордера"""
+
+    def is_order_filled(self, order_id, symbol: str) -> bool:
+        return self.get_order_info(order_id, symbol)['status'] == 'FILLED'
+
+    @abstractmethod
+    def get_open_orders(self, symbol: str) -> list:
+        """Все открытые ордера по символу"""
+
+    @abstractmethod
+    def get_all_orders(self, symbol: str, start_time: int = None) -> list:
+        """Все ордера по символу начиная с start_time (мс)"""
+
+    def place_market_order(self, symbol: str, side: str, amount: Decimal) -> dict:
+        return self.create_order(symbol, side, 'market', amount)
+
+    def place_limit_order(self, symbol: str, side: str, price: Decimal, amount: Decimal) -> dict:
+        return self.create_order(symbol, side, 'limit', amount, price)
+
+    # --- Пакетные операции ---
+
+    def create_orders(self, requests: List[OrderRequest]) -> BatchResult:
+        """Выставить несколько ордеров; результаты в порядке запросов"""
+        results = []
+        for request in requests:
+            try:
+                results.append(self.create_order(request.symbol, request.side, request.order_type,
+                                                 request.quantity, request.price))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def cancel_orders(self, orders: List[Tuple[str, str]]) -> BatchResult:
+        """Отменить несколько ордеров, заданных парами (order_id, symbol)"""
+        results = []
+        for order_id, symbol in orders:
+            try:
+                results.append(self.cancel_order(order_id, symbol))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def cancel_all_orders(self, symbol: str) -> BatchResult:
+        """Отменить все открытые ордера по символу"""
+        return self.cancel_orders([(order['id'], symbol) for order in self.get_open_orders(symbol)])
+
+    def get_orders_info(self, orders: List[Tuple[str, str]]) -> BatchResult:
+        """Состояние нескольких ордеров, заданных парами (order_id, symbol)"""
+        results = []
+        for order_id, symbol in orders:
+            try:
+                results.append(self.get_order_info(order_id, symbol))
+            except Exception as e:
+                results.append(e)
+        return results
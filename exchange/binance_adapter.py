@@ -1,92 +1,306 @@
+import threading
 from decimal import Decimal
-import decimal
+from typing import Dict, List, Tuple
 
-class BinanceAdapter:
-    def __init__(self, mode, api_key=None, api_secret=None):
+from infra.metrics import metrics
+from utils.fixed_point import FixedFilters, from_fixed, to_fixed, to_str
+from .symbol_filters import SymbolFilterRegistry
+from .user_stream import BinanceUserStream, LocalUserStream
+from .emulator import EmulatorFeed, MatchingEngine, PriceFeed
+from .binance_service import BinanceService
+from .base_exchange import BaseExchange, OrderRequest, BatchResult
+from .market_data import MarketDataCache, MarketDataStream
+from .order_book import DepthStream, OrderBookMirror
+
+# Тестовые фильтры для режима эмуляции
+EMULATION_FILTERS = {
+    'minQty': Decimal('0.00001'),
+    'maxQty': Decimal('10000'),
+    'stepSize': Decimal('0.00001'),
+    'minPrice': Decimal('1.0'),
+    'maxPrice': Decimal('1000000'),
+    'tickSize': Decimal('0.01'),
+    'minNotional': Decimal('0')
+}
+
+# Стартовый баланс эмулятора
+EMULATION_BALANCES = {'USDT': Decimal('10000')}
+
+class BinanceAdapter(BaseExchange):
+    def __init__(self, mode, api_key=None, api_secret=None, emulator: MatchingEngine = None,
+                 base_url: str = None, feeds: Dict[str, PriceFeed] = None, feed_interval: float = 1.0):
         self.mode = mode
         self.api_key = api_key
         self.api_secret = api_secret
-        self.client = None  # Здесь можно инициализировать клиента Binance при необходимости
+        self.base_url = base_url
+        # REST-клиент Binance; base_url позволяет подключиться к локальному тестовому серверу
+        self.client = None
+        if mode != "EMULATION":
+            self.client = BinanceService(api_key, api_secret, mode=mode, base_url=base_url)
+        self.filters = SymbolFilterRegistry(
+            client=self.client,
+            defaults=EMULATION_FILTERS if mode == "EMULATION" else None
+        )
+        # Внутрипроцессная биржа для режима эмуляции
+        self.emulator = None
+        if mode == "EMULATION":
+            self.emulator = emulator or MatchingEngine(balances=EMULATION_BALANCES)
+        # Лента цен эмулятора: записанные ленты по символам, остальные - публичный тикер
+        self.feeds = feeds or {}
+        self.feed_interval = feed_interval
+        self.emulator_feed: EmulatorFeed = None
+        self._public_client: BinanceService = None
+        self._public_lock = threading.Lock()
+        # Кэш цен из websocket; без него цена запрашивается через REST
+        self.market_data: MarketDataCache = None
+        self.market_stream: MarketDataStream = None
+        # Зеркала стакана L2 для оценки проскальзывания рыночных ордеров
+        self.depth_stream: DepthStream = None
 
-    def _get_symbol_lot_info(self, symbol):
+    def get_symbol_filters(self, symbol):
         """
-        Получить фильтры LOT_SIZE и PRICE_FILTER по инструменту
+        Получить фильтры LOT_SIZE, PRICE_FILTER и MIN_NOTIONAL по инструменту.
+        Значения берутся из кэша, exchangeInfo запрашивается только при первом обращении.
         """
-        if self.mode == "EMULATION":
-            # Для эмуляции возвращаем тестовые значения
-            return {
-                'minQty': Decimal('0.00001'),
-                'maxQty': Decimal('10000'),
-                'stepSize': Decimal('0.00001'),
-                'minPrice': Decimal('1.0'),
-                'maxPrice': Decimal('1000000'),
-                'tickSize': Decimal('0.01')
-            }
-        info = self.client.get_symbol_info(symbol.upper())
-        filters = {f['filterType']: f for f in info['filters']}
-        lot = filters['LOT_SIZE']
-        price = filters['PRICE_FILTER']
-        return {
-            'minQty': Decimal(lot['minQty']),
-            'maxQty': Decimal(lot['maxQty']),
-            'stepSize': Decimal(lot['stepSize']),
-            'minPrice': Decimal(price['minPrice']),
-            'maxPrice': Decimal(price['maxPrice']),
-            'tickSize': Decimal(price['tickSize'])
-        }
+        return self.filters.get(symbol)
+
+    def get_fixed_filters(self, symbol: str) -> FixedFilters:
+        return self.filters.get_fixed(symbol)
 
     def _round_quantity(self, symbol, quantity):
         """
         Округлить количество до допустимого диапазона и шага
         """
-        lot = self._get_symbol_lot_info(symbol)
-        step = lot['stepSize']
-        min_qty = lot['minQty']
-        max_qty = lot['maxQty']
-        quantity = (Decimal(quantity) // step) * step
-        quantity = quantity.quantize(step, rounding=decimal.ROUND_DOWN)
-        if quantity < min_qty:
-            return Decimal('0')
-        if quantity > max_qty:
-            return max_qty
-        return quantity
+        return from_fixed(self.filters.get_fixed(symbol).round_quantity(to_fixed(quantity)))
 
     def _round_price(self, symbol, price):
         """
         Округлить цену до допустимого tickSize и диапазона
         """
-        lot = self._get_symbol_lot_info(symbol)
-        tick = lot.get('tickSize', Decimal('0.01'))
-        min_price = lot.get('minPrice', Decimal('0.01'))
-        max_price = lot.get('maxPrice', Decimal('1000000'))
-        price = (Decimal(price) // tick) * tick
-        price = price.quantize(tick, rounding=decimal.ROUND_DOWN)
-        if price < min_price:
-            return min_price
-        if price > max_price:
-            return max_price
-        return price
-
-    def create_order(self, symbol: str, side: str, order_type: str, 
-                   quantity: Decimal, price: Decimal = None, quote_amount: bool = False) -> dict:
-        try:
-            symbol = symbol.upper()
-            side = side.upper()
-            quantity = self._round_quantity(symbol, quantity)
-            if quantity == Decimal('0'):
-                raise ValueError(f"QTY меньше минимального или некорректен для {symbol}")
-            if price is not None:
-                price = self._round_price(symbol, price)
-
-            if self.mode == "EMULATION":
-                # Логика эмуляции
-                pass
-            else:
-                # Логика реальных ордеров
-                pass
-
-        except Exception as e:
-            raise e
+        return from_fixed(self.filters.get_fixed(symbol).round_price(to_fixed(price)))
+
+    def _prepare_order(self, symbol: str, side: str, order_type: str,
+                       quantity: Decimal, price: Decimal = None) -> dict:
+        """
+        Округляет количество и цену по фильтрам инструмента и собирает параметры ордера Binance.
+        Округление идет в целых единицах 1e-8, количество и цена возвращаются строками для API.
+        Лимитный ордер дешевле MIN_NOTIONAL отклоняется до отправки; для рыночного
+        минимум проверяется при планировании по цене входа.
+        """
+        symbol = symbol.upper()
+        fixed = self.filters.get_fixed(symbol)
+        quantity_units = fixed.round_quantity(to_fixed(quantity))
+        if not quantity_units:
+            raise ValueError(f"QTY меньше минимального или некорректен для {symbol}")
+        params = {
+            'symbol': symbol,
+            'side': side.upper(),
+            'type': order_type.upper(),
+            'quantity': to_str(quantity_units)
+        }
+        if price is not None:
+            price_units = fixed.round_price(to_fixed(price))
+            if not fixed.meets_notional(quantity_units, price_units):
+                raise ValueError(f"Стоимость ордера меньше minNotional {to_str(fixed.min_notional)} для {symbol}")
+            params['price'] = to_str(price_units)
+        if params['type'] == 'LIMIT':
+            params['timeInForce'] = 'GTC'
+        return params
+
+    def create_order(self, symbol: str, side: str, order_type: str,
+                     quantity: Decimal, price: Decimal = None) -> dict:
+        with metrics.span('rounding', symbol.upper()):
+            params = self._prepare_order(symbol, side, order_type, quantity, price)
+        if self.mode == "EMULATION":
+            price = params.get('price')
+            return self.emulator.create_order(params['symbol'], params['side'], order_type,
+                                              Decimal(params['quantity']),
+                                              Decimal(price) if price is not None else None)
+        return self._normalize_order(self.client.create_order(**self._to_api_params(params)))
+
+    @staticmethod
+    def _to_api_params(params: dict) -> dict:
+        # Количество и цена уже строки после _prepare_order
+        api_params = dict(params)
+        if params['type'] != 'LIMIT':
+            api_params.pop('price', None)
+        return api_params
+
+    def create_orders(self, requests: List[OrderRequest]) -> BatchResult:
+        """
+        Выставляет лестницу ордеров. У Binance Spot нет пакетного эндпоинта,
+        поэтому запросы уходят параллельно через общий пул соединений:
+        время выставления - один RTT вместо N.
+        """
+        if self.mode == "EMULATION":
+            return super().create_orders(requests)
+        results: BatchResult = [None] * len(requests)
+        pending = []
+        for i, request in enumerate(requests):
+            try:
+                params = self._prepare_order(request.symbol, request.side, request.order_type,
+                                             request.quantity, request.price)
+                pending.append((i, self.client.aclient.create_order(**self._to_api_params(params))))
+            except Exception as e:
+                results[i] = e
+        responses = self.client.gather(*(coro for _, coro in pending)) if pending else []
+        for (i, _), response in zip(pending, responses):
+            results[i] = response if isinstance(response, Exception) else self._normalize_order(response)
+        return results
+
+    def cancel_orders(self, orders: List[Tuple[str, str]]) -> BatchResult:
+        if self.mode == "EMULATION":
+            return super().cancel_orders(orders)
+        responses = self.client.gather(*(self.client.aclient.cancel_order(symbol.upper(), order_id)
+                                         for order_id, symbol in orders))
+        return [r if isinstance(r, Exception) else self._normalize_order(r) for r in responses]
+
+    def cancel_all_orders(self, symbol: str) -> BatchResult:
+        """Отмена всех открытых ордеров по символу одним запросом"""
+        if self.mode == "EMULATION":
+            return super().cancel_all_orders(symbol)
+        return [self._normalize_order(raw) for raw in self.client.cancel_open_orders(symbol.upper())]
+
+    def get_orders_info(self, orders: List[Tuple[str, str]]) -> BatchResult:
+        if self.mode == "EMULATION":
+            return super().get_orders_info(orders)
+        responses = self.client.gather(*(self.client.aclient.get_order(symbol.upper(), order_id)
+                                         for order_id, symbol in orders))
+        return [r if isinstance(r, Exception) else self._normalize_order(r) for r in responses]
+
+    @staticmethod
+    def _normalize_order(raw: dict) -> dict:
+        """
+        Приводит ответ Binance по ордеру к формату, с которым работает OrderManager
+        """
+        filled_qty = Decimal(raw.get('executedQty', '0'))
+        quote_qty = Decimal(raw.get('cummulativeQuoteQty', '0'))
+        return {
+            'id': str(raw['orderId']),
+            'symbol': raw['symbol'],
+            'side': raw['side'].lower(),
+            'type': raw['type'].lower(),
+            'amount': Decimal(raw['origQty']),
+            'price': Decimal(raw.get('price', '0')),
+            'status': raw['status'],
+            'filled_qty': filled_qty,
+            'avg_price': quote_qty / filled_qty if filled_qty > 0 else Decimal('0'),
+            'time': raw.get('time', raw.get('transactTime', 0))
+        }
+
+    def get_balance(self, asset: str) -> Decimal:
+        """Свободный баланс актива"""
+        if self.mode == "EMULATION":
+            return self.emulator.get_balance(asset)
+        balance = self.client.get_asset_balance(asset=asset.upper())
+        return Decimal(balance['free']) if balance else Decimal('0')
+
+    def get_current_price(self, symbol: str) -> Decimal:
+        if self.market_data is not None:
+            return self.market_data.get_price(symbol.upper())
+        return self._fetch_price(symbol)
+
+    def get_book_price(self, symbol: str, side: str) -> Decimal:
+        if self.market_data is not None:
+            return self.market_data.get_price(symbol.upper(), side)
+        return self._fetch_price(symbol)
+
+    def _fetch_price(self, symbol: str) -> Decimal:
+        if self.mode == "EMULATION":
+            return self.emulator.get_price(symbol)
+        ticker = self.client.get_symbol_ticker(symbol=symbol.upper())
+        return Decimal(ticker['price'])
+
+    def _fetch_public_price(self, symbol: str) -> Decimal:
+        """Цена для ленты эмулятора: публичный тикер Binance без ключей"""
+        # Тикер запрашивают и поток ленты, и подписка новых символов
+        with self._public_lock:
+            if self._public_client is None:
+                self._public_client = BinanceService(base_url=self.base_url)
+        ticker = self._public_client.get_symbol_ticker(symbol=symbol.upper())
+        return Decimal(ticker['price'])
+
+    def start_market_data(self, symbols, max_age: float = 10.0) -> MarketDataCache:
+        """
+        Подписывается на bookTicker/aggTrade символов. После этого цены читаются
+        из кэша, а REST используется только для устаревших котировок.
+        В режиме эмуляции запускается лента цен эмулятора (записанная лента
+        или публичный тикер), а цены читаются из эмулятора.
+        """
+        if self.mode == "EMULATION":
+            if self.emulator_feed is not None:
+                self.emulator_feed.subscribe(symbols)
+                return None
+            self.emulator_feed = EmulatorFeed(self.emulator, symbols, feeds=self.feeds,
+                                              fetch_price=self._fetch_public_price, interval=self.feed_interval)
+            self.emulator_feed.start()
+            return None
+        if self.market_stream is not None:
+            self.market_stream.subscribe(symbols)
+            return self.market_data
+        self.market_data = MarketDataCache(fallback=self._fetch_price, max_age=max_age)
+        self.market_stream = MarketDataStream(self.market_data, symbols, mode=self.mode)
+        self.market_stream.start()
+        return self.market_data
+
+    def start_depth_stream(self, symbols, limit: int = 1000) -> DepthStream:
+        """
+        Ведет локальные зеркала стакана символов: снимок /api/v3/depth + поток diff depth.
+        В режиме эмуляции внешней ликвидности нет, стакан не ведется.
+        """
+        if self.mode == "EMULATION":
+            return None
+        if self.depth_stream is not None:
+            self.depth_stream.stop()
+        self.depth_stream = DepthStream(
+            symbols, lambda symbol: self.client.get_order_book(symbol=symbol, limit=limit), mode=self.mode)
+        self.depth_stream.start()
+        return self.depth_stream
+
+    def get_depth_book(self, symbol: str) -> OrderBookMirror:
+        if self.depth_stream is None:
+            return None
+        return self.depth_stream.get_book(symbol)
+
+    def cancel_order(self, order_id, symbol: str) -> dict:
+        if self.mode == "EMULATION":
+            return self.emulator.cancel_order(order_id, symbol)
+        return self._normalize_order(self.client.cancel_order(symbol=symbol.upper(), orderId=order_id))
+
+    def get_order_info(self, order_id, symbol: str) -> dict:
+        if self.mode == "EMULATION":
+            return self.emulator.get_order(order_id, symbol)
+        return self._normalize_order(self.client.get_order(symbol=symbol.upper(), orderId=order_id))
+
+    def get_open_orders(self, symbol: str) -> list:
+        """Снимок всех открытых ордеров по символу одним запросом"""
+        if self.mode == "EMULATION":
+            return self.emulator.get_open_orders(symbol)
+        raw_orders = self.client.get_open_orders(symbol=symbol.upper())
+        return [self._normalize_order(raw) for raw in raw_orders]
+
+    def get_all_orders(self, symbol: str, start_time: int = None) -> list:
+        """
+        Все ордера по символу (включая исполненные и отмененные), начиная с start_time (мс)
+        """
+        if self.mode == "EMULATION":
+            return self.emulator.get_all_orders(symbol, start_time)
+        params = {'symbol': symbol.upper()}
+        if start_time is not None:
+            params['startTime'] = int(start_time)
+        raw_orders = self.client.get_all_orders(**params)
+        return [self._normalize_order(raw) for raw in raw_orders]
+
+    def create_user_stream(self):
+        """
+        Создает поток пользовательских событий (исполнения ордеров).
+        В режиме эмуляции возвращается локальная замена.
+        """
+        if self.mode == "EMULATION":
+            stream = LocalUserStream()
+            self.emulator.add_listener(stream.emit)
+            return stream
+        return BinanceUserStream(self.client, mode=self.mode)
 
     def check_connection(self):
         """
@@ -94,5 +308,21 @@ class BinanceAdapter:
         """
         if self.mode == "EMULATION":
             return True
-        # Здесь можно добавить реальную проверку соединения через self.client
-        return True
\ No newline at end of file
+        # Ошибки сети и ключей пробрасываются вызывающему коду
+        self.client.ping()
+        self.client.get_account()
+        return True
+
+    def close(self):
+        """Закрывает пул соединений REST-клиента и поток рыночных данных"""
+        self.filters.stop()
+        if self.emulator_feed is not None:
+            self.emulator_feed.stop()
+        if self._public_client is not None:
+            self._public_client.close()
+        if self.market_stream is not None:
+            self.market_stream.stop()
+        if self.depth_stream is not None:
+            self.depth_stream.stop()
+        if self.client is not None:
+            self.client.close()
\ No newline at end of file
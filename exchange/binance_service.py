@@ -0,0 +1,377 @@
+import time
+import hmac
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote
+
+from infra.metrics import metrics
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+BASE_URLS = {
+    "PRODUCTION": "https://api.binance.com",
+    "TESTNET": "https://testnet.binance.vision",
+}
+
+# Лимит REQUEST_WEIGHT спотового API Binance на минуту
+WEIGHT_LIMIT_1M = 6000
+
+# Код ошибки Binance: timestamp вне recvWindow
+ERROR_TIMESTAMP = -1021
+
+
+class BinanceAPIError(Exception):
+    """Ошибка REST API Binance (HTTP-статус и код/сообщение биржи)"""
+
+    def __init__(self, status: int, code: int = None, message: str = '', retry_after: float = None):
+        super().__init__(f"Binance API {status} [{code}]: {message}")
+        self.status = status
+        self.code = code
+        self.message = message
+        # Для 429/418: через сколько секунд биржа снова примет запросы
+        self.retry_after = retry_after
+
+
+class WeightBudget:
+    """
+    Токен-бакет по весу запросов. Пополняется равномерно (лимит в минуту),
+    а после каждого ответа сверяется с заголовком X-MBX-USED-WEIGHT-1M,
+    чтобы учитывать и чужие запросы с того же IP. После 429/418 запросы
+    не отправляются до истечения Retry-After: если ждать дольше max_wait,
+    запрос сразу отклоняется с BinanceAPIError.
+    """
+
+    def __init__(self, limit: int = WEIGHT_LIMIT_1M, safety: float = 0.9):
+        self.capacity = limit * safety
+        self.rate = self.capacity / 60
+        self.tokens = self.capacity
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, weight: int, max_wait: float = None):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    remaining = self.blocked_until - now
+                    if max_wait is not None and remaining > max_wait:
+                        raise BinanceAPIError(429, None, f"Запросы приостановлены еще на {remaining:.0f} с",
+                                              retry_after=remaining)
+                    await asyncio.sleep(remaining)
+                    continue
+                self._refill()
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                await asyncio.sleep((weight - self.tokens) / self.rate)
+
+    def update_used(self, used_weight: int):
+        """Сверка с фактическим весом, который биржа насчитала за текущую минуту"""
+        self._refill()
+        self.tokens = min(self.tokens, self.capacity - used_weight)
+
+    def block(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class RequestSigner:
+    """
+    Подпись HMAC-SHA256. Ключ обрабатывается один раз, на каждый запрос
+    копируется готовое состояние hmac. Порядок параметров кэшируется
+    по шаблону запроса (путь + набор параметров).
+    """
+
+    def __init__(self, api_secret: str):
+        self._mac = hmac.new(api_secret.encode(), digestmod=hashlib.sha256)
+        self._templates: Dict[Tuple[str, frozenset], Tuple[str, ...]] = {}
+
+    def query(self, path: str, params: dict) -> str:
+        key = (path, frozenset(params))
+        order = self._templates.get(key)
+        if order is None:
+            order = tuple(sorted(params))
+            self._templates[key] = order
+        return '&'.join(f"{name}={quote(str(params[name]), safe='')}" for name in order)
+
+    def sign(self, query: str) -> str:
+        mac = self._mac.copy()
+        mac.update(query.encode())
+        return mac.hexdigest()
+
+
+class AsyncBinanceClient:
+    """
+    Асинхронный REST-клиент Binance Spot на aiohttp с пулом keep-alive соединений.
+    base_url можно направить на локальный тестовый сервер.
+
+    После 429 запрос повторяется, только если Retry-After не больше
+    max_retry_wait; иначе вызывающий код сразу получает BinanceAPIError с
+    retry_after, а не ждет ответа дольше таймаута синхронного фасада.
+    """
+    RECV_WINDOW = 5000
+    MAX_RETRIES = 2
+    MAX_RETRY_WAIT = 10
+
+    def __init__(self, api_key: str = None, api_secret: str = None, base_url: str = BASE_URLS["PRODUCTION"],
+                 pool_size: int = 20, timeout: float = 10, weight_limit: int = WEIGHT_LIMIT_1M,
+                 max_retry_wait: float = MAX_RETRY_WAIT):
+        if aiohttp is None:
+            raise RuntimeError("Для REST-клиента нужен пакет aiohttp")
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.signer = RequestSigner(api_secret) if api_secret else None
+        self.budget = WeightBudget(weight_limit)
+        self.max_retry_wait = max_retry_wait
+        self.time_offset = 0
+        self._session: Optional['aiohttp.ClientSession'] = None
+
+    async def start(self):
+        if self._session is not None:
+            return
+        connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60, ttl_dns_cache=300)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def request(self, method: str, path: str, params: dict = None, signed: bool = False,
+                      weight: int = 1, api_key: bool = False) -> dict:
+        """
+        Запрос к REST API. Ключ X-MBX-APIKEY отправляется только подписанным
+        запросам и запросам с api_key=True (например, userDataStream).
+        """
+        await self.start()
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        headers = None
+        if signed or api_key:
+            if not self.api_key:
+                raise BinanceAPIError(401, None, f"Для запроса {path} нужен API key")
+            headers = {'X-MBX-APIKEY': self.api_key}
+        for attempt in range(self.MAX_RETRIES + 1):
+            await self.budget.acquire(weight, self.max_retry_wait)
+            if signed:
+                if self.signer is None:
+                    raise BinanceAPIError(401, None, "Для подписанного запроса нужен API secret")
+                with metrics.span('signing', params.get('symbol', '')):
+                    params['timestamp'] = int(time.time() * 1000) + self.time_offset
+                    params['recvWindow'] = self.RECV_WINDOW
+                    query = self.signer.query(path, params)
+                    query = f"{query}&signature={self.signer.sign(query)}"
+            else:
+                query = '&'.join(f"{k}={quote(str(v), safe='')}" for k, v in params.items())
+            url = f"{self.base_url}{path}?{query}" if query else f"{self.base_url}{path}"
+
+            # Отправка и ожидание ответа по каждому эндпоинту отдельно
+            sent_ns = time.perf_counter_ns()
+            async with self._session.request(method, url, headers=headers) as resp:
+                metrics.observe_ns(f"http {method} {path}", time.perf_counter_ns() - sent_ns, params.get('symbol', ''))
+                used = resp.headers.get('X-MBX-USED-WEIGHT-1M') or resp.headers.get('X-MBX-USED-WEIGHT')
+                if used is not None:
+                    self.budget.update_used(int(used))
+                if resp.status in (418, 429):
+                    retry_after = int(resp.headers.get('Retry-After', 60))
+                    self.budget.block(retry_after)
+                    logger.warning(f"Binance ограничил запросы ({resp.status}), пауза {retry_after} с")
+                    if resp.status == 429 and attempt < self.MAX_RETRIES and retry_after <= self.max_retry_wait:
+                        continue
+                    raise BinanceAPIError(resp.status, None, f"Превышен лимит запросов, Retry-After {retry_after}",
+                                          retry_after=retry_after)
+                data = await resp.json(content_type=None)
+                if resp.status >= 400:
+                    code = data.get('code') if isinstance(data, dict) else None
+                    message = data.get('msg', '') if isinstance(data, dict) else str(data)
+                    if code == ERROR_TIMESTAMP and attempt < self.MAX_RETRIES:
+                        await self.sync_time()
+                        continue
+                    raise BinanceAPIError(resp.status, code, message)
+                return data
+
+    async def sync_time(self):
+        """Поправка локального времени к времени сервера для подписи запросов"""
+        server = await self.request('GET', '/api/v3/time')
+        self.time_offset = int(server['serverTime']) - int(time.time() * 1000)
+
+    # --- Публичные методы (имена как в python-binance) ---
+
+    async def ping(self) -> dict:
+        return await self.request('GET', '/api/v3/ping')
+
+    async def get_server_time(self) -> dict:
+        return await self.request('GET', '/api/v3/time')
+
+    async def get_exchange_info(self) -> dict:
+        return await self.request('GET', '/api/v3/exchangeInfo', weight=20)
+
+    async def get_symbol_info(self, symbol: str) -> Optional[dict]:
+        info = await self.request('GET', '/api/v3/exchangeInfo', {'symbol': symbol}, weight=2)
+        symbols = info.get('symbols', [])
+        return symbols[0] if symbols else None
+
+    async def get_symbol_ticker(self, symbol: str) -> dict:
+        return await self.request('GET', '/api/v3/ticker/price', {'symbol': symbol}, weight=2)
+
+    async def get_order_book(self, symbol: str, limit: int = 1000) -> dict:
+        # Вес зависит от глубины: до 100 уровней - 5, до 500 - 25, до 1000 - 50, 5000 - 250
+        weight = 5 if limit <= 100 else 25 if limit <= 500 else 50 if limit <= 1000 else 250
+        return await self.request('GET', '/api/v3/depth', {'symbol': symbol, 'limit': limit}, weight=weight)
+
+    # --- Подписанные методы ---
+
+    async def get_account(self) -> dict:
+        return await self.request('GET', '/api/v3/account', signed=True, weight=20)
+
+    async def get_asset_balance(self, asset: str) -> Optional[dict]:
+        account = await self.get_account()
+        for balance in account.get('balances', []):
+            if balance['asset'] == asset:
+                return balance
+        return None
+
+    async def create_order(self, **params) -> dict:
+        params.setdefault('newOrderRespType', 'FULL')
+        return await self.request('POST', '/api/v3/order', params, signed=True)
+
+    async def get_order(self, symbol: str, orderId) -> dict:
+        return await self.request('GET', '/api/v3/order', {'symbol': symbol, 'orderId': orderId},
+                                  signed=True, weight=4)
+
+    async def cancel_order(self, symbol: str, orderId) -> dict:
+        return await self.request('DELETE', '/api/v3/order', {'symbol': symbol, 'orderId': orderId}, signed=True)
+
+    async def cancel_open_orders(self, symbol: str) -> list:
+        return await self.request('DELETE', '/api/v3/openOrders', {'symbol': symbol}, signed=True)
+
+    async def get_open_orders(self, symbol: str) -> list:
+        return await self.request('GET', '/api/v3/openOrders', {'symbol': symbol}, signed=True, weight=6)
+
+    async def get_all_orders(self, symbol: str, startTime: int = None, limit: int = None) -> list:
+        return await self.request('GET', '/api/v3/allOrders',
+                                  {'symbol': symbol, 'startTime': startTime, 'limit': limit},
+                                  signed=True, weight=20)
+
+    async def stream_get_listen_key(self) -> str:
+        data = await self.request('POST', '/api/v3/userDataStream', weight=2, api_key=True)
+        return data['listenKey']
+
+    async def stream_keepalive(self, listenKey: str) -> dict:
+        return await self.request('PUT', '/api/v3/userDataStream', {'listenKey': listenKey}, weight=2,
+                                  api_key=True)
+
+
+class BinanceService:
+    """
+    Синхронный фасад над AsyncBinanceClient для адаптера и OrderManager.
+    Event loop с пулом соединений живет в отдельном потоке; методы
+    повторяют имена python-binance, поэтому вызывающий код не меняется.
+    """
+
+    def __init__(self, api_key: str = None, api_secret: str = None, mode: str = "PRODUCTION",
+                 base_url: str = None, request_timeout: float = 30, **client_kwargs):
+        self.request_timeout = request_timeout
+        self.aclient = AsyncBinanceClient(api_key, api_secret, base_url or BASE_URLS.get(mode, BASE_URLS["PRODUCTION"]),
+                                          **client_kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def run(self, coro):
+        """
+        Выполнить корутину в потоке клиента и дождаться результата. По таймауту
+        корутина отменяется, чтобы запрос (например, ордер) не ушел на биржу позже.
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(self.request_timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def gather(self, *coros) -> list:
+        """
+        Выполнить несколько запросов параллельно. Исключения возвращаются
+        на местах результатов, как в asyncio.gather(return_exceptions=True).
+        """
+        async def _gather():
+            return await asyncio.gather(*coros, return_exceptions=True)
+        return self.run(_gather())
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        try:
+            self.run(self.aclient.close())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop.close()
+
+    def ping(self) -> dict:
+        return self.run(self.aclient.ping())
+
+    def get_server_time(self) -> dict:
+        return self.run(self.aclient.get_server_time())
+
+    def get_exchange_info(self) -> dict:
+        return self.run(self.aclient.get_exchange_info())
+
+    def get_symbol_info(self, symbol: str) -> Optional[dict]:
+        return self.run(self.aclient.get_symbol_info(symbol))
+
+    def get_symbol_ticker(self, symbol: str) -> dict:
+        return self.run(self.aclient.get_symbol_ticker(symbol))
+
+    def get_order_book(self, symbol: str, limit: int = 1000) -> dict:
+        return self.run(self.aclient.get_order_book(symbol, limit))
+
+    def get_account(self) -> dict:
+        return self.run(self.aclient.get_account())
+
+    def get_asset_balance(self, asset: str) -> Optional[dict]:
+        return self.run(self.aclient.get_asset_balance(asset))
+
+    def create_order(self, **params) -> dict:
+        return self.run(self.aclient.create_order(**params))
+
+    def get_order(self, symbol: str, orderId) -> dict:
+        return self.run(self.aclient.get_order(symbol, orderId))
+
+    def cancel_order(self, symbol: str, orderId) -> dict:
+        return self.run(self.aclient.cancel_order(symbol, orderId))
+
+    def cancel_open_orders(self, symbol: str) -> list:
+        return self.run(self.aclient.cancel_open_orders(symbol))
+
+    def get_open_orders(self, symbol: str) -> list:
+        return self.run(self.aclient.get_open_orders(symbol))
+
+    def get_all_orders(self, symbol: str, startTime: int = None, limit: int = None) -> list:
+        return self.run(self.aclient.get_all_orders(symbol, startTime, limit))
+
+    def stream_get_listen_key(self) -> str:
+        return self.run(self.aclient.stream_get_listen_key())
+
+    def stream_keepalive(self, listenKey: str) -> dict:
+        return self.run(self.aclient.stream_keepalive(listenKey))
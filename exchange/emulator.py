@@ -0,0 +1,449 @@
+import csv
+import time
+import heapq
+import logging
+import itertools
+import threading
+from decimal import Decimal
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Котируемые активы для разбора символа на базовый/котируемый
+QUOTE_ASSETS = ('USDT', 'FDUSD', 'USDC', 'BUSD', 'TUSD', 'BTC', 'ETH', 'BNB')
+
+# Комиссия совпадает с OrderManager.COMMISSION_RATE
+DEFAULT_COMMISSION_RATE = Decimal('0.0015')
+
+OPEN_STATUSES = ('NEW', 'PARTIALLY_FILLED')
+
+logger = logging.getLogger(__name__)
+
+
+def split_symbol(symbol: str) -> Tuple[str, str]:
+    """BTCUSDT -> ('BTC', 'USDT')"""
+    for quote in QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)], quote
+    raise ValueError(f"Не удалось определить котируемый актив для {symbol}")
+
+
+@dataclass
+class EmulatedOrder:
+    id: int
+    symbol: str
+    side: str  # 'BUY' или 'SELL'
+    type: str  # 'MARKET' или 'LIMIT'
+    quantity: Decimal
+    price: Optional[Decimal] = None
+    status: str = 'NEW'
+    filled_qty: Decimal = Decimal('0')
+    quote_qty: Decimal = Decimal('0')
+    commission: Decimal = Decimal('0')
+    time: int = 0
+
+    @property
+    def remaining(self) -> Decimal:
+        return self.quantity - self.filled_qty
+
+    def to_dict(self) -> dict:
+        """Ордер в формате, с которым работает OrderManager"""
+        return {
+            'id': str(self.id),
+            'symbol': self.symbol,
+            'side': self.side.lower(),
+            'type': self.type.lower(),
+            'amount': self.quantity,
+            'price': self.price if self.price is not None else Decimal('0'),
+            'status': self.status,
+            'filled_qty': self.filled_qty,
+            'avg_price': self.quote_qty / self.filled_qty if self.filled_qty > 0 else Decimal('0'),
+            'time': self.time
+        }
+
+
+@dataclass
+class OrderBook:
+    """Стакан лимитных ордеров одного символа с приоритетом цена-время"""
+    bids: List[tuple] = field(default_factory=list)  # (-price, seq, order)
+    asks: List[tuple] = field(default_factory=list)  # (price, seq, order)
+    last_price: Optional[Decimal] = None
+    # Объем последнего тика, еще не забранный ордерами; None - ликвидность не ограничена
+    available: Optional[Decimal] = None
+
+    def add(self, order: EmulatedOrder, seq: int):
+        if order.side == 'BUY':
+            heapq.heappush(self.bids, (-order.price, seq, order))
+        else:
+            heapq.heappush(self.asks, (order.price, seq, order))
+
+    @staticmethod
+    def top(heap: List[tuple]) -> Optional[EmulatedOrder]:
+        # Отмененные ордера удаляются лениво, при подъеме на вершину
+        while heap and heap[0][2].status not in OPEN_STATUSES:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+
+class PriceFeed:
+    """
+    Воспроизводимая лента цен: последовательность (timestamp_ms, price, volume).
+    volume=None означает неограниченную ликвидность на тике.
+    """
+
+    def __init__(self, symbol: str, ticks: Iterable[tuple]):
+        self.symbol = symbol.upper()
+        self._ticks = list(ticks)
+
+    @classmethod
+    def from_csv(cls, symbol: str, path: str, price_column: str = 'close',
+                 volume_column: Optional[str] = 'volume', time_column: str = 'open_time') -> 'PriceFeed':
+        ticks = []
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                volume = Decimal(row[volume_column]) if volume_column else None
+                ticks.append((int(float(row[time_column])), Decimal(row[price_column]), volume))
+        return cls(symbol, ticks)
+
+    def __iter__(self) -> Iterator[tuple]:
+        return iter(self._ticks)
+
+    def __len__(self) -> int:
+        return len(self._ticks)
+
+
+class MatchingEngine:
+    """
+    Внутрипроцессная биржа для режима эмуляции.
+
+    Лимитные ордера ждут в стакане и исполняются по своей цене, когда тик ленты
+    пересекает их уровень (в пределах объема тика, поэтому возможны частичные
+    исполнения). Рыночные ордера исполняются по последней цене в пределах
+    объема последнего тика, который еще не забрали лимитные ордера; остаток
+    истекает (EXPIRED), как на Binance при нехватке ликвидности. Комиссия
+    списывается из получаемого актива, как на Binance без оплаты в BNB.
+
+    Тики ленты (EmulatorFeed) и ордера торговых потоков приходят из разных
+    потоков, поэтому состояние меняется под общей RLock; подписчики вызываются
+    под ней и могут снова обращаться к движку.
+    """
+
+    def __init__(self, balances: Optional[Dict[str, Decimal]] = None,
+                 commission_rate: Decimal = DEFAULT_COMMISSION_RATE):
+        self.commission_rate = Decimal(str(commission_rate))
+        self.free: Dict[str, Decimal] = {asset: Decimal(str(v)) for asset, v in (balances or {}).items()}
+        self.locked: Dict[str, Decimal] = {}
+        self.books: Dict[str, OrderBook] = {}
+        self.orders: Dict[int, EmulatedOrder] = {}
+        # Индекс активных ордеров по символу, чтобы не перебирать всю историю
+        self._open: Dict[str, Dict[int, EmulatedOrder]] = {}
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self._clock: Optional[int] = None
+        self._listeners: List[Callable[[dict], None]] = []
+        self._mutex = threading.RLock()
+
+    # --- Время и подписчики ---
+
+    def now(self) -> int:
+        """Текущее время в мс: время ленты при воспроизведении, иначе системное"""
+        return self._clock if self._clock is not None else int(time.time() * 1000)
+
+    def add_listener(self, callback: Callable[[dict], None]):
+        """Подписка на события executionReport в формате Binance"""
+        self._listeners.append(callback)
+
+    def _emit(self, order: EmulatedOrder, last_qty: Decimal = Decimal('0'),
+              last_price: Decimal = Decimal('0'), commission: Decimal = Decimal('0')):
+        if not self._listeners:
+            return
+        base, quote = split_symbol(order.symbol)
+        event = {
+            'e': 'executionReport',
+            'E': self.now(),
+            's': order.symbol,
+            'S': order.side,
+            'o': order.type,
+            'q': str(order.quantity),
+            'p': str(order.price or 0),
+            'X': order.status,
+            'i': order.id,
+            'l': str(last_qty),
+            'z': str(order.filled_qty),
+            'L': str(last_price),
+            'n': str(commission),
+            'N': base if order.side == 'BUY' else quote,
+            'T': self.now(),
+            'Z': str(order.quote_qty),
+        }
+        for callback in self._listeners:
+            callback(event)
+
+    # --- Баланс ---
+
+    def get_balance(self, asset: str) -> Decimal:
+        return self.free.get(asset.upper(), Decimal('0'))
+
+    def get_locked(self, asset: str) -> Decimal:
+        return self.locked.get(asset.upper(), Decimal('0'))
+
+    def deposit(self, asset: str, amount: Decimal):
+        with self._mutex:
+            asset = asset.upper()
+            self.free[asset] = self.get_balance(asset) + Decimal(str(amount))
+
+    def _lock(self, asset: str, amount: Decimal):
+        free = self.get_balance(asset)
+        if free < amount:
+            raise ValueError(f"Недостаточно средств {asset}: нужно {amount}, доступно {free}")
+        self.free[asset] = free - amount
+        self.locked[asset] = self.get_locked(asset) + amount
+
+    def _unlock(self, asset: str, amount: Decimal):
+        self.locked[asset] = self.get_locked(asset) - amount
+        self.free[asset] = self.get_balance(asset) + amount
+
+    # --- Цены ---
+
+    def _book(self, symbol: str) -> OrderBook:
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = OrderBook()
+        return book
+
+    def get_price(self, symbol: str) -> Decimal:
+        with self._mutex:
+            price = self._book(symbol.upper()).last_price
+            if price is None:
+                raise ValueError(f"Нет цены для {symbol}: лента цен еще не запущена")
+            return price
+
+    def set_price(self, symbol: str, price: Decimal, volume: Optional[Decimal] = None,
+                  timestamp: Optional[int] = None):
+        """
+        Применяет тик ленты: обновляет последнюю цену и исполняет пересеченные лимитные ордера
+        """
+        with self._mutex:
+            if timestamp is not None:
+                self._clock = int(timestamp)
+            book = self._book(symbol.upper())
+            book.last_price = Decimal(str(price))
+            volume = Decimal(str(volume)) if volume is not None else None
+            volume = self._match(book, book.bids, lambda order: order.price >= book.last_price, volume)
+            volume = self._match(book, book.asks, lambda order: order.price <= book.last_price, volume)
+            # Остаток объема тика доступен ордерам, которые исполнятся до следующего тика
+            book.available = volume
+
+    def replay(self, feed: PriceFeed, on_tick: Optional[Callable[[tuple], None]] = None):
+        """Прогоняет ленту цен через движок; on_tick вызывается после каждого тика"""
+        for tick in feed:
+            timestamp, price, volume = tick
+            self.set_price(feed.symbol, price, volume, timestamp)
+            if on_tick:
+                on_tick(tick)
+
+    def _match(self, book: OrderBook, heap: List[tuple], crosses: Callable,
+               volume: Optional[Decimal]) -> Optional[Decimal]:
+        """Исполняет пересеченные ордера стороны; возвращает неиспользованный объем тика"""
+        remaining = volume
+        while remaining is None or remaining > 0:
+            order = book.top(heap)
+            if order is None or not crosses(order):
+                break
+            qty = order.remaining if remaining is None else min(order.remaining, remaining)
+            # Ордер из стакана исполняется по своей цене (как мейкер)
+            self._fill(order, qty, order.price)
+            if remaining is not None:
+                remaining -= qty
+        return remaining
+
+    # --- Исполнение ---
+
+    def _fill(self, order: EmulatedOrder, qty: Decimal, price: Decimal):
+        base, quote = split_symbol(order.symbol)
+        quote_qty = qty * price
+        if order.side == 'BUY':
+            commission = qty * self.commission_rate
+            if order.type == 'LIMIT':
+                # Разблокируем по цене лимита; при исполнении по лучшей цене разница вернется
+                self.locked[quote] = self.get_locked(quote) - qty * order.price
+                self.free[quote] = self.get_balance(quote) + qty * order.price - quote_qty
+            else:
+                self.free[quote] = self.get_balance(quote) - quote_qty
+            self.free[base] = self.get_balance(base) + qty - commission
+        else:
+            commission = quote_qty * self.commission_rate
+            if order.type == 'LIMIT':
+                self.locked[base] = self.get_locked(base) - qty
+            else:
+                self.free[base] = self.get_balance(base) - qty
+            self.free[quote] = self.get_balance(quote) + quote_qty - commission
+
+        order.filled_qty += qty
+        order.quote_qty += quote_qty
+        order.commission += commission
+        if order.filled_qty >= order.quantity:
+            order.status = 'FILLED'
+            self._open.get(order.symbol, {}).pop(order.id, None)
+        else:
+            order.status = 'PARTIALLY_FILLED'
+        self._emit(order, qty, price, commission)
+
+    def create_order(self, symbol: str, side: str, order_type: str,
+                     quantity: Decimal, price: Optional[Decimal] = None) -> dict:
+        with self._mutex:
+            symbol, side, order_type = symbol.upper(), side.upper(), order_type.upper()
+            quantity = Decimal(str(quantity))
+            if quantity <= 0:
+                raise ValueError(f"Некорректное количество {quantity}")
+            base, quote = split_symbol(symbol)
+            book = self._book(symbol)
+            last_price = self.get_price(symbol)
+
+            order = EmulatedOrder(
+                id=next(self._ids),
+                symbol=symbol,
+                side=side,
+                type=order_type,
+                quantity=quantity,
+                price=Decimal(str(price)) if price is not None else None,
+                time=self.now()
+            )
+
+            if order_type == 'MARKET':
+                if side == 'BUY' and self.get_balance(quote) < quantity * last_price:
+                    raise ValueError(f"Недостаточно средств {quote} для покупки {quantity} {symbol}")
+                if side == 'SELL' and self.get_balance(base) < quantity:
+                    raise ValueError(f"Недостаточно средств {base} для продажи {quantity} {symbol}")
+                self.orders[order.id] = order
+                self._take_liquidity(book, order, last_price)
+                if order.filled_qty < quantity:
+                    order.status = 'EXPIRED'
+                    self._emit(order)
+                return order.to_dict()
+
+            if order_type != 'LIMIT' or order.price is None:
+                raise ValueError(f"Неподдерживаемый тип ордера {order_type}")
+
+            if side == 'BUY':
+                self._lock(quote, quantity * order.price)
+            else:
+                self._lock(base, quantity)
+            self.orders[order.id] = order
+            self._open.setdefault(symbol, {})[order.id] = order
+            self._emit(order)
+
+            # Лимитный ордер, пересекающий рынок, исполняется сразу по последней цене
+            # в пределах объема тика; остаток ждет в стакане по своей цене
+            if (side == 'BUY' and order.price >= last_price) or (side == 'SELL' and order.price <= last_price):
+                self._take_liquidity(book, order, last_price)
+            if order.status in OPEN_STATUSES:
+                book.add(order, next(self._seq))
+            return order.to_dict()
+
+    def _take_liquidity(self, book: OrderBook, order: EmulatedOrder, price: Decimal):
+        """Исполнение по рынку в пределах оставшегося объема последнего тика"""
+        qty = order.remaining if book.available is None else min(order.remaining, book.available)
+        if qty <= 0:
+            return
+        if book.available is not None:
+            book.available -= qty
+        self._fill(order, qty, price)
+
+    def cancel_order(self, order_id, symbol: str) -> dict:
+        with self._mutex:
+            order = self._get(order_id)
+            if order.status not in OPEN_STATUSES:
+                raise ValueError(f"Ордер {order_id} уже не активен ({order.status})")
+            base, quote = split_symbol(order.symbol)
+            if order.side == 'BUY':
+                self._unlock(quote, order.remaining * order.price)
+            else:
+                self._unlock(base, order.remaining)
+            order.status = 'CANCELED'
+            self._open.get(order.symbol, {}).pop(order.id, None)
+            self._emit(order)
+            return order.to_dict()
+
+    def _get(self, order_id) -> EmulatedOrder:
+        order = self.orders.get(int(order_id))
+        if order is None:
+            raise ValueError(f"Ордер {order_id} не найден")
+        return order
+
+    def get_order(self, order_id, symbol: str) -> dict:
+        with self._mutex:
+            return self._get(order_id).to_dict()
+
+    def get_open_orders(self, symbol: str) -> List[dict]:
+        with self._mutex:
+            return [o.to_dict() for o in self._open.get(symbol.upper(), {}).values()]
+
+    def get_all_orders(self, symbol: str, start_time: Optional[int] = None) -> List[dict]:
+        with self._mutex:
+            symbol = symbol.upper()
+            return [o.to_dict() for o in self.orders.values()
+                    if o.symbol == symbol and (start_time is None or o.time >= start_time)]
+
+
+class EmulatorFeed:
+    """
+    Лента цен эмулятора в реальном времени. Раз в interval секунд каждый символ
+    получает тик: из записанной ленты (PriceFeed), если она задана, иначе из
+    fetch_price (публичный тикер Binance). Время тиков записанной ленты не
+    переносится в движок, чтобы время ордеров оставалось системным.
+    """
+
+    def __init__(self, engine: MatchingEngine, symbols: Iterable[str] = (),
+                 feeds: Optional[Dict[str, PriceFeed]] = None,
+                 fetch_price: Optional[Callable[[str], Decimal]] = None, interval: float = 1.0):
+        self.engine = engine
+        self.symbols = sorted({s.upper() for s in symbols})
+        self.fetch_price = fetch_price
+        self.interval = interval
+        self._feeds: Dict[str, Iterator[tuple]] = {s.upper(): iter(feed) for s, feed in (feeds or {}).items()}
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def subscribe(self, symbols: Iterable[str]):
+        """Добавляет символы; первый тик новых символов применяется сразу"""
+        added = {s.upper() for s in symbols} - set(self.symbols)
+        self.symbols = sorted(set(self.symbols) | added)
+        self.tick(sorted(added))
+
+    def start(self):
+        """
+        Применяет первый тик синхронно, чтобы цена была известна до первого
+        ордера, и запускает фоновый поток
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self.tick()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=self.interval + 1)
+
+    def tick(self, symbols: Optional[Iterable[str]] = None):
+        for symbol in self.symbols if symbols is None else symbols:
+            try:
+                if symbol in self._feeds:
+                    tick = next(self._feeds[symbol], None)
+                    if tick is None:
+                        # Лента закончилась: цена остается последней
+                        continue
+                    _, price, volume = tick
+                elif self.fetch_price is not None:
+                    price, volume = self.fetch_price(symbol), None
+                else:
+                    continue
+                self.engine.set_price(symbol, price, volume)
+            except Exception as e:
+                logger.warning(f"Не удалось получить цену {symbol} для эмулятора: {e}")
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.tick()
@@ -0,0 +1,202 @@
+import json
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, Optional
+
+try:
+    import websocket  # пакет websocket-client
+except ImportError:
+    websocket = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Quote:
+    """Снимок рынка по символу. Объект неизменяемый: кэш заменяет его целиком."""
+    bid: Optional[Decimal] = None
+    ask: Optional[Decimal] = None
+    bid_qty: Optional[Decimal] = None
+    ask_qty: Optional[Decimal] = None
+    last: Optional[Decimal] = None
+    updated: float = 0.0
+
+    @property
+    def mid(self) -> Optional[Decimal]:
+        if self.bid is None or self.ask is None:
+            return None
+        return (self.bid + self.ask) / 2
+
+    @property
+    def price(self) -> Optional[Decimal]:
+        return self.last if self.last is not None else self.mid
+
+
+def _always_alive() -> bool:
+    return True
+
+
+class MarketDataCache:
+    """
+    Кэш последних цен и лучших bid/ask.
+
+    Писатель (поток websocket) подменяет объект Quote в словаре, читатели
+    берут его без блокировок - запись ссылки в dict атомарна под GIL.
+    Если котировка старше max_age или поток отключен, цена запрашивается
+    через fallback (REST) и кладется в кэш.
+    """
+
+    def __init__(self, fallback: Optional[Callable[[str], Decimal]] = None, max_age: float = 10.0):
+        self.fallback = fallback
+        self.max_age = max_age
+        self._quotes: Dict[str, Quote] = {}
+        # Проверка связи с источником потока (MarketDataStream.is_connected)
+        self.source_alive: Callable[[], bool] = _always_alive
+
+    def update_book(self, symbol: str, bid: Decimal, bid_qty: Decimal, ask: Decimal, ask_qty: Decimal):
+        quote = self._quotes.get(symbol)
+        last = quote.last if quote is not None else None
+        self._quotes[symbol] = Quote(bid, ask, bid_qty, ask_qty, last, time.monotonic())
+
+    def update_trade(self, symbol: str, price: Decimal):
+        quote = self._quotes.get(symbol)
+        if quote is None:
+            self._quotes[symbol] = Quote(last=price, updated=time.monotonic())
+        else:
+            self._quotes[symbol] = Quote(quote.bid, quote.ask, quote.bid_qty, quote.ask_qty, price, time.monotonic())
+
+    def get_quote(self, symbol: str) -> Optional[Quote]:
+        return self._quotes.get(symbol)
+
+    def is_stale(self, symbol: str) -> bool:
+        quote = self._quotes.get(symbol)
+        return quote is None or not self.source_alive() or time.monotonic() - quote.updated > self.max_age
+
+    def get_price(self, symbol: str, side: Optional[str] = None) -> Decimal:
+        """
+        Цена для решения: для покупки - лучший ask, для продажи - лучший bid,
+        без стороны - последняя сделка (или середина спреда).
+        """
+        quote = self._quotes.get(symbol)
+        if quote is not None and time.monotonic() - quote.updated <= self.max_age and self.source_alive():
+            if side == 'buy' and quote.ask is not None:
+                return quote.ask
+            if side == 'sell' and quote.bid is not None:
+                return quote.bid
+            price = quote.price
+            if price is not None:
+                return price
+        return self._refresh(symbol)
+
+    def _refresh(self, symbol: str) -> Decimal:
+        if self.fallback is None:
+            raise LookupError(f"Нет актуальной цены {symbol}")
+        price = Decimal(str(self.fallback(symbol)))
+        logger.debug(f"Цена {symbol} получена через REST: {price}")
+        self.update_trade(symbol, price)
+        return price
+
+
+class MarketDataStream:
+    """
+    Подписка на bookTicker и aggTrade символов через комбинированный поток Binance
+    с переподключением, как у BinanceUserStream.
+    """
+    WS_URLS = {
+        "PRODUCTION": "wss://stream.binance.com:9443/stream?streams=",
+        "TESTNET": "wss://testnet.binance.vision/stream?streams=",
+    }
+    RECV_TIMEOUT = 5
+    MAX_BACKOFF = 60
+
+    def __init__(self, cache: MarketDataCache, symbols: Iterable[str], mode: str = "PRODUCTION", ws_url: str = None):
+        self.cache = cache
+        self.symbols = sorted({s.upper() for s in symbols})
+        self.ws_url = ws_url or self.WS_URLS.get(mode, self.WS_URLS["PRODUCTION"])
+        self._connected = False
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._ws = None
+        cache.source_alive = self.is_connected
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    def start(self):
+        if websocket is None:
+            raise RuntimeError("Для потока рыночных данных нужен пакет websocket-client")
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._close_ws()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=self.RECV_TIMEOUT + 1)
+        self._connected = False
+
+    def subscribe(self, symbols: Iterable[str]):
+        """Меняет набор символов; поток переподключается с новым списком"""
+        self.symbols = sorted(set(self.symbols) | {s.upper() for s in symbols})
+        self._close_ws()
+
+    def _close_ws(self):
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def _url(self) -> str:
+        streams = []
+        for symbol in self.symbols:
+            name = symbol.lower()
+            streams.append(f"{name}@bookTicker")
+            streams.append(f"{name}@aggTrade")
+        return self.ws_url + '/'.join(streams)
+
+    def _run(self):
+        backoff = 1
+        while not self._stop_event.is_set():
+            try:
+                self._ws = websocket.create_connection(self._url(), timeout=self.RECV_TIMEOUT)
+                self._connected = True
+                backoff = 1
+                logger.info(f"Поток рыночных данных подключен: {', '.join(self.symbols)}")
+                self._receive_loop()
+            except Exception as e:
+                if not self._stop_event.is_set():
+                    logger.warning(f"Поток рыночных данных отключен: {e}")
+            finally:
+                self._connected = False
+                self._close_ws()
+                self._ws = None
+            if self._stop_event.wait(backoff):
+                break
+            backoff = min(backoff * 2, self.MAX_BACKOFF)
+
+    def _receive_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                message = self._ws.recv()
+            except websocket.WebSocketTimeoutException:
+                continue
+            if not message:
+                raise ConnectionError("Соединение закрыто биржей")
+            self.handle_message(json.loads(message))
+
+    def handle_message(self, message: dict):
+        data = message.get('data', message)
+        if 'b' in data and 'a' in data and 'B' in data:
+            # bookTicker: {"s", "b", "B", "a", "A"}
+            self.cache.update_book(data['s'], Decimal(data['b']), Decimal(data['B']),
+                                   Decimal(data['a']), Decimal(data['A']))
+        elif data.get('e') == 'aggTrade':
+            self.cache.update_trade(data['s'], Decimal(data['p']))
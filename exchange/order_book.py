@@ -0,0 +1,360 @@
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    import websocket  # пакет websocket-client
+except ImportError:
+    websocket = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FillEstimate:
+    """Оценка исполнения рыночного ордера по текущему стакану"""
+    quantity: Decimal          # сколько удастся исполнить
+    cost: Decimal              # стоимость в котируемой валюте
+    vwap: Decimal              # средняя цена исполнения
+    worst_price: Decimal       # самый дальний задетый уровень
+    slippage_percent: Decimal  # отклонение vwap от лучшей цены
+    levels: int                # сколько уровней стакана задето
+
+
+class BookSide:
+    """Одна сторона стакана: уровни цена -> объем и отсортированный список цен"""
+
+    def __init__(self, descending: bool):
+        self.descending = descending
+        self.levels: Dict[Decimal, Decimal] = {}
+        # Цены хранятся по возрастанию; для bid лучший уровень - последний
+        self._prices: List[Decimal] = []
+
+    def clear(self):
+        self.levels.clear()
+        self._prices.clear()
+
+    def update(self, price: Decimal, quantity: Decimal):
+        if quantity == 0:
+            if self.levels.pop(price, None) is not None:
+                index = bisect_left(self._prices, price)
+                del self._prices[index]
+            return
+        if price not in self.levels:
+            insort(self._prices, price)
+        self.levels[price] = quantity
+
+    def best(self) -> Optional[Decimal]:
+        if not self._prices:
+            return None
+        return self._prices[-1] if self.descending else self._prices[0]
+
+    def walk(self):
+        """Уровни от лучшего к худшему"""
+        prices = reversed(self._prices) if self.descending else iter(self._prices)
+        for price in prices:
+            yield price, self.levels[price]
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+
+class OrderBookMirror:
+    """
+    Зеркало стакана L2 по символу: снимок REST + поток изменений diff depth.
+
+    Порядок синхронизации как в документации Binance: события буферизуются
+    до снимка, события с u <= lastUpdateId отбрасываются, первое применяемое
+    должно покрывать lastUpdateId + 1, далее U каждого события = u предыдущего + 1.
+    При разрыве последовательности зеркало помечается несинхронизированным
+    и требует новый снимок.
+    """
+    MAX_BUFFER = 1000
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol.upper()
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.last_update_id = 0
+        self.synced = False
+        self.updated = 0.0
+        self._buffer: List[dict] = []
+        self._lock = threading.Lock()
+
+    # --- Синхронизация ---
+
+    def apply_snapshot(self, snapshot: dict) -> bool:
+        """
+        Снимок GET /api/v3/depth: {'lastUpdateId', 'bids', 'asks'}.
+        Возвращает False, если снимок старше буфера событий и нужен повторный запрос.
+        """
+        with self._lock:
+            self.bids.clear()
+            self.asks.clear()
+            for price, quantity in snapshot['bids']:
+                self.bids.update(Decimal(price), Decimal(quantity))
+            for price, quantity in snapshot['asks']:
+                self.asks.update(Decimal(price), Decimal(quantity))
+            self.last_update_id = int(snapshot['lastUpdateId'])
+            self.synced = True
+            self.updated = time.monotonic()
+            buffered, self._buffer = self._buffer, []
+            first = True
+            for event in buffered:
+                if event['u'] <= self.last_update_id:
+                    continue
+                if first and event['U'] > self.last_update_id + 1:
+                    # Снимок старше буфера - нужен новый снимок
+                    self.synced = False
+                    self._buffer = [e for e in buffered if e['u'] > self.last_update_id]
+                    logger.warning(f"Стакан {self.symbol}: снимок не стыкуется с потоком")
+                    return False
+                first = False
+                self._apply(event)
+            return True
+
+    def apply_diff(self, event: dict) -> bool:
+        """
+        Событие depthUpdate {'U', 'u', 'b', 'a'}. Возвращает False,
+        если обнаружен разрыв и нужен новый снимок.
+        """
+        with self._lock:
+            if not self.synced:
+                if len(self._buffer) >= self.MAX_BUFFER:
+                    self._buffer.pop(0)
+                self._buffer.append(event)
+                return True
+            if event['u'] <= self.last_update_id:
+                return True
+            if event['U'] > self.last_update_id + 1:
+                logger.warning(f"Стакан {self.symbol}: разрыв последовательности "
+                               f"{self.last_update_id} -> {event['U']}, нужен новый снимок")
+                self.synced = False
+                self._buffer = [event]
+                return False
+            self._apply(event)
+            return True
+
+    def _apply(self, event: dict):
+        for price, quantity in event['b']:
+            self.bids.update(Decimal(price), Decimal(quantity))
+        for price, quantity in event['a']:
+            self.asks.update(Decimal(price), Decimal(quantity))
+        self.last_update_id = event['u']
+        self.updated = time.monotonic()
+
+    # --- Запросы ---
+
+    def best_bid(self) -> Optional[Decimal]:
+        return self.bids.best()
+
+    def best_ask(self) -> Optional[Decimal]:
+        return self.asks.best()
+
+    def _side_for(self, side: str) -> BookSide:
+        # Покупка забирает ask, продажа - bid
+        return self.asks if side == 'buy' else self.bids
+
+    def estimate_fill(self, side: str, quantity: Decimal) -> FillEstimate:
+        """VWAP и проскальзывание рыночного ордера на quantity монет"""
+        with self._lock:
+            return self._walk(self._side_for(side), quantity=Decimal(str(quantity)))
+
+    def estimate_quote_fill(self, side: str, quote_amount: Decimal) -> FillEstimate:
+        """То же для ордера на сумму в котируемой валюте (например, USDT)"""
+        with self._lock:
+            return self._walk(self._side_for(side), quote_amount=Decimal(str(quote_amount)))
+
+    @staticmethod
+    def _walk(book: BookSide, quantity: Decimal = None, quote_amount: Decimal = None) -> FillEstimate:
+        best = book.best()
+        filled = cost = Decimal('0')
+        worst = best
+        levels = 0
+        for price, available in book.walk():
+            if quantity is not None:
+                take = min(available, quantity - filled)
+            else:
+                take = min(available, (quote_amount - cost) / price)
+            if take <= 0:
+                break
+            filled += take
+            cost += take * price
+            worst = price
+            levels += 1
+            if (quantity is not None and filled >= quantity) or (quote_amount is not None and cost >= quote_amount):
+                break
+        if filled == 0:
+            return FillEstimate(Decimal('0'), Decimal('0'), Decimal('0'), Decimal('0'), Decimal('0'), 0)
+        vwap = cost / filled
+        slippage = abs(vwap - best) / best * 100
+        return FillEstimate(filled, cost, vwap, worst, slippage, levels)
+
+    def max_quantity_within(self, side: str, max_slippage_percent: Decimal) -> Decimal:
+        """Наибольший объем, который исполнится с проскальзыванием VWAP не выше заданного"""
+        max_slippage = Decimal(str(max_slippage_percent))
+        with self._lock:
+            book = self._side_for(side)
+            best = book.best()
+            if best is None:
+                return Decimal('0')
+            filled = cost = Decimal('0')
+            for price, available in book.walk():
+                # Сколько можно взять с этого уровня, чтобы VWAP остался в пределах
+                limit_vwap = best * (1 + max_slippage / 100) if side == 'buy' else best * (1 - max_slippage / 100)
+                denominator = price - limit_vwap
+                if denominator == 0 or (side == 'buy' and price <= limit_vwap) or (side == 'sell' and price >= limit_vwap):
+                    take = available
+                else:
+                    take = min(available, (limit_vwap * filled - cost) / denominator)
+                if take <= 0:
+                    break
+                filled += take
+                cost += take * price
+                if take < available:
+                    break
+            return filled
+
+    def split_order(self, side: str, quantity: Decimal, max_slippage_percent: Decimal,
+                    max_children: int = 10) -> List[Decimal]:
+        """
+        Делит крупный рыночный ордер на дочерние, каждый из которых по текущему
+        стакану укладывается в max_slippage_percent. Последний дочерний забирает остаток.
+        """
+        quantity = Decimal(str(quantity))
+        chunk = self.max_quantity_within(side, max_slippage_percent)
+        if chunk <= 0 or chunk >= quantity:
+            return [quantity]
+        children = []
+        remaining = quantity
+        while remaining > 0 and len(children) < max_children - 1:
+            take = min(chunk, remaining)
+            children.append(take)
+            remaining -= take
+        if remaining > 0:
+            children.append(remaining)
+        return children
+
+
+class DepthStream:
+    """
+    Поток diff depth (<symbol>@depth@100ms) для нескольких зеркал стакана.
+    После подключения и при разрыве последовательности зеркала
+    синхронизируются снимком через snapshot_fn(symbol).
+    """
+    WS_URLS = {
+        "PRODUCTION": "wss://stream.binance.com:9443/stream?streams=",
+        "TESTNET": "wss://testnet.binance.vision/stream?streams=",
+    }
+    RECV_TIMEOUT = 5
+    MAX_BACKOFF = 60
+    SNAPSHOT_RETRIES = 3
+
+    def __init__(self, symbols: Iterable[str], snapshot_fn: Callable[[str], dict],
+                 mode: str = "PRODUCTION", ws_url: str = None):
+        self.books: Dict[str, OrderBookMirror] = {s.upper(): OrderBookMirror(s) for s in symbols}
+        self.snapshot_fn = snapshot_fn
+        self.ws_url = ws_url or self.WS_URLS.get(mode, self.WS_URLS["PRODUCTION"])
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._ws = None
+        self._resyncing = set()
+        self._resync_lock = threading.Lock()
+
+    def get_book(self, symbol: str) -> Optional[OrderBookMirror]:
+        book = self.books.get(symbol.upper())
+        return book if book is not None and book.synced else None
+
+    def start(self):
+        if websocket is None:
+            raise RuntimeError("Для потока стакана нужен пакет websocket-client")
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=self.RECV_TIMEOUT + 1)
+
+    def _url(self) -> str:
+        return self.ws_url + '/'.join(f"{symbol.lower()}@depth@100ms" for symbol in self.books)
+
+    def _run(self):
+        backoff = 1
+        while not self._stop_event.is_set():
+            try:
+                self._ws = websocket.create_connection(self._url(), timeout=self.RECV_TIMEOUT)
+                backoff = 1
+                for book in self.books.values():
+                    book.synced = False
+                    self._resync(book.symbol)
+                self._receive_loop()
+            except Exception as e:
+                if not self._stop_event.is_set():
+                    logger.warning(f"Поток стакана отключен: {e}")
+            finally:
+                if self._ws is not None:
+                    try:
+                        self._ws.close()
+                    except Exception:
+                        pass
+                    self._ws = None
+            if self._stop_event.wait(backoff):
+                break
+            backoff = min(backoff * 2, self.MAX_BACKOFF)
+
+    def _receive_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                message = self._ws.recv()
+            except websocket.WebSocketTimeoutException:
+                continue
+            if not message:
+                raise ConnectionError("Соединение закрыто биржей")
+            self.handle_message(json.loads(message))
+
+    def handle_message(self, message: dict):
+        data = message.get('data', message)
+        if data.get('e') != 'depthUpdate':
+            return
+        book = self.books.get(data['s'])
+        if book is not None and not book.apply_diff(data):
+            self._resync(book.symbol)
+
+    def _resync(self, symbol: str):
+        """Снимок запрашивается в отдельном потоке, события тем временем буферизуются"""
+        with self._resync_lock:
+            if symbol in self._resyncing:
+                return
+            self._resyncing.add(symbol)
+
+        def load():
+            try:
+                for attempt in range(self.SNAPSHOT_RETRIES):
+                    if self.books[symbol].apply_snapshot(self.snapshot_fn(symbol)):
+                        logger.info(f"Стакан {symbol} синхронизирован")
+                        return
+                    if self._stop_event.wait(1):
+                        return
+                logger.error(f"Стакан {symbol}: не удалось синхронизировать снимок с потоком")
+            except Exception as e:
+                logger.error(f"Ошибка загрузки снимка стакана {symbol}: {e}")
+            finally:
+                with self._resync_lock:
+                    self._resyncing.discard(symbol)
+
+        threading.Thread(target=load, daemon=True).start()
@@ -0,0 +1,128 @@
+import time
+import logging
+import threading
+from decimal import Decimal
+from typing import Dict, Optional
+
+from utils.fixed_point import FixedFilters
+
+logger = logging.getLogger(__name__)
+
+
+class SymbolFilterRegistry:
+    """
+    Кэш фильтров инструментов (LOT_SIZE, PRICE_FILTER, MIN_NOTIONAL).
+
+    exchangeInfo загружается одним запросом на все символы, фильтры
+    разбираются в Decimal один раз и дальше отдаются из памяти.
+    Фоновый поток обновляет кэш раз в ttl секунд.
+    """
+    DEFAULT_TTL = 3600  # exchangeInfo меняется редко, часа достаточно
+
+    def __init__(self, client=None, ttl: float = DEFAULT_TTL, defaults: Optional[dict] = None):
+        self.client = client
+        self.ttl = ttl
+        # Фильтры по умолчанию для любых символов (режим эмуляции)
+        self._defaults = defaults
+        self._filters: Dict[str, dict] = {}
+        # Те же фильтры в целых единицах 1e-8 для округления без Decimal
+        self._fixed: Dict[str, FixedFilters] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._refresh_thread = None
+
+    @staticmethod
+    def parse_filters(symbol_info: dict) -> dict:
+        """Разбирает фильтры одного символа из exchangeInfo в Decimal"""
+        filters = {f['filterType']: f for f in symbol_info['filters']}
+        lot = filters['LOT_SIZE']
+        price = filters['PRICE_FILTER']
+        # MIN_NOTIONAL на споте постепенно заменяется фильтром NOTIONAL
+        notional = filters.get('MIN_NOTIONAL') or filters.get('NOTIONAL') or {}
+        return {
+            'minQty': Decimal(lot['minQty']),
+            'maxQty': Decimal(lot['maxQty']),
+            'stepSize': Decimal(lot['stepSize']),
+            'minPrice': Decimal(price['minPrice']),
+            'maxPrice': Decimal(price['maxPrice']),
+            'tickSize': Decimal(price['tickSize']),
+            'minNotional': Decimal(notional.get('minNotional', '0'))
+        }
+
+    def load(self) -> int:
+        """
+        Загружает exchangeInfo по всем символам одним запросом.
+        Возвращает количество загруженных символов.
+        """
+        if self.client is None:
+            return 0
+        info = self.client.get_exchange_info()
+        filters = {}
+        for symbol_info in info.get('symbols', []):
+            try:
+                filters[symbol_info['symbol']] = self.parse_filters(symbol_info)
+            except (KeyError, ArithmeticError) as e:
+                logger.debug(f"Пропущен символ {symbol_info.get('symbol')}: {e}")
+        with self._lock:
+            # Подменяем словарь целиком, чтобы читатели не видели частичного состояния
+            self._filters = filters
+            self._loaded_at = time.monotonic()
+        logger.info(f"Загружены фильтры для {len(filters)} символов")
+        return len(filters)
+
+    def get(self, symbol: str) -> dict:
+        """Возвращает фильтры символа из памяти, при необходимости догружая их"""
+        symbol = symbol.upper()
+        filters = self._filters.get(symbol)
+        if filters is not None:
+            return filters
+        if self._defaults is not None:
+            return self._defaults
+        return self._load_symbol(symbol)
+
+    def get_fixed(self, symbol: str) -> FixedFilters:
+        """Фильтры символа в фиксированной точке; пересчитываются только после обновления exchangeInfo"""
+        symbol = symbol.upper()
+        filters = self.get(symbol)
+        with self._lock:
+            fixed = self._fixed.get(symbol)
+            if fixed is None or fixed.source is not filters:
+                fixed = self._fixed[symbol] = FixedFilters.from_filters(filters)
+        return fixed
+
+    def _load_symbol(self, symbol: str) -> dict:
+        if self.client is None:
+            raise ValueError(f"Нет клиента биржи для загрузки фильтров {symbol}")
+        if not self._loaded_at:
+            self.load()
+            self._start_auto_refresh()
+            filters = self._filters.get(symbol)
+            if filters is not None:
+                return filters
+        # Символ появился после последней загрузки exchangeInfo
+        info = self.client.get_symbol_info(symbol)
+        if not info:
+            raise ValueError(f"Символ {symbol} не найден на бирже")
+        filters = self.parse_filters(info)
+        with self._lock:
+            self._filters = {**self._filters, symbol: filters}
+        return filters
+
+    def _start_auto_refresh(self):
+        with self._lock:
+            if self._refresh_thread is not None or not self.ttl:
+                return
+            self._refresh_thread = threading.Thread(target=self._refresh_loop, daemon=True)
+            self._refresh_thread.start()
+
+    def _refresh_loop(self):
+        while not self._stop_event.wait(self.ttl):
+            try:
+                self.load()
+            except Exception as e:
+                # Оставляем старые фильтры, попробуем на следующем тике
+                logger.warning(f"Не удалось обновить фильтры символов: {e}")
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,166 @@
+import json
+import time
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, List
+
+try:
+    import websocket  # пакет websocket-client
+except ImportError:
+    websocket = None
+
+logger = logging.getLogger(__name__)
+
+
+class BaseUserStream(ABC):
+    """
+    Источник событий пользовательского потока (executionReport и т.п.).
+    Подписчики получают события в виде словарей в формате Binance.
+    """
+
+    def __init__(self):
+        self._listeners: List[Callable[[dict], None]] = []
+        self._reconnect_listeners: List[Callable[[], None]] = []
+        self._connected = False
+
+    def add_listener(self, callback: Callable[[dict], None]):
+        self._listeners.append(callback)
+
+    def add_reconnect_listener(self, callback: Callable[[], None]):
+        """Коллбэк вызывается после каждого переподключения (для сверки через REST)"""
+        self._reconnect_listeners.append(callback)
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    @abstractmethod
+    def start(self):
+        """Подключиться и начать доставку событий подписчикам"""
+
+    @abstractmethod
+    def stop(self):
+        """Отключиться; после stop() события не доставляются"""
+
+    def _dispatch(self, event: dict):
+        for callback in self._listeners:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Ошибка обработки события {event.get('e')}: {e}")
+
+    def _notify_reconnect(self):
+        for callback in self._reconnect_listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Ошибка обработки переподключения: {e}")
+
+
+class BinanceUserStream(BaseUserStream):
+    """Пользовательский поток Binance через listenKey и websocket"""
+    WS_URLS = {
+        "PRODUCTION": "wss://stream.binance.com:9443/ws/",
+        "TESTNET": "wss://testnet.binance.vision/ws/",
+    }
+    KEEPALIVE_INTERVAL = 30 * 60  # listenKey живет 60 минут
+    RECV_TIMEOUT = 5
+    MAX_BACKOFF = 60
+
+    def __init__(self, client, mode: str = "PRODUCTION", ws_url: str = None):
+        super().__init__()
+        self.client = client
+        self.ws_url = ws_url or self.WS_URLS.get(mode, self.WS_URLS["PRODUCTION"])
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._ws = None
+
+    def start(self):
+        if websocket is None:
+            raise RuntimeError("Для пользовательского потока нужен пакет websocket-client")
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=self.RECV_TIMEOUT + 1)
+        self._connected = False
+
+    def _run(self):
+        backoff = 1
+        first_connect = True
+        while not self._stop_event.is_set():
+            try:
+                listen_key = self.client.stream_get_listen_key()
+                self._ws = websocket.create_connection(self.ws_url + listen_key, timeout=self.RECV_TIMEOUT)
+                self._connected = True
+                backoff = 1
+                logger.info("Пользовательский поток подключен")
+                if not first_connect:
+                    self._notify_reconnect()
+                first_connect = False
+                self._receive_loop(listen_key)
+            except Exception as e:
+                if not self._stop_event.is_set():
+                    logger.warning(f"Пользовательский поток отключен: {e}")
+            finally:
+                self._connected = False
+                if self._ws is not None:
+                    try:
+                        self._ws.close()
+                    except Exception:
+                        pass
+                    self._ws = None
+            if self._stop_event.wait(backoff):
+                break
+            backoff = min(backoff * 2, self.MAX_BACKOFF)
+
+    def _receive_loop(self, listen_key: str):
+        last_keepalive = time.monotonic()
+        while not self._stop_event.is_set():
+            if time.monotonic() - last_keepalive > self.KEEPALIVE_INTERVAL:
+                self.client.stream_keepalive(listen_key)
+                last_keepalive = time.monotonic()
+            try:
+                message = self._ws.recv()
+            except websocket.WebSocketTimeoutException:
+                continue
+            if not message:
+                raise ConnectionError("Соединение закрыто биржей")
+            event = json.loads(message)
+            if event.get('e') == 'listenKeyExpired':
+                raise ConnectionError("listenKey истек")
+            self._dispatch(event)
+
+
+class LocalUserStream(BaseUserStream):
+    """
+    Локальная замена пользовательского потока для эмуляции и тестов.
+    События передаются подписчикам синхронно через emit().
+    """
+
+    def start(self):
+        self._connected = True
+
+    def stop(self):
+        self._connected = False
+
+    def emit(self, event: dict):
+        if self._connected:
+            self._dispatch(event)
+
+    def reconnect(self):
+        """Имитирует обрыв и восстановление соединения"""
+        self._connected = False
+        self._connected = True
+        self._notify_reconnect()
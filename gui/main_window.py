@@ -1,25 +1,38 @@
-from PyQt6.QtCore import Qt, QThread
+from pathlib import Path
+
+from PyQt6.QtCore import Qt, QThread, QTimer
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QLabel, QLineEdit, QPushButton, QMessageBox,
-    QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QGroupBox,
+    QVBoxLayout, QHBoxLayout, QTableView, QHeaderView, QAbstractItemView, QGroupBox,
     QFormLayout, QSpinBox, QDoubleSpinBox, QComboBox
 )
 
 from .styles import STYLESHEET
 from .widgets import StatusIndicator, InfoBlock
+from .orders_model import OrdersTableModel, OrdersUpdateBridge
 from infra.telegram_notify import TelegramNotifier
 from infra.api_key_manager import APIKeyManager
+from infra.settings import Settings
+from infra.stats import StatsEngine, starting_capital
 
-from core.strategy_engine import StrategyEngine
+from core.service import TradingService
 from exchange.binance_adapter import BinanceAdapter
+from utils.calculator import DEFAULT_COMMISSION_RATE
 
 class ZefirMainWindow(QMainWindow):
+    # Не чаще стольких обновлений таблицы ордеров в секунду
+    ORDERS_UPDATE_RATE = 4
+    # Период обновления блока информации, мс
+    INFO_UPDATE_INTERVAL = 1000
+    MODE_LABELS = {"emulation": "Эмуляция", "testnet": "Testnet", "spot": "Spot"}
+
     def __init__(self):
         super().__init__()
 
         # Инициализация менеджеров
         self.api_manager = APIKeyManager()
-        self.strategy_engine = None
+        # Торговый сервис текущего режима: OrderManager по символам под общим планировщиком
+        self.service = None
         self._current_mode = "spot"  # По умолчанию режим Spot
 
         # Основная конфигурация окна
@@ -44,11 +57,13 @@ class ZefirMainWindow(QMainWindow):
         # Подключение сигналов
         self._connect_signals()
         
-        # Загрузка начальных значений
+        # Загрузка начальных значений и инициализация торгового сервиса
         self._update_api_fields_from_manager()
-        
-        # Инициализация торгового движка
-        self._init_trading_engine()
+
+        # Блок информации читает агрегаты статистики и кэш цен, без запросов к бирже на каждый тик
+        self.info_timer = QTimer(self)
+        self.info_timer.timeout.connect(self._refresh_info)
+        self.info_timer.start(self.INFO_UPDATE_INTERVAL)
 
     def _create_left_column(self):
         left_vbox = QVBoxLayout()
@@ -148,9 +163,17 @@ class ZefirMainWindow(QMainWindow):
         orders_group = QGroupBox("Открытые сделки")
         orders_layout = QVBoxLayout(orders_group)
         
-        self.orders_table = QTableWidget(0, 5)
-        self.orders_table.setHorizontalHeaderLabels(["Тип", "Цена входа", "Объём", "Сумма", "PnL"])
+        # Модель обновляется построчно через мост из торговых потоков
+        self.orders_model = OrdersTableModel(self)
+        self.orders_bridge = OrdersUpdateBridge(self.ORDERS_UPDATE_RATE, self)
+        self.orders_bridge.orders_changed.connect(self.orders_model.set_orders)
+
+        self.orders_table = QTableView()
+        self.orders_table.setModel(self.orders_model)
         self.orders_table.setMinimumHeight(200)
+        self.orders_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.orders_table.verticalHeader().setVisible(False)
+        self.orders_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         orders_layout.addWidget(self.orders_table)
         
         right_vbox.addWidget(orders_group, 1)
@@ -171,6 +194,10 @@ class ZefirMainWindow(QMainWindow):
         
         self.hard_stop_btn = QPushButton("Стоп")
         self.hard_stop_btn.setObjectName("danger")
+
+        self.kill_btn = QPushButton("Kill-switch")
+        self.kill_btn.setObjectName("danger")
+        self.kill_btn.setCheckable(True)
         
         self.check_api_btn = QPushButton("Проверить API")
         self.save_strategy_btn = QPushButton("Сохранить стратегию")
@@ -187,6 +214,7 @@ class ZefirMainWindow(QMainWindow):
             self.start_btn, 
             self.soft_stop_btn, 
             self.hard_stop_btn,
+            self.kill_btn,
             self.check_api_btn, 
             self.save_strategy_btn, 
             self.check_tg_btn,
@@ -229,6 +257,7 @@ class ZefirMainWindow(QMainWindow):
         self.start_btn.clicked.connect(self.start_strategy)
         self.soft_stop_btn.toggled.connect(self.toggle_soft_stop)
         self.hard_stop_btn.clicked.connect(self.hard_stop_strategy)
+        self.kill_btn.toggled.connect(self.toggle_kill_switch)
         self.save_strategy_btn.clicked.connect(self.save_strategy_settings)
         self.clear_orders_btn.clicked.connect(self.cancel_all_orders)
         self.all_to_usdt_btn.clicked.connect(self.convert_all_to_usdt)
@@ -280,7 +309,11 @@ class ZefirMainWindow(QMainWindow):
         self._init_trading_engine()
 
     def _init_trading_engine(self):
-        """Инициализация торгового движка с учетом режима работы"""
+        """Инициализация торгового сервиса с учетом режима работы"""
+        if self.service is not None and self.service.is_running():
+            self.statusBar().showMessage("Режим и ключи применятся после остановки стратегии", 5000)
+            return
+        self._close_service()
         try:
             mode = self._get_current_mode()
             keys = self.api_manager.get_keys(mode)
@@ -289,27 +322,69 @@ class ZefirMainWindow(QMainWindow):
 
             if mode == "emulation":
                 exchange_adapter = BinanceAdapter(mode="EMULATION")
-                self.strategy_engine = StrategyEngine(exchange_adapter)
-                self.statusBar().showMessage("Режим эмуляции активирован", 3000)
+            elif not api_key or not api_secret:
                 return
+            else:
+                exchange_adapter = BinanceAdapter(
+                    mode="TESTNET" if mode == "testnet" else "PRODUCTION",
+                    api_key=api_key,
+                    api_secret=api_secret
+                )
 
-            if not api_key or not api_secret:
-                self.strategy_engine = None
-                return
-
-            exchange_adapter = BinanceAdapter(
-                mode="TESTNET" if mode == "testnet" else "PRODUCTION",
-                api_key=api_key,
-                api_secret=api_secret
-            )
-
-            self.strategy_engine = StrategyEngine(exchange_adapter)
-            self.statusBar().showMessage("Торговый движок инициализирован", 3000)
+            config = Settings().all()
+            stats = StatsEngine(capital=starting_capital(config, exchange_adapter),
+                                history_path=Path(config.get("stats_path", StatsEngine.DEFAULT_PATH)) / mode)
+            self.service = TradingService(exchange_adapter, self._get_strategy_settings(), stats=stats,
+                                          on_manager=self.attach_order_manager)
+            self.service.open()
+            if mode == "emulation":
+                self.statusBar().showMessage("Режим эмуляции активирован", 3000)
+            else:
+                self.statusBar().showMessage("Торговый движок инициализирован", 3000)
 
         except Exception as e:
-            self.strategy_engine = None
+            self._close_service()
             self.statusBar().showMessage(f"Ошибка инициализации: {str(e)}", 5000)
 
+    def _close_service(self):
+        """Останавливает сервис прежнего режима: планировщик, потоки данных, пул соединений"""
+        service, self.service = self.service, None
+        # Kill-switch принадлежит сервису: у нового сервиса он выключен
+        self.kill_btn.blockSignals(True)
+        self.kill_btn.setChecked(False)
+        self.kill_btn.blockSignals(False)
+        if service is None:
+            return
+        try:
+            service.close()
+        except Exception as e:
+            self.statusBar().showMessage(f"Ошибка остановки сервиса: {str(e)}", 5000)
+
+    def attach_order_manager(self, order_manager):
+        """Подключает таблицу ордеров к OrderManager символа (коллбэк вызывается из торгового потока)"""
+        order_manager.on_orders_update = self.orders_bridge.callback(order_manager.position.symbol)
+
+    def _refresh_info(self):
+        """Обновление блока информации по выбранной паре"""
+        data = {"mode": self.MODE_LABELS.get(self._current_mode, self._current_mode)}
+        service = self.service
+        if service is not None and service.stats is not None:
+            symbol = self.symbol_combo.currentText().upper()
+            stats = service.stats
+            data.update(stats.dashboard(symbol))
+            data["start_balance"] = f"{stats.capital:.2f} USDT"
+            data["current_balance"] = f"{stats.capital + stats.total_pnl:.2f} USDT"
+            if symbol in service.managers:
+                try:
+                    data["price"] = f"{service.exchange.get_current_price(symbol):.8f}"
+                except Exception:
+                    pass
+        self.info_block.update_data(data)
+
+    def closeEvent(self, event):
+        self._close_service()
+        super().closeEvent(event)
+
     def check_api_connection(self):
         """Проверка подключения к API биржи"""
         mode = self._get_current_mode()
@@ -400,7 +475,7 @@ class ZefirMainWindow(QMainWindow):
 
     def start_strategy(self):
         """Запуск торговой стратегии"""
-        if not self.strategy_engine:
+        if not self.service:
             self.statusBar().showMessage("Торговый движок не инициализирован", 3000)
             return
             
@@ -408,22 +483,22 @@ class ZefirMainWindow(QMainWindow):
         settings = self._get_strategy_settings()
         
         try:
-            # Запуск стратегии
-            self.strategy_engine.start_cycle(
-                symbol=settings["symbol"],
-                settings=settings
-            )
+            # Запуск цикла символа; уже работающие символы продолжают торговлю
+            self.service.update_config(settings)
+            self.service.start(settings["symbol"])
             
-            self.statusBar().showMessage("Стратегия запущена", 3000)
-            self.start_btn.setEnabled(False)
+            self.statusBar().showMessage(f"Стратегия {settings['symbol']} запущена", 3000)
             
         except Exception as e:
             self.statusBar().showMessage(f"Ошибка запуска: {str(e)}", 5000)
 
     def toggle_soft_stop(self, checked):
         """Переключение режима мягкого стопа"""
-        if self.strategy_engine:
-            self.strategy_engine.set_soft_stop(checked)
+        if self.service:
+            if checked:
+                self.service.soft_stop()
+            else:
+                self.service.resume()
         
         # Визуальная индикация
         if checked:
@@ -439,11 +514,21 @@ class ZefirMainWindow(QMainWindow):
 
     def hard_stop_strategy(self):
         """Полная остановка стратегии"""
-        if self.strategy_engine:
-            self.strategy_engine.hard_stop()
-            self.start_btn.setEnabled(True)
+        if self.service:
+            self.service.hard_stop()
             self.statusBar().showMessage("Стратегия остановлена", 3000)
 
+    def toggle_kill_switch(self, checked):
+        """Kill-switch: стоп всех символов и отмена всех ордеров; повторное нажатие - сброс"""
+        if not self.service:
+            return
+        if checked:
+            symbols = self.service.kill("кнопка Kill-switch")
+            self.statusBar().showMessage(f"Kill-switch: остановлены {', '.join(symbols) or 'все'}, ордера отменены", 5000)
+        else:
+            self.service.reset_kill()
+            self.statusBar().showMessage("Kill-switch сброшен", 3000)
+
     def save_strategy_settings(self):
         """Сохранение настроек стратегии"""
         settings = self._get_strategy_settings()
@@ -454,30 +539,35 @@ class ZefirMainWindow(QMainWindow):
 
     def cancel_all_orders(self):
         """Отмена всех активных ордеров"""
-        if self.strategy_engine:
+        if self.service:
             try:
-                self.strategy_engine.cancel_all_orders()
-                self.statusBar().showMessage("Все ордера отменены", 3000)
+                cancelled = self.service.cancel_all()
+                self.statusBar().showMessage(f"Отменено ордеров: {cancelled}", 3000)
             except Exception as e:
                 self.statusBar().showMessage(f"Ошибка отмены ордеров: {str(e)}", 5000)
 
     def convert_all_to_usdt(self):
-        """Конвертация всех активов в USDT"""
-        if self.strategy_engine:
+        """Продажа базового актива выбранной пары по рынку"""
+        if self.service:
             try:
-                self.strategy_engine.convert_all_to_usdt()
-                self.statusBar().showMessage("Все активы конвертированы в USDT", 3000)
+                symbol = self.symbol_combo.currentText()
+                exchange = self.service.exchange
+                quantity = exchange.get_balance(symbol.replace("USDT", ""))
+                exchange.create_order(symbol=symbol, side='sell', order_type='market', quantity=quantity)
+                self.statusBar().showMessage(f"{symbol}: актив конвертирован в USDT", 3000)
             except Exception as e:
                 self.statusBar().showMessage(f"Ошибка конвертации: {str(e)}", 5000)
 
     def convert_usdt_to_asset(self):
-        """Конвертация USDT в основной актив"""
-        if self.strategy_engine:
+        """Покупка базового актива выбранной пары на весь свободный USDT"""
+        if self.service:
             try:
                 symbol = self.symbol_combo.currentText()
                 asset = symbol.replace("USDT", "")  # Получаем базовый актив
-                
-                self.strategy_engine.convert_usdt_to_asset(asset)
+                exchange = self.service.exchange
+                price = exchange.get_current_price(symbol)
+                quantity = exchange.get_balance("USDT") * (1 - DEFAULT_COMMISSION_RATE) / price
+                exchange.create_order(symbol=symbol, side='buy', order_type='market', quantity=quantity)
                 self.statusBar().showMessage(f"USDT конвертированы в {asset}", 3000)
             except Exception as e:
                 self.statusBar().showMessage(f"Ошибка конвертации: {str(e)}", 5000)
@@ -0,0 +1,155 @@
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QObject, Qt, QTimer, pyqtSignal, pyqtSlot
+
+# Строка таблицы - неизменяемый снимок ордера: (id, символ, колонки...)
+OrderRow = Tuple[str, str, str, str, str, str, str, str]
+
+COLUMNS = ["Символ", "Тип", "Цена", "Объём", "Исполнено", "Сумма", "Статус"]
+
+STATUS_LABELS = {
+    'pending': "Открыт",
+    'partially_filled': "Частично",
+    'filled': "Исполнен",
+    'cancelled': "Отменен",
+}
+
+
+def order_row(order) -> OrderRow:
+    """Снимок core.order_manager.Order для таблицы"""
+    price = order.avg_price if order.filled_amount > 0 else order.price
+    return (
+        order.id,
+        order.symbol,
+        f"{order.side.upper()} {order.type.upper()}",
+        f"{price:.8f}" if price else "рынок",
+        f"{order.amount:.8f}",
+        f"{order.filled_amount:.8f}",
+        f"{order.amount * price:.2f}" if price else "",
+        STATUS_LABELS.get(order.status.value, order.status.value),
+    )
+
+
+class OrdersTableModel(QAbstractTableModel):
+    """
+    Модель таблицы ордеров. set_orders() сравнивает новый снимок символа с
+    текущим и сообщает представлению только о реально измененных строках
+    (dataChanged), добавленных и удаленных - без перестройки всей таблицы.
+    """
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._rows: List[OrderRow] = []
+        # (символ, id) -> номер строки; id ордеров Binance уникальны только в пределах символа
+        self._index: Dict[Tuple[str, str], int] = {}
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            # Первое поле строки - id ордера, в таблице не показывается
+            return self._rows[index.row()][index.column() + 1]
+        if role == Qt.ItemDataRole.TextAlignmentRole and index.column() >= 2:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def order_id(self, row: int) -> str:
+        return self._rows[row][0]
+
+    def set_orders(self, symbol: str, rows: List[OrderRow]):
+        """Заменяет ордера символа; остальные символы не затрагиваются"""
+        incoming = {(symbol, row[0]): row for row in rows}
+
+        # Удаление ордеров символа, которых больше нет (с конца, чтобы не сдвигать индексы)
+        removed = [i for i, row in enumerate(self._rows) if row[1] == symbol and (symbol, row[0]) not in incoming]
+        for i in reversed(removed):
+            self.beginRemoveRows(QModelIndex(), i, i)
+            del self._rows[i]
+            self.endRemoveRows()
+        if removed:
+            self._index = {(row[1], row[0]): i for i, row in enumerate(self._rows)}
+
+        last_column = len(COLUMNS) - 1
+        for key, row in incoming.items():
+            i = self._index.get(key)
+            if i is None:
+                continue
+            if self._rows[i] != row:
+                self._rows[i] = row
+                self.dataChanged.emit(self.index(i, 0), self.index(i, last_column))
+
+        added = [(key, row) for key, row in incoming.items() if key not in self._index]
+        if added:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            for offset, (key, row) in enumerate(added):
+                self._index[key] = first + offset
+                self._rows.append(row)
+            self.endInsertRows()
+
+
+class OrdersUpdateBridge(QObject):
+    """
+    Мост от торговых потоков к модели в GUI-потоке.
+
+    push() вызывается из торгового потока (коллбэк OrderManager.on_orders_update)
+    и сразу снимает строки с ордеров: объекты Order дальше меняет торговый поток,
+    а в GUI уходят только неизменяемые кортежи. Сигнал orders_changed
+    отправляется в GUI-потоке не чаще max_rate раз в секунду; обновления,
+    пришедшие между отправками, схлопываются в последнее.
+    """
+    orders_changed = pyqtSignal(str, list)
+    _schedule = pyqtSignal()
+
+    def __init__(self, max_rate: float = 4.0, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.interval = 1.0 / max_rate
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[OrderRow]] = {}
+        self._scheduled = False
+        self._last_flush = 0.0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._flush)
+        # Мост живет в GUI-потоке, поэтому сигнал из торгового потока ставится в его очередь
+        self._schedule.connect(self._start_timer, Qt.ConnectionType.QueuedConnection)
+
+    def push(self, symbol: str, orders: list):
+        rows = [order_row(order) for order in orders]
+        with self._lock:
+            self._pending[symbol] = rows
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._schedule.emit()
+
+    def callback(self, symbol: str):
+        """Коллбэк для OrderManager.on_orders_update конкретного символа"""
+        return lambda orders: self.push(symbol, orders)
+
+    @pyqtSlot()
+    def _start_timer(self):
+        delay = self._last_flush + self.interval - time.monotonic()
+        self._timer.start(max(0, int(delay * 1000)))
+
+    @pyqtSlot()
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._scheduled = False
+        self._last_flush = time.monotonic()
+        for symbol, rows in pending.items():
+            self.orders_changed.emit(symbol, rows)
@@ -0,0 +1,145 @@
+import os
+import hmac
+import json
+import logging
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class _ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ControlServer:
+    """
+    HTTP API управления торговым сервисом (core.service.TradingService).
+
+      GET  /status               - режим, этапы и статус по символам, статистика
+      GET  /positions            - позиции и открытые ордера
+      POST /start[?symbol=X]     - запуск циклов символа или всех символов
+      POST /soft_stop[?symbol=X] - мягкий стоп
+      POST /hard_stop[?symbol=X] - полный стоп
+      POST /kill[?reason=...]    - kill-switch: стоп всех символов и отмена всех ордеров
+      POST /reset_kill           - сброс kill-switch
+
+    Слушает TCP (по умолчанию только 127.0.0.1) или Unix-сокет. Если задан
+    token, запросы должны содержать заголовок Authorization: Bearer <token>.
+    """
+
+    def __init__(self, service, host: str = '127.0.0.1', port: int = 8787,
+                 unix_socket: Optional[str] = None, token: Optional[str] = None):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket
+        self.token = token
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Команды ---
+
+    def handle(self, method: str, path: str, query: dict) -> tuple:
+        """Выполняет команду; возвращает (HTTP-статус, тело ответа)"""
+        symbol = query.get('symbol', [None])[0]
+        if method == 'GET':
+            if path == '/status':
+                return 200, self.service.status()
+            if path == '/positions':
+                return 200, self.service.positions()
+        elif method == 'POST':
+            if path == '/kill':
+                reason = query.get('reason', ['команда API'])[0]
+                return 200, {'ok': True, 'symbols': self.service.kill(reason)}
+            if path == '/reset_kill':
+                self.service.reset_kill()
+                return 200, {'ok': True}
+            commands = {
+                '/start': self.service.start,
+                '/soft_stop': self.service.soft_stop,
+                '/hard_stop': self.service.hard_stop,
+            }
+            command = commands.get(path)
+            if command is not None:
+                symbols = command(symbol)
+                logger.info(f"Команда {path} ({symbol or 'все символы'}): {symbols}")
+                return 200, {'ok': True, 'symbols': symbols}
+        return 404, {'error': f"Неизвестная команда {method} {path}"}
+
+    def _authorized(self, header: Optional[str]) -> bool:
+        if not self.token:
+            return True
+        return hmac.compare_digest(header or '', f"Bearer {self.token}")
+
+    # --- Сервер ---
+
+    def _handler(self):
+        control = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _dispatch(self, method: str):
+                if not control._authorized(self.headers.get('Authorization')):
+                    self._reply(401, {'error': 'Нужен токен'})
+                    return
+                # Тело POST не используется, но его нужно вычитать
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                url = urlparse(self.path)
+                try:
+                    status, body = control.handle(method, url.path.rstrip('/') or '/', parse_qs(url.query))
+                except Exception as e:
+                    logger.error(f"Ошибка команды {method} {url.path}: {e}")
+                    status, body = 500, {'error': str(e)}
+                self._reply(status, body)
+
+            def _reply(self, status: int, body: dict):
+                data = json.dumps(body, ensure_ascii=False, default=str).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        if self._server is not None:
+            return
+        if self.unix_socket:
+            if os.path.exists(self.unix_socket):
+                os.remove(self.unix_socket)
+            self._server = _ThreadingUnixHTTPServer(self.unix_socket, self._handler())
+            # Доступ к сокету - только владельцу процесса
+            os.chmod(self.unix_socket, 0o600)
+            address = self.unix_socket
+        else:
+            self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+            self._server.daemon_threads = True
+            self.port = self._server.server_port
+            address = f"http://{self.host}:{self.port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="ControlServer", daemon=True)
+        self._thread.start()
+        logger.info(f"API управления слушает {address}")
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        if self.unix_socket and os.path.exists(self.unix_socket):
+            os.remove(self.unix_socket)
@@ -1,34 +1,174 @@
-import logging
-from logging.handlers import RotatingFileHandler
 import os
+import sys
+import gzip
+import json
+import queue
+import atexit
+import shutil
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+
+HUMAN_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Атрибуты LogRecord; все остальные поля пришли через extra и попадают в JSON
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись: время, уровень, логгер, сообщение, место вызова и поля extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'thread': record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает каждую N-ю DEBUG-запись логгеров с заданным префиксом
+    ({'core.order_manager': 10} - одна из десяти). INFO и выше не отбрасываются.
+    """
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        # Длинные префиксы проверяются первыми
+        self.rates = sorted(rates.items(), key=lambda item: -len(item[0]))
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + '.'):
+                with self._lock:
+                    count = self._counters.get(prefix, 0)
+                    self._counters[prefix] = count + 1
+                return count % rate == 0
+        return True
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler без форматирования в вызывающем потоке: в очередь уходит
+    исходная запись с msg и args, строка собирается в потоке QueueListener.
+    Очередь внутрипроцессная, поэтому запись не нужно делать сериализуемой.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Лучше потерять запись, чем остановить торговый поток
+            pass
+
+
+class CompressedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler, сжимающий ротированные файлы в .gz"""
+
+    def __init__(self, filename, maxBytes=0, backupCount=0, encoding='utf-8'):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding)
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source: str, dest: str):
+        with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(log_dir: str = 'logs', level: int = logging.INFO, console: bool = True,
+                  sampling: Optional[Dict[str, int]] = None, max_bytes: int = 10 * 1024 * 1024,
+                  backup_count: int = 5, queue_size: int = 100000) -> QueueListener:
+    """
+    Логирование через очередь: корневой логгер только кладет записи в очередь,
+    форматирование и запись на диск идут в отдельном потоке QueueListener.
+
+    Файлы в log_dir:
+      star_orion.jsonl - все записи в JSON Lines, ротация со сжатием gz;
+      errors.log - ERROR и выше в текстовом виде.
+    sampling - прореживание DEBUG-записей по префиксам логгеров.
+    """
+    global _listener
+    stop_logging()
+    os.makedirs(log_dir, exist_ok=True)
+
+    handlers = []
+    json_handler = CompressedRotatingFileHandler(os.path.join(log_dir, 'star_orion.jsonl'),
+                                                 maxBytes=max_bytes, backupCount=backup_count)
+    json_handler.setFormatter(JsonFormatter())
+    handlers.append(json_handler)
+
+    error_handler = CompressedRotatingFileHandler(os.path.join(log_dir, 'errors.log'),
+                                                  maxBytes=max_bytes, backupCount=backup_count)
+    error_handler.setLevel(logging.ERROR)
+    error_handler.setFormatter(logging.Formatter(HUMAN_FORMAT))
+    handlers.append(error_handler)
+
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter(HUMAN_FORMAT))
+        handlers.append(console_handler)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    queue_handler = LazyQueueHandler(log_queue)
+    if sampling:
+        queue_handler.addFilter(SamplingFilter(sampling))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Дописывает очередь на диск и останавливает поток логирования"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
 
 class ZefirLogger:
+    """
+    Обертка над logging.getLogger. Обработчики настраиваются один раз
+    в setup_logging, поэтому запись в лог не делает дискового ввода-вывода
+    в вызывающем потоке.
+    """
+
     def __init__(self, name: str):
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(logging.DEBUG)
-        
-        # Формат сообщений
-        formatter = logging.Formatter(
-            '%(asctime)s | %(levelname)-8s | %(module)s:%(funcName)s:%(lineno)d - %(message)s'
-        )
-        
-        # Консольный вывод
-        ch = logging.StreamHandler()
-        ch.setFormatter(formatter)
-        
-        # Файловый вывод (с ротацией)
-        log_dir = "logs"
-        os.makedirs(log_dir, exist_ok=True)
-        fh = RotatingFileHandler(
-            os.path.join(log_dir, 'zefir.log'), 
-            maxBytes=10*1024*1024,  # 10 MB
-            backupCount=5
-        )
-        fh.setFormatter(formatter)
-        
-        if not self.logger.hasHandlers():
-            self.logger.addHandler(ch)
-            self.logger.addHandler(fh)
-    
+
     def log(self, message: str, level: str = "info"):
-        getattr(self.logger, level)(message)
\ No newline at end of file
+        getattr(self.logger, level)(message)
@@ -0,0 +1,254 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_now_ns = time.perf_counter_ns
+
+
+class LatencyHistogram:
+    """
+    Гистограмма задержек в стиле HDR: значения в микросекундах, корзины
+    логарифмически-линейные - 32 корзины на каждую степень двойки,
+    т.е. относительная погрешность квантилей не больше ~3%.
+    Память фиксирована (до часа задержки), запись - O(1).
+    """
+    SUB_BITS = 5
+    SUB_COUNT = 1 << SUB_BITS          # корзин на октаву
+    LINEAR_LIMIT = SUB_COUNT * 2       # до 64 мкс - точные значения
+    BUCKETS = LINEAR_LIMIT + 27 * SUB_COUNT
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts: List[int] = [0] * self.BUCKETS
+            self.count = 0
+            self.total_us = 0
+            self.min_us: Optional[int] = None
+            self.max_us = 0
+
+    @classmethod
+    def _index(cls, value: int) -> int:
+        if value < cls.LINEAR_LIMIT:
+            return value
+        shift = value.bit_length() - cls.SUB_BITS - 1
+        index = cls.LINEAR_LIMIT + (shift - 1) * cls.SUB_COUNT + (value >> shift) - cls.SUB_COUNT
+        return min(index, cls.BUCKETS - 1)
+
+    @classmethod
+    def _upper(cls, index: int) -> int:
+        """Верхняя граница корзины, мкс"""
+        if index < cls.LINEAR_LIMIT:
+            return index
+        shift = (index - cls.LINEAR_LIMIT) // cls.SUB_COUNT + 1
+        sub = (index - cls.LINEAR_LIMIT) % cls.SUB_COUNT + cls.SUB_COUNT
+        return ((sub + 1) << shift) - 1
+
+    def record(self, value_us: int):
+        if value_us < 0:
+            value_us = 0
+        index = self._index(value_us)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total_us += value_us
+            if self.min_us is None or value_us < self.min_us:
+                self.min_us = value_us
+            if value_us > self.max_us:
+                self.max_us = value_us
+
+    def percentile(self, q: float) -> int:
+        """Квантиль q (0..100) в микросекундах"""
+        with self._lock:
+            if not self.count:
+                return 0
+            target = max(1, int(self.count * q / 100 + 0.5))
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= target:
+                    return min(self._upper(index), self.max_us)
+            return self.max_us
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'mean_us': self.total_us / self.count if self.count else 0,
+            'min_us': self.min_us or 0,
+            'p50_us': self.percentile(50),
+            'p90_us': self.percentile(90),
+            'p99_us': self.percentile(99),
+            'p999_us': self.percentile(99.9),
+            'max_us': self.max_us,
+        }
+
+
+class _NullSpan:
+    """Заглушка trace при выключенных метриках"""
+
+    def mark(self, stage: str):
+        pass
+
+
+class Trace:
+    """
+    Цепочка этапов одного ордера (tick-to-order): каждая mark() записывает
+    время от предыдущей отметки в гистограмму этапа.
+    """
+
+    def __init__(self, metrics: 'Metrics', symbol: str):
+        self.metrics = metrics
+        self.symbol = symbol
+        self.started = self._last = _now_ns()
+
+    def mark(self, stage: str):
+        now = _now_ns()
+        self.metrics.observe_ns(stage, now - self._last, self.symbol)
+        self._last = now
+
+    def total(self, stage: str = 'tick_to_order'):
+        """Записывает полное время с начала трассы"""
+        self.metrics.observe_ns(stage, _now_ns() - self.started, self.symbol)
+
+
+class Metrics:
+    """
+    Реестр гистограмм задержек по (этап, символ).
+    Выгрузка в текстовом формате Prometheus (serve) и периодическая
+    сводка в лог (start_reporter).
+    """
+    QUANTILES = (50, 90, 99, 99.9)
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._reporter_stop = threading.Event()
+        self._reporter: Optional[threading.Thread] = None
+
+    def histogram(self, stage: str, symbol: str = '') -> LatencyHistogram:
+        key = (stage, symbol)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def observe_ns(self, stage: str, elapsed_ns: int, symbol: str = ''):
+        if self.enabled:
+            self.histogram(stage, symbol).record(elapsed_ns // 1000)
+
+    def observe(self, stage: str, seconds: float, symbol: str = ''):
+        self.observe_ns(stage, int(seconds * 1e9), symbol)
+
+    @contextmanager
+    def span(self, stage: str, symbol: str = ''):
+        """with metrics.span('price', 'BTCUSDT'): ... - время блока в гистограмму этапа"""
+        if not self.enabled:
+            yield
+            return
+        started = _now_ns()
+        try:
+            yield
+        finally:
+            self.histogram(stage, symbol).record((_now_ns() - started) // 1000)
+
+    def trace(self, symbol: str = ''):
+        return Trace(self, symbol) if self.enabled else _NullSpan()
+
+    def snapshot(self) -> Dict[Tuple[str, str], dict]:
+        with self._lock:
+            items = list(self._histograms.items())
+        return {key: histogram.summary() for key, histogram in items}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    # --- Prometheus ---
+
+    def render_prometheus(self) -> str:
+        name = 'orion_stage_latency_seconds'
+        lines = [f"# HELP {name} Задержка этапов торгового пути",
+                 f"# TYPE {name} summary"]
+        with self._lock:
+            items = sorted(self._histograms.items())
+        for (stage, symbol), histogram in items:
+            labels = f'stage="{_escape(stage)}",symbol="{_escape(symbol)}"'
+            for q in self.QUANTILES:
+                lines.append(f'{name}{{{labels},quantile="{q / 100:g}"}} {histogram.percentile(q) / 1e6:.6f}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.total_us / 1e6:.6f}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port: int = 9108, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """HTTP-эндпоинт /metrics для Prometheus (по умолчанию только локальный)"""
+        if self._server is not None:
+            return self._server
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True).start()
+        logger.info("Метрики доступны на http://%s:%s/metrics", host, self._server.server_port)
+        return self._server
+
+    # --- Сводка в лог ---
+
+    def start_reporter(self, interval: float = 60.0):
+        """Раз в interval секунд пишет в лог p50/p99/max по каждому этапу"""
+        if self._reporter is not None and self._reporter.is_alive():
+            return
+        self._reporter_stop.clear()
+        self._reporter = threading.Thread(target=self._report_loop, args=(interval,),
+                                          name="MetricsReporter", daemon=True)
+        self._reporter.start()
+
+    def _report_loop(self, interval: float):
+        while not self._reporter_stop.wait(interval):
+            self.log_summary()
+
+    def log_summary(self):
+        for (stage, symbol), summary in sorted(self.snapshot().items()):
+            if summary['count']:
+                logger.info("Задержка %s %s: n=%d p50=%dus p99=%dus max=%dus",
+                            stage, symbol or '-', summary['count'], summary['p50_us'],
+                            summary['p99_us'], summary['max_us'])
+
+    def stop(self):
+        self._reporter_stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Общий реестр процесса: OrderManager, адаптер и REST-клиент пишут сюда
+metrics = Metrics()
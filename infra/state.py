@@ -0,0 +1,182 @@
+import json
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore:
+    """
+    Журнал состояния торговли в SQLite (режим WAL).
+
+    События ордеров и позиции дописываются в таблицу journal, периодически
+    состояние символа сворачивается в снимок (snapshots), а журнал до снимка
+    удаляется. Запись идет пачками в отдельном потоке: торговый поток только
+    кладет событие в очередь и не ждет диска.
+
+    Восстановление: последний снимок символа + события журнала после него.
+    """
+    DEFAULT_PATH = Path("data/state.db")
+    # Через сколько событий символа стоит делать снимок
+    SNAPSHOT_EVERY = 500
+    # Максимум событий в одной транзакции
+    BATCH_SIZE = 1000
+
+    _SNAPSHOT = object()
+    _FLUSH = object()
+    _STOP = object()
+
+    def __init__(self, path: Path = DEFAULT_PATH, snapshot_every: int = SNAPSHOT_EVERY):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.snapshot_every = snapshot_every
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._pending: Dict[str, int] = {}
+        self._pending_lock = threading.Lock()
+        self._init_db()
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # В WAL режим NORMAL не портит базу при сбое, теряются лишь последние транзакции
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS journal (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ts REAL NOT NULL,
+                    symbol TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS journal_symbol ON journal (symbol, seq)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    symbol TEXT PRIMARY KEY,
+                    seq INTEGER NOT NULL,
+                    ts REAL NOT NULL,
+                    payload TEXT NOT NULL
+                )""")
+        conn.close()
+
+    # --- Запись (вызывается из торгового потока) ---
+
+    def record(self, symbol: str, kind: str, payload: dict):
+        """Добавить событие в журнал; запись на диск выполнит фоновый поток"""
+        self._queue.put((time.time(), symbol, kind, payload))
+        with self._pending_lock:
+            self._pending[symbol] = self._pending.get(symbol, 0) + 1
+
+    def needs_snapshot(self, symbol: str) -> bool:
+        return self._pending.get(symbol, 0) >= self.snapshot_every
+
+    def snapshot(self, symbol: str, state: dict):
+        """Сохранить полное состояние символа и удалить журнал до него"""
+        self._queue.put((self._SNAPSHOT, symbol, state))
+        with self._pending_lock:
+            self._pending[symbol] = 0
+
+    def flush(self, timeout: float = 5) -> bool:
+        """Дождаться записи всех событий, поставленных в очередь до вызова"""
+        done = threading.Event()
+        self._queue.put((self._FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put((self._STOP,))
+            self._thread.join(timeout=10)
+
+    # --- Фоновая запись ---
+
+    def _writer(self):
+        conn = self._connect()
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < self.BATCH_SIZE:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not self._write_batch(conn, batch):
+                    return
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: list) -> bool:
+        """Записывает пачку одной транзакцией. Возвращает False после команды остановки."""
+        rows = []
+        flushes = []
+        running = True
+        try:
+            with conn:
+                for item in batch:
+                    marker = item[0]
+                    if marker is self._SNAPSHOT:
+                        self._insert_events(conn, rows)
+                        rows = []
+                        self._write_snapshot(conn, item[1], item[2])
+                    elif marker is self._FLUSH:
+                        flushes.append(item[1])
+                    elif marker is self._STOP:
+                        running = False
+                    else:
+                        ts, symbol, kind, payload = item
+                        rows.append((ts, symbol, kind, json.dumps(payload, default=str)))
+                self._insert_events(conn, rows)
+        except Exception as e:
+            logger.error(f"Ошибка записи журнала состояния: {e}")
+        for done in flushes:
+            done.set()
+        return running
+
+    @staticmethod
+    def _insert_events(conn: sqlite3.Connection, rows: list):
+        if rows:
+            conn.executemany("INSERT INTO journal (ts, symbol, kind, payload) VALUES (?, ?, ?, ?)", rows)
+
+    @staticmethod
+    def _write_snapshot(conn: sqlite3.Connection, symbol: str, state: dict):
+        seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM journal WHERE symbol = ?", (symbol,)).fetchone()[0]
+        conn.execute(
+            "INSERT OR REPLACE INTO snapshots (symbol, seq, ts, payload) VALUES (?, ?, ?, ?)",
+            (symbol, seq, time.time(), json.dumps(state, default=str))
+        )
+        conn.execute("DELETE FROM journal WHERE symbol = ? AND seq <= ?", (symbol, seq))
+
+    # --- Восстановление ---
+
+    def load(self, symbol: str) -> Tuple[Optional[dict], List[Tuple[str, dict]]]:
+        """Последний снимок символа и события журнала после него"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT seq, payload FROM snapshots WHERE symbol = ?", (symbol,)).fetchone()
+            snapshot, seq = (json.loads(row[1]), row[0]) if row else (None, 0)
+            events = [
+                (kind, json.loads(payload)) for kind, payload in conn.execute(
+                    "SELECT kind, payload FROM journal WHERE symbol = ? AND seq > ? ORDER BY seq", (symbol, seq))
+            ]
+        finally:
+            conn.close()
+        return snapshot, events
+
+    def symbols(self) -> List[str]:
+        """Символы, по которым есть сохраненное состояние"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT symbol FROM snapshots UNION SELECT DISTINCT symbol FROM journal").fetchall()
+        finally:
+            conn.close()
+        return sorted(row[0] for row in rows)
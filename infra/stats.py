@@ -0,0 +1,339 @@
+import time
+import struct
+import logging
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime, date, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_pack_double = struct.Struct('d').pack
+
+
+class ColumnLog:
+    """
+    Колоночная история только на дозапись: по файлу float64 на колонку.
+    Первая колонка - время (unix, сек); записи идут по возрастанию времени,
+    поэтому выборка по диапазону - это bisect по колонке времени.
+    """
+
+    def __init__(self, path: Path, columns: Tuple[str, ...]):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.columns = columns
+        self.data: Dict[str, array] = {}
+        for name in columns:
+            values = array('d')
+            file = self.path / f"{name}.f64"
+            if file.exists():
+                with open(file, 'rb') as f:
+                    values.frombytes(f.read())
+            self.data[name] = values
+        # После сбоя колонки могут различаться на хвост - выравниваем по самой короткой
+        length = min(len(values) for values in self.data.values())
+        for name, values in self.data.items():
+            if len(values) > length:
+                del values[length:]
+                with open(self.path / f"{name}.f64", 'wb') as f:
+                    values.tofile(f)
+        self._files = {name: open(self.path / f"{name}.f64", 'ab') for name in columns}
+
+    def __len__(self) -> int:
+        return len(self.data[self.columns[0]])
+
+    def append(self, *row: float):
+        for name, value in zip(self.columns, row):
+            self.data[name].append(value)
+            self._files[name].write(_pack_double(value))
+
+    def range(self, start: float = None, end: float = None) -> Dict[str, array]:
+        """Строки с временем в [start, end]"""
+        times = self.data[self.columns[0]]
+        lo = bisect_left(times, start) if start is not None else 0
+        hi = bisect_right(times, end) if end is not None else len(times)
+        return {name: values[lo:hi] for name, values in self.data.items()}
+
+    def flush(self):
+        for f in self._files.values():
+            f.flush()
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+
+
+@dataclass
+class _SymbolCycle:
+    """Текущий цикл по символу: от первой сделки до конца цикла OrderManager"""
+    qty: float = 0.0
+    cost: float = 0.0
+    start: float = 0.0
+    pnl: float = 0.0
+    fees: float = 0.0
+    max_cost: float = 0.0
+    trades: int = 0
+
+
+class StatsEngine:
+    """
+    Статистика торговли по исполнениям OrderManager/PositionManager.
+
+    Все агрегаты (PnL по циклу и за день, win rate, среднее время цикла,
+    максимальная просадка, загрузка капитала, комиссии) обновляются
+    инкрементально в on_fill, поэтому запросы дашборда - O(1). Цикл
+    закрывается по on_cycle_complete от OrderManager; остаток позиции после
+    последнего TP переходит в следующий цикл.
+    История сделок и циклов пишется в колоночные файлы для выборок по времени;
+    при перезапуске агрегаты и открытые циклы восстанавливаются из этой истории.
+    """
+    DEFAULT_PATH = Path("data/stats")
+    TRADE_COLUMNS = ('time', 'side', 'qty', 'price', 'fee', 'pnl')
+    CYCLE_COLUMNS = ('end', 'start', 'pnl', 'fees', 'max_cost')
+
+    def __init__(self, capital: float = 0.0, history_path: Optional[Path] = None):
+        self.capital = float(capital)
+        self._lock = threading.Lock()
+        self._cycles: Dict[str, _SymbolCycle] = {}
+        self._symbol_ids: Dict[str, int] = {}
+
+        self.total_pnl = 0.0
+        self.total_fees = 0.0
+        self.trades_count = 0
+        self.cycles_count = 0
+        self.wins = 0
+        self.total_cycle_time = 0.0
+        self.last_cycle_pnl = 0.0
+        self._day: Optional[date] = None
+        self._day_start = self._day_end = 0.0
+        self.day_pnl = 0.0
+        self.daily_pnl: Dict[date, float] = {}
+        # Просадка считается по кривой реализованного капитала
+        self._peak_equity = self.capital
+        self.max_drawdown = 0.0
+        self.invested = 0.0
+        self.max_utilisation = 0.0
+
+        self.trades = self.cycles = None
+        self._symbols_file = None
+        if history_path is not None:
+            history_path = Path(history_path)
+            history_path.mkdir(parents=True, exist_ok=True)
+            # Символы хранятся в колонках как номера строк этого файла
+            self._symbols_file = history_path / 'symbols.txt'
+            if self._symbols_file.exists():
+                for line in self._symbols_file.read_text(encoding='utf-8').splitlines():
+                    self._symbol_ids.setdefault(line, len(self._symbol_ids))
+            self.trades = ColumnLog(history_path / 'trades', self.TRADE_COLUMNS + ('symbol',))
+            self.cycles = ColumnLog(history_path / 'cycles', self.CYCLE_COLUMNS + ('symbol',))
+            self._replay()
+
+    def _replay(self):
+        """
+        Пересчитывает агрегаты по сохраненной истории сделок и закрытий циклов
+        без повторной записи. При равном времени сделка идет раньше закрытия.
+        """
+        if not len(self.trades):
+            return
+        names = {sid: symbol for symbol, sid in self._symbol_ids.items()}
+        trades, cycles = self.trades.data, self.cycles.data
+        ends = list(zip(cycles['end'], cycles['symbol']))
+        closed = 0
+        with self._lock:
+            for now, side, qty, price, fee, symbol_id in zip(trades['time'], trades['side'], trades['qty'],
+                                                             trades['price'], trades['fee'], trades['symbol']):
+                while closed < len(ends) and ends[closed][0] < now:
+                    self._complete_cycle(names.get(int(ends[closed][1]), ''), ends[closed][0], record=False)
+                    closed += 1
+                self._apply_fill(names.get(int(symbol_id), ''), 'buy' if side > 0 else 'sell',
+                                 qty, price, fee, now, record=False)
+            for end, symbol_id in ends[closed:]:
+                self._complete_cycle(names.get(int(symbol_id), ''), end, record=False)
+        logger.info(f"Статистика восстановлена: сделок {self.trades_count}, циклов {self.cycles_count}")
+
+    def _symbol_id(self, symbol: str) -> int:
+        symbol_id = self._symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self._symbol_ids[symbol] = len(self._symbol_ids)
+            if self._symbols_file is not None:
+                with open(self._symbols_file, 'a', encoding='utf-8') as f:
+                    f.write(symbol + '\n')
+        return symbol_id
+
+    def symbol_name(self, symbol_id: float) -> str:
+        for symbol, sid in self._symbol_ids.items():
+            if sid == int(symbol_id):
+                return symbol
+        return ''
+
+    def on_fill(self, symbol: str, side: str, qty, price, fee=0.0, timestamp: float = None):
+        """
+        Учитывает исполнение. fee - комиссия в котируемой валюте.
+        Сигнатура совпадает с коллбэком OrderManager.on_fill.
+        """
+        qty, price, fee = float(qty), float(price), float(fee)
+        now = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            self._apply_fill(symbol, side, qty, price, fee, now)
+
+    def _apply_fill(self, symbol: str, side: str, qty: float, price: float, fee: float, now: float,
+                    record: bool = True):
+        """Обновляет агрегаты; record=False - восстановление из истории, без записи в нее"""
+        self._roll_day(now)
+        cycle = self._cycles.get(symbol)
+        if cycle is None:
+            cycle = self._cycles[symbol] = _SymbolCycle()
+        pnl = 0.0
+        if cycle.trades == 0:
+            cycle.start = now
+        cycle.trades += 1
+        if side == 'buy':
+            cycle.qty += qty
+            cycle.cost += qty * price
+            self.invested += qty * price
+            cycle.max_cost = max(cycle.max_cost, cycle.cost)
+            pnl = -fee
+        else:
+            qty = min(qty, cycle.qty)
+            avg_cost = cycle.cost / cycle.qty if cycle.qty > 0 else price
+            pnl = qty * (price - avg_cost) - fee
+            cycle.qty -= qty
+            cycle.cost -= qty * avg_cost
+            self.invested -= qty * avg_cost
+
+        cycle.pnl += pnl
+        cycle.fees += fee
+        self.total_pnl += pnl
+        self.day_pnl += pnl
+        self.total_fees += fee
+        self.trades_count += 1
+        self._update_drawdown()
+        if self.capital > 0:
+            self.max_utilisation = max(self.max_utilisation, self.invested / self.capital)
+        if record and self.trades is not None:
+            self.trades.append(now, 1.0 if side == 'buy' else -1.0, qty, price, fee, pnl,
+                               self._symbol_id(symbol))
+
+    def on_cycle_complete(self, symbol: str, timestamp: float = None):
+        """
+        Закрывает цикл символа. Сигнатура совпадает с коллбэком
+        OrderManager.on_cycle_complete; цикл без сделок не учитывается.
+        """
+        now = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            self._complete_cycle(symbol, now)
+
+    def _complete_cycle(self, symbol: str, now: float, record: bool = True):
+        cycle = self._cycles.get(symbol)
+        if cycle is None or cycle.trades == 0:
+            return
+        self.cycles_count += 1
+        self.wins += cycle.pnl > 0
+        self.total_cycle_time += now - cycle.start
+        self.last_cycle_pnl = cycle.pnl
+        # Остаток позиции (после последнего TP) переходит в следующий цикл
+        self._cycles[symbol] = _SymbolCycle(qty=cycle.qty, cost=cycle.cost, max_cost=cycle.cost)
+        if not record:
+            return
+        if self.cycles is not None:
+            self.cycles.append(now, cycle.start, cycle.pnl, cycle.fees, cycle.max_cost, self._symbol_id(symbol))
+            self.cycles.flush()
+            self.trades.flush()
+        logger.info(f"Цикл {symbol} закрыт: PnL {cycle.pnl:.4f}, длительность {now - cycle.start:.0f} с")
+
+    def _roll_day(self, now: float):
+        if self._day_start <= now < self._day_end:
+            return
+        day = datetime.fromtimestamp(now).date()
+        if self._day is not None:
+            self.daily_pnl[self._day] = self.day_pnl
+        self._day = day
+        self.day_pnl = self.daily_pnl.get(day, 0.0)
+        self._day_start = datetime.combine(day, datetime.min.time()).timestamp()
+        self._day_end = datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+
+    def _update_drawdown(self):
+        equity = self.capital + self.total_pnl
+        if equity > self._peak_equity:
+            self._peak_equity = equity
+        elif self._peak_equity > 0:
+            self.max_drawdown = max(self.max_drawdown, 1 - equity / self._peak_equity)
+
+    # --- Запросы (O(1)) ---
+
+    def cycle_pnl(self, symbol: str) -> float:
+        """PnL текущего цикла по символу; до первой сделки цикла - PnL последнего цикла"""
+        cycle = self._cycles.get(symbol)
+        if cycle is None or cycle.trades == 0:
+            return self.last_cycle_pnl
+        return cycle.pnl
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.cycles_count if self.cycles_count else 0.0
+
+    @property
+    def avg_cycle_time(self) -> float:
+        return self.total_cycle_time / self.cycles_count if self.cycles_count else 0.0
+
+    @property
+    def utilisation(self) -> float:
+        return self.invested / self.capital if self.capital > 0 else 0.0
+
+    def summary(self) -> dict:
+        with self._lock:
+            self._roll_day(time.time())
+            return {
+                'total_pnl': self.total_pnl,
+                'daily_pnl': self.day_pnl,
+                'last_cycle_pnl': self.last_cycle_pnl,
+                'fees': self.total_fees,
+                'trades': self.trades_count,
+                'cycles': self.cycles_count,
+                'win_rate': self.win_rate,
+                'avg_cycle_time': self.avg_cycle_time,
+                'max_drawdown_percent': self.max_drawdown * 100,
+                'utilisation_percent': self.utilisation * 100,
+                'max_utilisation_percent': self.max_utilisation * 100,
+            }
+
+    def dashboard(self, symbol: str) -> dict:
+        """Поля для InfoBlock.update_data"""
+        summary = self.summary()
+        return {
+            'pnl': f"{summary['daily_pnl']:+.2f}",
+            'cycle_pnl': f"{self.cycle_pnl(symbol):+.2f}",
+        }
+
+    # --- История ---
+
+    def trade_history(self, start: float = None, end: float = None) -> Dict[str, array]:
+        if self.trades is None:
+            return {}
+        with self._lock:
+            return self.trades.range(start, end)
+
+    def cycle_history(self, start: float = None, end: float = None) -> Dict[str, array]:
+        if self.cycles is None:
+            return {}
+        with self._lock:
+            return self.cycles.range(start, end)
+
+    def close(self):
+        for log in (self.trades, self.cycles):
+            if log is not None:
+                log.close()
+
+
+def starting_capital(config: dict, exchange) -> float:
+    """Капитал для статистики: capital из настроек, иначе свободный USDT на старте"""
+    if config.get('capital'):
+        return float(config['capital'])
+    try:
+        return float(exchange.get_balance('USDT'))
+    except Exception as e:
+        logger.warning(f"Баланс USDT не получен, загрузка капитала не считается: {e}")
+        return 0.0
@@ -1,34 +1,230 @@
-import requests
-from threading import Thread
+import time
+import queue
 import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
 
 class TelegramNotifier:
-    def __init__(self, token: str, chat_id: int):
-        self.base_url = f"https://api.telegram.org/bot{token}"
+    """
+    Отправка уведомлений в Telegram из одного фонового потока.
+
+    send() только кладет сообщение в ограниченную очередь и никогда не блокирует
+    вызывающий (торговый) поток; при переполнении сообщение отбрасывается.
+    Воркер отправляет через одну keep-alive сессию, склеивает сообщения в один
+    чат, пришедшие в окне COALESCE_WINDOW, соблюдает лимиты Telegram
+    (около 1 сообщения в секунду в чат и 30 в секунду на бота) и повторяет
+    отправку с экспоненциальной паузой при 429, 5xx и сетевых ошибках.
+    """
+    API_URL = "https://api.telegram.org"
+    QUEUE_SIZE = 1000
+    COALESCE_WINDOW = 0.5
+    CHAT_INTERVAL = 1.0
+    GLOBAL_RATE = 30
+    MAX_RETRIES = 5
+    MAX_BACKOFF = 30
+    MAX_MESSAGE_LENGTH = 4096
+    REQUEST_TIMEOUT = 5
+
+    def __init__(self, token: str, chat_id: int, base_url: str = None,
+                 session: Optional[requests.Session] = None):
+        # base_url позволяет направить запросы на локальный тестовый сервер
+        self.base_url = f"{base_url or self.API_URL}/bot{token}"
         self.chat_id = chat_id
         self.logger = logging.getLogger("TelegramNotifier")
-        
-    def send(self, message: str, silent: bool = False) -> bool:
+        self.session = session or requests.Session()
+        self._queue: queue.Queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        # Сообщения в очереди и в отправке - для flush()
+        self._pending = 0
+        self._pending_changed = threading.Condition()
+        self._chat_next: Dict[int, float] = {}
+        self._recent: deque = deque()
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+
+    # --- Публичный интерфейс ---
+
+    def send(self, message: str, silent: bool = False, chat_id: int = None) -> bool:
+        """Ставит сообщение в очередь. False - очередь переполнена или уведомитель закрыт."""
+        if self._stop_event.is_set():
+            return False
+        self._ensure_worker()
+        with self._pending_changed:
+            self._pending += 1
         try:
-            Thread(target=self._send_thread, args=(message, silent)).start()
+            self._queue.put_nowait((chat_id or self.chat_id, message, silent))
             return True
+        except queue.Full:
+            self._done(1)
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                self.logger.warning(f"Очередь уведомлений переполнена, отброшено сообщений: {self.dropped}")
+            return False
         except Exception as e:
+            self._done(1)
             self.logger.error(f"Telegram error: {e}")
             return False
 
-    def _send_thread(self, message: str, silent: bool):
+    def notify_fill(self, symbol: str, side: str, qty, price, fee=0.0):
+        """Коллбэк исполнения (сигнатура OrderManager.on_fill); исполнения одной пачки придут одним сообщением"""
+        action = 'Покупка' if side == 'buy' else 'Продажа'
+        self.send(f"{action} {symbol}: {qty} по {price}", silent=True)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Ждет отправки всех сообщений из очереди; True - очередь разобрана"""
+        with self._pending_changed:
+            return self._pending_changed.wait_for(lambda: self._pending == 0, timeout)
+
+    def _done(self, count: int):
+        with self._pending_changed:
+            self._pending -= count
+            self._pending_changed.notify_all()
+
+    def close(self, timeout: float = 5.0):
+        """Отправляет накопленное (не дольше timeout) и останавливает воркер"""
+        self.flush(timeout)
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        self.session.close()
+
+    # --- Воркер ---
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="TelegramNotifier", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            messages, count = self._coalesce(first)
+            try:
+                for chat_id, text, silent in messages:
+                    self._deliver(chat_id, text, silent)
+            except Exception as e:
+                self.logger.error(f"Telegram error: {e}")
+            finally:
+                self._done(count)
+
+    def _coalesce(self, first: tuple) -> Tuple[List[Tuple[int, str, bool]], int]:
+        """
+        Собирает сообщения за COALESCE_WINDOW и склеивает их по чатам.
+        Возвращает сообщения к отправке и число взятых из очереди.
+        """
+        batches: Dict[int, Tuple[List[str], bool]] = {}
+        deadline = time.monotonic() + self.COALESCE_WINDOW
+        item = first
+        count = 0
+        while True:
+            count += 1
+            chat_id, text, silent = item
+            texts, all_silent = batches.get(chat_id, ([], True))
+            texts.append(text)
+            batches[chat_id] = (texts, all_silent and silent)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        result = []
+        for chat_id, (texts, silent) in batches.items():
+            for chunk in self._split('\n'.join(texts)):
+                result.append((chat_id, chunk, silent))
+        return result, count
+
+    def _split(self, text: str) -> List[str]:
+        """Делит текст по строкам на части не длиннее лимита Telegram"""
+        limit = self.MAX_MESSAGE_LENGTH
+        if len(text) <= limit:
+            return [text]
+        chunks, current = [], ''
+        for line in text.split('\n'):
+            while len(line) > limit:
+                if current:
+                    chunks.append(current)
+                    current = ''
+                chunks.append(line[:limit])
+                line = line[limit:]
+            if current and len(current) + 1 + len(line) > limit:
+                chunks.append(current)
+                current = line
+            else:
+                current = f"{current}\n{line}" if current else line
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _wait_rate_limit(self, chat_id: int) -> bool:
+        """Пауза до разрешенного момента отправки; False - уведомитель остановлен"""
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] >= 1.0:
+            self._recent.popleft()
+        delay = self._chat_next.get(chat_id, 0.0) - now
+        if len(self._recent) >= self.GLOBAL_RATE:
+            delay = max(delay, 1.0 - (now - self._recent[0]))
+        if delay > 0 and self._stop_event.wait(delay):
+            return False
+        return True
+
+    def _deliver(self, chat_id: int, text: str, silent: bool):
         payload = {
-            'chat_id': self.chat_id,
-            'text': message,
+            'chat_id': chat_id,
+            'text': text,
             'disable_notification': silent
         }
+        backoff = 1.0
+        for attempt in range(self.MAX_RETRIES):
+            if not self._wait_rate_limit(chat_id):
+                return
+            sent_at = time.monotonic()
+            self._recent.append(sent_at)
+            self._chat_next[chat_id] = sent_at + self.CHAT_INTERVAL
+            try:
+                response = self.session.post(f"{self.base_url}/sendMessage", json=payload,
+                                             timeout=self.REQUEST_TIMEOUT)
+            except requests.RequestException as e:
+                self.logger.error(f"Connection error: {e}")
+                delay = backoff
+            else:
+                if response.ok:
+                    self.sent += 1
+                    return
+                if response.status_code == 429:
+                    delay = self._retry_after(response, backoff)
+                    self.logger.warning(f"Telegram ограничил отправку, повтор через {delay:.1f} с")
+                elif response.status_code >= 500:
+                    self.logger.warning(f"API error {response.status_code}, повтор через {backoff:.1f} с")
+                    delay = backoff
+                else:
+                    # Ошибка запроса (неверный чат, токен, текст) - повтор не поможет
+                    self.failed += 1
+                    self.logger.warning(f"API error: {response.text}")
+                    return
+            if self._stop_event.wait(delay):
+                return
+            backoff = min(backoff * 2, self.MAX_BACKOFF)
+        self.failed += 1
+        self.logger.error(f"Сообщение в чат {chat_id} не отправлено после {self.MAX_RETRIES} попыток")
+
+    @staticmethod
+    def _retry_after(response: requests.Response, default: float) -> float:
         try:
-            response = requests.post(
-                f"{self.base_url}/sendMessage",
-                json=payload,
-                timeout=5
-            )
-            if not response.ok:
-                self.logger.warning(f"API error: {response.text}")
-        except Exception as e:
-            self.logger.error(f"Connection error: {e}")
\ No newline at end of file
+            return float(response.json()['parameters']['retry_after'])
+        except (ValueError, KeyError, TypeError):
+            return default
@@ -1,35 +1,38 @@
+import os
 import sys
+import signal
+import argparse
 import logging
-import os
-from decimal import Decimal
-from PyQt6.QtWidgets import QApplication, QMessageBox
-from PyQt6.QtCore import QTimer
-from gui.main_window import ZefirMainWindow
+import threading
+from pathlib import Path
+from infra.logger import setup_logging as setup_queue_logging
+from infra.metrics import metrics
+
+# Локальный эндпоинт Prometheus и период сводки задержек в логе (сек)
+METRICS_PORT = 9108
+METRICS_REPORT_INTERVAL = 300
+
+# API управления в режиме без GUI (--headless)
+CONTROL_PORT = 8787
+
+# Режимы работы -> режимы BinanceAdapter
+EXCHANGE_MODES = {
+    "emulation": "EMULATION",
+    "testnet": "TESTNET",
+    "spot": "PRODUCTION",
+}
 
 def setup_logging():
-    """Настройка логирования"""
-    # Создаем директорию для логов, если её нет
-    logs_dir = "logs"
-    if not os.path.exists(logs_dir):
-        os.makedirs(logs_dir)
-    
-    # Настраиваем логирование
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(os.path.join(logs_dir, 'star_orion.log'), encoding='utf-8'),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
-    
-    # Создаем отдельный обработчик для критических ошибок
-    error_handler = logging.FileHandler(os.path.join(logs_dir, 'errors.log'), encoding='utf-8')
-    error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-    
-    # Добавляем обработчик ошибок к root logger
-    logging.getLogger().addHandler(error_handler)
+    """Настройка логирования: запись в файлы идет в отдельном потоке (infra.logger)"""
+    setup_queue_logging(log_dir="logs", level=logging.INFO)
+
+def setup_metrics():
+    """Метрики задержек торгового пути: /metrics на localhost и сводка в лог"""
+    try:
+        metrics.serve(METRICS_PORT)
+    except OSError as e:
+        logging.getLogger(__name__).warning(f"Эндпоинт метрик не запущен: {e}")
+    metrics.start_reporter(METRICS_REPORT_INTERVAL)
 
 def handle_exception(exc_type, exc_value, exc_traceback):
     """Обработчик необработанных исключений"""
@@ -40,7 +43,10 @@ def handle_exception(exc_type, exc_value, exc_traceback):
     logger = logging.getLogger(__name__)
     logger.critical("Необработанное исключение", exc_info=(exc_type, exc_value, exc_traceback))
     
-    # Показываем диалог с ошибкой пользователю
+    # Диалог с ошибкой - только в режиме GUI, когда Qt уже загружен
+    if 'PyQt6.QtWidgets' not in sys.modules:
+        return
+    from PyQt6.QtWidgets import QApplication, QMessageBox
     if QApplication.instance():
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Icon.Critical)
@@ -50,12 +56,13 @@ def handle_exception(exc_type, exc_value, exc_traceback):
         msg.setStandardButtons(QMessageBox.StandardButton.Ok)
         msg.exec()
 
-def check_dependencies():
-    """Проверка зависимостей"""
+def check_dependencies(headless: bool = False):
+    """Проверка зависимостей (без GUI PyQt6 не нужен)"""
     try:
         import requests
         import decimal
-        from PyQt6 import QtCore, QtWidgets
+        if not headless:
+            from PyQt6 import QtCore, QtWidgets
         return True
     except ImportError as e:
         logger = logging.getLogger(__name__)
@@ -67,16 +74,158 @@ def initialize_decimal_precision():
     from decimal import getcontext
     getcontext().prec = 28  # Высокая точность для финансовых расчетов
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Star Orion trading bot")
+    parser.add_argument("--headless", action="store_true",
+                        help="работа без GUI: торговый сервис и API управления")
+    parser.add_argument("--mode", choices=sorted(EXCHANGE_MODES), default="emulation",
+                        help="режим работы (по умолчанию emulation)")
+    parser.add_argument("--symbols", help="торговые пары через запятую (по умолчанию из config/settings.json)")
+    parser.add_argument("--host", default="127.0.0.1", help="адрес API управления")
+    parser.add_argument("--port", type=int, default=CONTROL_PORT, help="порт API управления")
+    parser.add_argument("--socket", help="Unix-сокет для API управления вместо TCP")
+    parser.add_argument("--token", default=os.environ.get("ORION_CONTROL_TOKEN"),
+                        help="токен API управления (или ORION_CONTROL_TOKEN)")
+    parser.add_argument("--state", help="файл журнала состояния SQLite для восстановления после перезапуска")
+    parser.add_argument("--workers", type=int, default=4, help="потоков планировщика циклов")
+    parser.add_argument("--autostart", action="store_true", help="сразу запустить циклы всех пар")
+    parser.add_argument("--feed", action="append", default=[], metavar="SYMBOL=CSV",
+                        help="записанная лента цен пары для эмуляции (klines CSV); без нее - публичный тикер")
+    parser.add_argument("--feed-interval", type=float, default=1.0, help="секунд между тиками ленты эмуляции")
+    return parser.parse_args(argv)
+
+def load_api_keys(mode: str):
+    """Ключи из ORION_API_KEY/ORION_API_SECRET, иначе из зашифрованного config/api_keys.json"""
+    api_key = os.environ.get("ORION_API_KEY")
+    api_secret = os.environ.get("ORION_API_SECRET")
+    if api_key and api_secret:
+        return api_key, api_secret
+    from infra.api_key_manager import APIKeyManager
+    keys = APIKeyManager().get_keys(mode)
+    return keys.get("api_key", ""), keys.get("api_secret", "")
+
+def run_headless(args) -> int:
+    """Торговый сервис без Qt: OrderManager по символам и API управления"""
+    from core.risk_control import RiskEngine, RiskLimits
+    from core.service import TradingService
+    from exchange.binance_adapter import BinanceAdapter
+    from exchange.emulator import PriceFeed
+    from infra.control_api import ControlServer
+    from infra.settings import Settings
+    from infra.stats import StatsEngine, starting_capital
+
+    logger = logging.getLogger(__name__)
+    config = Settings().all()
+    if args.symbols:
+        symbols = [s.strip() for s in args.symbols.split(",") if s.strip()]
+    else:
+        symbols = config.get("symbols") or [config.get("symbol", "BTCUSDT")]
+
+    if args.mode == "emulation":
+        feeds = {}
+        for item in args.feed:
+            symbol, _, path = item.partition("=")
+            feeds[symbol.strip().upper()] = PriceFeed.from_csv(symbol.strip(), path)
+        exchange = BinanceAdapter(mode="EMULATION", feeds=feeds, feed_interval=args.feed_interval)
+    else:
+        api_key, api_secret = load_api_keys(args.mode)
+        if not api_key or not api_secret:
+            logger.error(f"Нет API ключей для режима {args.mode}")
+            return 1
+        exchange = BinanceAdapter(mode=EXCHANGE_MODES[args.mode], api_key=api_key, api_secret=api_secret)
+
+    state_store = None
+    if args.state:
+        from infra.state import StateStore
+        state_store = StateStore(args.state)
+    # История ведется по режимам, чтобы сделки эмуляции не смешивались с реальными
+    stats = StatsEngine(capital=starting_capital(config, exchange),
+                        history_path=Path(config.get("stats_path", StatsEngine.DEFAULT_PATH)) / args.mode)
+    risk = RiskEngine(RiskLimits.from_settings(config), pnl_source=lambda: stats.day_pnl)
+
+    service = TradingService(exchange, config, symbols, workers=args.workers,
+                             state_store=state_store, risk=risk, stats=stats)
+    control = ControlServer(service, host=args.host, port=args.port, unix_socket=args.socket, token=args.token)
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    try:
+        service.open()
+        control.start()
+        if args.autostart:
+            service.start()
+        logger.info(f"Сервис запущен без GUI: режим {args.mode}, пары {', '.join(symbols)}")
+        # Ожидание с таймаутом, чтобы обработчик сигнала выполнялся в главном потоке
+        while not stop_event.wait(1):
+            pass
+        logger.info("Получен сигнал остановки")
+        return 0
+    finally:
+        control.stop()
+        service.close()
+
+def run_gui() -> int:
+    """Запуск GUI; Qt импортируется только здесь"""
+    from PyQt6.QtWidgets import QApplication, QMessageBox
+    from PyQt6.QtCore import QTimer
+    from gui.main_window import ZefirMainWindow
+
+    logger = logging.getLogger(__name__)
+
+    # Создание приложения Qt
+    app = QApplication(sys.argv)
+    app.setApplicationName("Star Orion")
+    app.setApplicationVersion("1.0.0")
+    app.setOrganizationName("Shtirlizz51")
+    
+    # Настройка стилей (опционально)
+    app.setStyle('Fusion')  # Современный стиль
+    
+    logger.info("Инициализация главного окна")
+    
+    # Создание главного окна
+    try:
+        window = ZefirMainWindow()
+        window.show()
+        
+        # Таймер для периодической проверки состояния
+        status_timer = QTimer()
+        status_timer.timeout.connect(lambda: logger.debug("Приложение работает"))
+        status_timer.start(60000)  # Каждую минуту
+        
+        logger.info("Главное окно создано и показано")
+        
+    except Exception as e:
+        logger.error(f"Ошибка создания главного окна: {e}")
+        msg = QMessageBox()
+        msg.setIcon(QMessageBox.Icon.Critical)
+        msg.setWindowTitle("Ошибка запуска")
+        msg.setText("Не удалось создать главное окно приложения.")
+        msg.setDetailedText(str(e))
+        msg.setStandardButtons(QMessageBox.StandardButton.Ok)
+        msg.exec()
+        return 1
+    
+    # Запуск цикла обработки событий
+    logger.info("Запуск цикла обработки событий Qt")
+    result = app.exec()
+    
+    logger.info(f"Приложение завершено с кодом: {result}")
+    return result
+
+def main(argv=None):
     """Основная функция запуска приложения"""
+    args = parse_args(argv)
     try:
         # Настройка логирования
         setup_logging()
         logger = logging.getLogger(__name__)
         logger.info("Запуск приложения Star Orion")
+        setup_metrics()
         
         # Проверка зависимостей
-        if not check_dependencies():
+        if not check_dependencies(headless=args.headless):
             logger.error("Не удалось запустить приложение: отсутствуют зависимости")
             return 1
         
@@ -85,47 +234,10 @@ def main():
         
         # Установка обработчика исключений
         sys.excepthook = handle_exception
-        
-        # Создание приложения Qt
-        app = QApplication(sys.argv)
-        app.setApplicationName("Star Orion")
-        app.setApplicationVersion("1.0.0")
-        app.setOrganizationName("Shtirlizz51")
-        
-        # Настройка стилей (опционально)
-        app.setStyle('Fusion')  # Современный стиль
-        
-        logger.info("Инициализация главного окна")
-        
-        # Создание главного окна
-        try:
-            window = ZefirMainWindow()
-            window.show()
-            
-            # Таймер для периодической проверки состояния
-            status_timer = QTimer()
-            status_timer.timeout.connect(lambda: logger.debug("Приложение работает"))
-            status_timer.start(60000)  # Каждую минуту
-            
-            logger.info("Главное окно создано и показано")
-            
-        except Exception as e:
-            logger.error(f"Ошибка создания главного окна: {e}")
-            msg = QMessageBox()
-            msg.setIcon(QMessageBox.Icon.Critical)
-            msg.setWindowTitle("Ошибка запуска")
-            msg.setText("Не удалось создать главное окно приложения.")
-            msg.setDetailedText(str(e))
-            msg.setStandardButtons(QMessageBox.StandardButton.Ok)
-            msg.exec()
-            return 1
-        
-        # Запуск цикла обработки событий
-        logger.info("Запуск цикла обработки событий Qt")
-        result = app.exec()
-        
-        logger.info(f"Приложение завершено с кодом: {result}")
-        return result
+
+        if args.headless:
+            return run_headless(args)
+        return run_gui()
         
     except Exception as e:
         # Критическая ошибка при запуске
@@ -136,4 +248,4 @@ def main():
 
 if __name__ == '__main__':
     exit_code = main()
-    sys.exit(exit_code)
\ No newline at end of file
+    sys.exit(exit_code)
@@ -0,0 +1,92 @@
+"""
+Бенчмарки горячего пути: округление, доли входа, учет позиции, цикл OrderManager.
+
+Время (ops/sec) меряет pytest-benchmark. Базовая линия времени зависит от машины,
+поэтому хранится локально в .benchmarks:
+    pytest tests/benchmarks --benchmark-autosave
+    pytest tests/benchmarks --benchmark-compare --benchmark-compare-fail=mean:25%
+
+Выделения памяти (tracemalloc) от машины почти не зависят - их базовая линия
+лежит в baselines.json рядом и проверяется в каждом прогоне. После намеренного
+изменения пересчитать: ORION_BENCH_UPDATE=1 pytest tests/benchmarks
+"""
+import gc
+import os
+import json
+import logging
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+BASELINE_PATH = Path(__file__).with_name('baselines.json')
+
+# Допуск к базовой линии выделений: во столько раз плюс фиксированный запас (байт)
+ALLOC_TOLERANCE = 1.5
+ALLOC_SLACK = 2048
+
+
+def measure_allocations(func, *args, repeat: int = 1) -> dict:
+    """
+    Пик памяти на один вызов и память, оставшаяся после repeat вызовов и сборки мусора.
+    Первый вызов - прогрев кэшей (lru_cache, фильтры), в замер не входит.
+    """
+    func(*args)
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        for _ in range(repeat - 1):
+            func(*args)
+        # Циклические ссылки (менеджер <-> коллбэки потока) - не утечка
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'peak_bytes': peak - start, 'retained_bytes': max(current - start, 0)}
+
+
+@pytest.fixture(scope='session')
+def _baselines():
+    baselines = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    updated = dict(baselines)
+    yield baselines, updated
+    if os.environ.get('ORION_BENCH_UPDATE') and updated != baselines:
+        BASELINE_PATH.write_text(json.dumps(updated, indent=2, sort_keys=True) + '\n')
+
+
+@pytest.fixture
+def allocations(request, _baselines):
+    """
+    allocations(benchmark, func, *args, repeat=N): замер tracemalloc,
+    результат в benchmark.extra_info и сравнение с baselines.json.
+    """
+    baselines, updated = _baselines
+    name = request.node.name
+
+    def check(benchmark, func, *args, repeat: int = 100) -> dict:
+        measured = measure_allocations(func, *args, repeat=repeat)
+        benchmark.extra_info.update(measured)
+        if os.environ.get('ORION_BENCH_UPDATE'):
+            updated[name] = measured
+            return measured
+        baseline = baselines.get(name)
+        if baseline is None:
+            return measured
+        for key in ('peak_bytes', 'retained_bytes'):
+            limit = baseline[key] * ALLOC_TOLERANCE + ALLOC_SLACK
+            assert measured[key] <= limit, (
+                f"{name}: {key}={measured[key]} больше базовой линии {baseline[key]} (предел {limit:.0f})")
+        return measured
+
+    return check
+
+
+@pytest.fixture(autouse=True)
+def _quiet_logging():
+    """Логи INFO в горячем пути не должны попадать в замер"""
+    previous = logging.root.manager.disable
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(previous)
@@ -0,0 +1,30 @@
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from core.order_manager import CycleStage, OrderManager, OrderStatus
+from tests.conftest import CONFIG, SYMBOL, emulation_adapter, step_until
+
+
+def run_cycle() -> OrderManager:
+    """Полный цикл на эмуляторе: вход, лестница DCA, TP, рост цены и исполнение всех TP"""
+    adapter = emulation_adapter()
+    manager = OrderManager(adapter, dict(CONFIG))
+    manager.attach_user_stream(adapter.create_user_stream())
+    manager._prepare_start()
+    step_until(manager, CycleStage.MONITORING)
+    adapter.emulator.set_price(SYMBOL, Decimal('110'))
+    step_until(manager, CycleStage.CYCLE_WAIT)
+    return manager
+
+
+def test_order_manager_cycle(benchmark, allocations):
+    manager = benchmark(run_cycle)
+    # Все TP исполнены, закрытые ордера убраны в конце цикла - остаются только открытые DCA
+    assert manager.position.tp_orders == []
+    assert manager.position.size < Decimal('1')
+    assert len(manager.active_orders) == 3
+    assert all(order.status == OrderStatus.PENDING for order in manager.active_orders.values())
+    allocations(benchmark, run_cycle, repeat=10)
@@ -0,0 +1,41 @@
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from core.position_manager import PositionManager
+
+TP_SETTINGS = [(1.9, 33), (3.4, 33), (4.9, 34)]
+DCA_SETTINGS = [(2.8, 10), (5.6, 15), (8.4, 22), (11.2, 33)]
+
+
+@pytest.fixture
+def position():
+    manager = PositionManager()
+    manager.update_position(Decimal('0.015'), Decimal('65000'))
+    return manager
+
+
+def test_update_position_round_trip(benchmark, allocations, position):
+    def round_trip():
+        # Докупка и продажа того же объема - позиция не растет между итерациями
+        position.update_position(Decimal('0.005'), Decimal('64000'))
+        position.update_position(Decimal('-0.005'), Decimal('66000'))
+
+    benchmark(round_trip)
+    assert position.position_qty == Decimal('0.015')
+    allocations(benchmark, round_trip)
+
+
+def test_calculate_tp_levels(benchmark, allocations, position):
+    levels = benchmark(position.calculate_tp_levels, TP_SETTINGS)
+    assert len(levels) == len(TP_SETTINGS)
+    allocations(benchmark, position.calculate_tp_levels, TP_SETTINGS)
+
+
+def test_calculate_dca_levels(benchmark, allocations, position):
+    args = (Decimal('65000'), DCA_SETTINGS, Decimal('1000'))
+    levels = benchmark(position.calculate_dca_levels, *args)
+    assert len(levels) == len(DCA_SETTINGS)
+    allocations(benchmark, position.calculate_dca_levels, *args)
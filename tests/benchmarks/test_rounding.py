@@ -0,0 +1,35 @@
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from exchange.binance_adapter import BinanceAdapter
+
+SYMBOL = 'BTCUSDT'
+
+
+@pytest.fixture(scope='module')
+def adapter():
+    adapter = BinanceAdapter('EMULATION')
+    adapter.get_fixed_filters(SYMBOL)
+    return adapter
+
+
+def test_round_quantity(benchmark, allocations, adapter):
+    quantity = Decimal('0.123456789')
+    assert benchmark(adapter._round_quantity, SYMBOL, quantity) == Decimal('0.12345')
+    allocations(benchmark, adapter._round_quantity, SYMBOL, quantity)
+
+
+def test_round_price(benchmark, allocations, adapter):
+    price = Decimal('65432.10987')
+    assert benchmark(adapter._round_price, SYMBOL, price) == Decimal('65432.10')
+    allocations(benchmark, adapter._round_price, SYMBOL, price)
+
+
+def test_prepare_limit_order(benchmark, allocations, adapter):
+    args = (SYMBOL, 'buy', 'limit', Decimal('0.123456789'), Decimal('65432.10987'))
+    params = benchmark(adapter._prepare_order, *args)
+    assert params['quantity'] == '0.12345000' and params['price'] == '65432.10000000'
+    allocations(benchmark, adapter._prepare_order, *args)
@@ -0,0 +1,45 @@
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from core.strategy_engine import StrategyEngine
+from utils.calculator import plan_ladder, split_deposit
+from utils.fixed_point import FixedFilters
+from exchange.binance_adapter import EMULATION_FILTERS
+
+DEPOSIT = Decimal('1000')
+DCA_COUNT = 5
+MARTINGALE = Decimal('1.5')
+
+
+def test_split_deposit(benchmark, allocations):
+    shares = benchmark(split_deposit, DEPOSIT, DCA_COUNT, MARTINGALE)
+    assert len(shares) == DCA_COUNT + 1
+    allocations(benchmark, split_deposit, DEPOSIT, DCA_COUNT, MARTINGALE)
+
+
+def test_strategy_entry_shares(benchmark, allocations):
+    engine = StrategyEngine(None, None, None, {})
+    shares = benchmark(engine._calculate_entry_shares, DEPOSIT, DCA_COUNT, MARTINGALE)
+    assert sum(shares) == pytest.approx(DEPOSIT)
+    allocations(benchmark, engine._calculate_entry_shares, DEPOSIT, DCA_COUNT, MARTINGALE)
+
+
+def test_backtester_entry_shares(benchmark, allocations):
+    pytest.importorskip('numpy')
+    from core.backtester import entry_shares
+
+    args = (1000.0, DCA_COUNT, 1.5, 0.0015)
+    shares = benchmark(entry_shares, *args)
+    assert list(shares) == pytest.approx([float(s) for s in split_deposit(DEPOSIT, DCA_COUNT, MARTINGALE)])
+    allocations(benchmark, entry_shares, *args)
+
+
+def test_plan_ladder(benchmark, allocations):
+    filters = FixedFilters.from_filters(EMULATION_FILTERS)
+    args = (DEPOSIT, Decimal('65432.10'), DCA_COUNT, MARTINGALE, Decimal('2.8'), filters)
+    plan = benchmark(plan_ladder, *args)
+    assert all(level.valid for level in plan.levels)
+    allocations(benchmark, plan_ladder, *args)
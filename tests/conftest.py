@@ -0,0 +1,112 @@
+"""
+Общие фикстуры тестов. Торговый цикл проверяется на эмуляторе биржи
+(adapter, CONFIG, step_until). Сетевые компоненты - против локального
+HTTP-сервера: он отдает заранее заданные ответы и запоминает запросы.
+"""
+import json
+import threading
+import time
+from collections import deque
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from core.order_manager import CycleStage, OrderManager
+from exchange.binance_adapter import BinanceAdapter
+
+SYMBOL = 'BTCUSDT'
+
+# Ожидания между этапами сжаты до нуля: переходы идут по условиям этапов
+CONFIG = {
+    'symbol': SYMBOL,
+    'wait_after_market': 0,
+    'wait_after_dca': 0,
+    'wait_after_tp_cancel': 0,
+    'wait_between_cycles': 0,
+    'monitoring_duration': 60,
+}
+
+# Защита от зацикливания, если цикл перестанет доходить до этапа
+MAX_STEPS = 100
+
+
+def emulation_adapter() -> BinanceAdapter:
+    """Адаптер в режиме эмуляции с ценой SYMBOL 100 USDT"""
+    adapter = BinanceAdapter('EMULATION')
+    adapter.emulator.set_price(SYMBOL, Decimal('100'))
+    return adapter
+
+
+def step_until(manager: OrderManager, stage: CycleStage, steps: int = MAX_STEPS):
+    """Шаги цикла, пока он не дойдет до этапа stage"""
+    for _ in range(steps):
+        if manager.current_stage == stage:
+            return
+        manager.step()
+    raise AssertionError(f"Цикл не дошел до этапа {stage.value}, остановился на {manager.current_stage.value}")
+
+
+@pytest.fixture
+def adapter():
+    return emulation_adapter()
+
+
+class StubServer:
+    """
+    Локальная замена REST API. Ответы (status, headers, body) берутся из очереди
+    по порядку; когда очередь пуста - default. В requests пишутся
+    (время, метод, путь, query, заголовки, тело).
+    """
+
+    def __init__(self):
+        self.responses = deque()
+        self.default = (200, {}, {})
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                url = urlparse(self.path)
+                stub.requests.append((time.monotonic(), self.command, url.path, parse_qs(url.query),
+                                      dict(self.headers), json.loads(body) if body else None))
+                status, headers, payload = stub.responses.popleft() if stub.responses else stub.default
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def reply(self, status: int = 200, body=None, headers: dict = None):
+        self.responses.append((status, headers or {}, {} if body is None else body))
+
+    def paths(self) -> list:
+        return [request[2] for request in self.requests]
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    yield server
+    server.close()
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from core.backtester import Backtester, BacktestConfig, Candles, load_candles
+
+
+def _candles(*rows) -> Candles:
+    """Свечи (open, high, low, close) с интервалом в минуту"""
+    data = np.array(rows, dtype=np.float64)
+    return Candles(
+        open_time=np.arange(len(rows), dtype=np.int64) * 60000,
+        open=data[:, 0],
+        high=data[:, 1],
+        low=data[:, 2],
+        close=data[:, 3],
+    )
+
+
+# Один уровень DCA на -10% и один TP на +10% на всю позицию: депозит делится пополам
+CONFIG = dict(deposit=1000, deposit_percent=100, dca_count=1, dca_step_percent=10,
+              martingale_coef=1, tp_levels=((10, 100),))
+
+
+def test_dca_then_tp_without_commission():
+    candles = _candles(
+        (100, 101, 99, 100),  # вход 500 USDT по 100: 5 монет
+        (100, 100, 89, 90),   # DCA 500 USDT по 90: еще 5.5556, средняя 94.74, TP 104.21
+        (90, 105, 90, 105),   # TP продает всю позицию: 1000 * 1.1 = 1100
+        (105, 105, 105, 105),  # новый цикл на 550 USDT, не закрыт
+    )
+
+    result = Backtester(candles, BacktestConfig(commission_rate=0, **CONFIG)).run()
+
+    first, second = result.cycles
+    assert (first.start_index, first.end_index, first.dca_filled, first.closed) == (0, 2, 1, True)
+    assert first.pnl == pytest.approx(100)
+    assert first.max_cost == pytest.approx(1000)
+    assert first.duration_sec == 180
+    assert (second.start_index, second.closed) == (3, False)
+    assert second.max_cost == pytest.approx(550)
+    np.testing.assert_allclose(result.equity, [1000, 950, 1100, 1100])
+    assert result.final_equity == pytest.approx(1100)
+    assert result.total_return_percent == pytest.approx(10)
+    # Просадка: после DCA позиция стоит 10.5556 * 90 = 950
+    assert result.max_drawdown_percent == pytest.approx(5)
+    assert result.exposure_time == 0.75
+    assert result.win_rate == 1
+    assert result.fees == 0
+
+
+def test_tp_with_commission():
+    fee = 0.001
+    candles = _candles(
+        (100, 101, 99, 100),
+        (100, 111, 100, 111),
+    )
+
+    result = Backtester(candles, BacktestConfig(commission_rate=fee, **CONFIG)).run()
+
+    # Вход: доля 500 * (1 - fee), комиссия списывается с монет
+    qty = 1000 * (1 - fee) / 2 / 100 * (1 - fee)
+    coins = qty * (1 - fee)
+    tp_price = 100 * (1 + 0.10 + fee)
+    cash = 1000 - qty * 100 + coins * tp_price * (1 - fee)
+    assert result.cycles[0].closed
+    assert result.cycles[0].pnl == pytest.approx(cash - 1000)
+    assert result.fees == pytest.approx(qty * fee * 100 + coins * tp_price * fee)
+
+
+def test_load_candles_csv_with_header(tmp_path):
+    path = tmp_path / 'candles.csv'
+    path.write_text("open_time,open,high,low,close,volume\n"
+                    "1700000000000000,1,2,0.5,1.5,10\n"
+                    "1700000060000000,1.5,2,1,2,10\n")
+
+    candles = load_candles(str(path))
+
+    # Время в микросекундах приводится к мс
+    assert candles.open_time.tolist() == [1700000000000, 1700000060000]
+    assert candles.close.tolist() == [1.5, 2.0]
+    assert candles.interval_sec == 60
@@ -0,0 +1,147 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from exchange.binance_service import BinanceAPIError, BinanceService, WeightBudget
+
+
+@pytest.fixture
+def service(stub_server):
+    service = BinanceService('test-key', 'test-secret', base_url=stub_server.url, request_timeout=10)
+    yield service
+    service.close()
+
+
+def test_public_request_has_no_api_key(service, stub_server):
+    stub_server.reply(body={'symbol': 'BTCUSDT', 'price': '100.0'})
+
+    assert service.get_symbol_ticker('BTCUSDT')['price'] == '100.0'
+
+    _, method, path, query, headers, _ = stub_server.requests[0]
+    assert (method, path, query['symbol']) == ('GET', '/api/v3/ticker/price', ['BTCUSDT'])
+    assert 'X-MBX-APIKEY' not in headers
+
+
+def test_signed_request_has_key_and_signature(service, stub_server):
+    stub_server.reply(body={'orderId': 1})
+
+    service.get_order('BTCUSDT', 1)
+
+    _, _, _, query, headers, _ = stub_server.requests[0]
+    assert headers['X-MBX-APIKEY'] == 'test-key'
+    assert {'timestamp', 'recvWindow', 'signature'} <= set(query)
+
+
+def test_user_stream_request_sends_key_without_signature(service, stub_server):
+    stub_server.reply(body={'listenKey': 'abc'})
+
+    assert service.stream_get_listen_key() == 'abc'
+
+    _, method, _, query, headers, _ = stub_server.requests[0]
+    assert method == 'POST'
+    assert headers['X-MBX-APIKEY'] == 'test-key'
+    assert 'signature' not in query
+
+
+def test_used_weight_header_reduces_budget(service, stub_server):
+    budget = service.aclient.budget
+    stub_server.reply(body={}, headers={'X-MBX-USED-WEIGHT-1M': '5000'})
+
+    service.ping()
+
+    assert budget.tokens <= budget.capacity - 5000
+
+
+def test_429_waits_retry_after_and_retries(service, stub_server):
+    stub_server.reply(429, {'code': -1003, 'msg': 'Too many requests'}, headers={'Retry-After': '1'})
+    stub_server.reply(body={'serverTime': 1})
+
+    assert service.get_server_time() == {'serverTime': 1}
+
+    first, second = stub_server.requests
+    assert second[0] - first[0] >= 0.9
+
+
+def test_long_retry_after_raises_without_waiting(service, stub_server):
+    stub_server.reply(429, {'code': -1003, 'msg': 'Too many requests'}, headers={'Retry-After': '60'})
+
+    started = time.monotonic()
+    with pytest.raises(BinanceAPIError) as error:
+        service.ping()
+    # Пока действует пауза, следующие запросы отклоняются без отправки
+    with pytest.raises(BinanceAPIError, match='приостановлены'):
+        service.ping()
+
+    assert time.monotonic() - started < 5
+    assert (error.value.status, error.value.retry_after) == (429, 60)
+    assert len(stub_server.requests) == 1
+
+
+def test_facade_timeout_cancels_request(service, stub_server):
+    service.request_timeout = 0.2
+    service.aclient.budget.block(1)
+
+    with pytest.raises(TimeoutError):
+        service.get_order('BTCUSDT', 1)
+
+    # Отмененный запрос не уходит на биржу после окончания паузы
+    time.sleep(1.3)
+    assert stub_server.requests == []
+
+
+def test_418_is_not_retried(service, stub_server):
+    stub_server.reply(418, {'code': -1003, 'msg': 'Banned'}, headers={'Retry-After': '1'})
+
+    with pytest.raises(BinanceAPIError) as error:
+        service.ping()
+
+    assert error.value.status == 418
+    assert len(stub_server.requests) == 1
+
+
+def test_timestamp_error_resyncs_clock(service, stub_server):
+    server_time = int(time.time() * 1000) + 60000
+    stub_server.reply(400, {'code': -1021, 'msg': 'Timestamp outside recvWindow'})
+    stub_server.reply(body={'serverTime': server_time})
+    stub_server.reply(body={'balances': []})
+
+    assert service.get_account() == {'balances': []}
+
+    assert stub_server.paths() == ['/api/v3/account', '/api/v3/time', '/api/v3/account']
+    assert service.aclient.time_offset > 55000
+    retried_timestamp = int(stub_server.requests[2][3]['timestamp'][0])
+    assert retried_timestamp >= server_time
+
+
+def test_client_error_raises_with_code(service, stub_server):
+    stub_server.reply(400, {'code': -2013, 'msg': 'Order does not exist.'})
+
+    with pytest.raises(BinanceAPIError) as error:
+        service.get_order('BTCUSDT', 1)
+
+    assert (error.value.status, error.value.code) == (400, -2013)
+
+
+def test_gather_returns_exceptions_in_place(service, stub_server):
+    stub_server.reply(body={'orderId': 1})
+    stub_server.reply(400, {'code': -2010, 'msg': 'Insufficient balance'})
+
+    results = service.gather(service.aclient.get_order('BTCUSDT', 1), service.aclient.get_order('BTCUSDT', 2))
+
+    assert sum(isinstance(r, BinanceAPIError) for r in results) == 1
+    assert sum(isinstance(r, dict) for r in results) == 1
+
+
+def test_weight_budget_waits_for_refill():
+    budget = WeightBudget(limit=60, safety=1.0)
+
+    async def spend():
+        await budget.acquire(60)
+        started = time.monotonic()
+        await budget.acquire(1)
+        return time.monotonic() - started
+
+    assert asyncio.run(spend()) >= 0.9
@@ -0,0 +1,43 @@
+from decimal import Decimal
+
+import pytest
+
+from exchange.binance_adapter import EMULATION_FILTERS, BinanceAdapter
+from exchange.symbol_filters import SymbolFilterRegistry
+from utils.calculator import plan_ladder
+from utils.fixed_point import FixedFilters, to_fixed
+
+SYMBOL = 'BTCUSDT'
+FILTERS = dict(EMULATION_FILTERS, minNotional=Decimal('10'))
+
+
+def test_plan_ladder_zeroes_levels_below_min_notional():
+    fixed = FixedFilters.from_filters(FILTERS)
+
+    plan = plan_ladder(Decimal('100'), Decimal('100'), 3, Decimal('2'), Decimal('1'), fixed)
+
+    # Доли 1:2:4:8 от ~100 USDT: первая (~6.7 USDT) дешевле minNotional
+    assert not plan.entry.valid
+    assert all(level.valid for level in plan.dca)
+    assert all(fixed.meets_notional(to_fixed(level.quantity), to_fixed(level.price)) for level in plan.dca)
+
+
+def test_prepare_order_rejects_limit_below_min_notional():
+    adapter = BinanceAdapter('EMULATION')
+    adapter.filters = SymbolFilterRegistry(defaults=FILTERS)
+
+    params = adapter._prepare_order(SYMBOL, 'sell', 'limit', Decimal('0.1'), Decimal('100'))
+    assert params['quantity'] == '0.10000000'
+    with pytest.raises(ValueError, match='minNotional'):
+        adapter._prepare_order(SYMBOL, 'sell', 'limit', Decimal('0.09'), Decimal('100'))
+    # Рыночный ордер проверяется при планировании, цены в запросе нет
+    adapter._prepare_order(SYMBOL, 'buy', 'market', Decimal('0.01'))
+
+
+def test_fixed_filters_cached_per_normalized_symbol():
+    registry = SymbolFilterRegistry(defaults=FILTERS)
+
+    fixed = registry.get_fixed(SYMBOL.lower())
+
+    assert registry.get_fixed(SYMBOL) is fixed
+    assert list(registry._fixed) == [SYMBOL]
@@ -0,0 +1,122 @@
+from decimal import Decimal
+
+import pytest
+
+from exchange.emulator import EmulatorFeed, MatchingEngine, PriceFeed
+
+SYMBOL = 'BTCUSDT'
+
+
+@pytest.fixture
+def engine():
+    engine = MatchingEngine(balances={'USDT': Decimal('10000')}, commission_rate=Decimal('0.001'))
+    engine.set_price(SYMBOL, Decimal('100'))
+    return engine
+
+
+def test_limit_fills_at_own_price_within_tick_volume(engine):
+    order = engine.create_order(SYMBOL, 'buy', 'limit', Decimal('3'), Decimal('95'))
+    assert engine.get_locked('USDT') == Decimal('285')
+
+    engine.set_price(SYMBOL, Decimal('94'), volume=Decimal('1'))
+    info = engine.get_order(order['id'], SYMBOL)
+    assert info['status'] == 'PARTIALLY_FILLED'
+    assert info['filled_qty'] == Decimal('1')
+    assert info['avg_price'] == Decimal('95')
+
+    engine.set_price(SYMBOL, Decimal('94'), volume=Decimal('5'))
+    info = engine.get_order(order['id'], SYMBOL)
+    assert info['status'] == 'FILLED'
+    assert engine.get_locked('USDT') == 0
+    assert engine.get_balance('BTC') == Decimal('3') * Decimal('0.999')
+    assert engine.get_balance('USDT') == Decimal('10000') - Decimal('285')
+
+
+def test_price_time_priority(engine):
+    first = engine.create_order(SYMBOL, 'buy', 'limit', Decimal('1'), Decimal('95'))
+    better = engine.create_order(SYMBOL, 'buy', 'limit', Decimal('1'), Decimal('96'))
+    second = engine.create_order(SYMBOL, 'buy', 'limit', Decimal('1'), Decimal('95'))
+
+    engine.set_price(SYMBOL, Decimal('95'), volume=Decimal('2'))
+
+    statuses = {o['id']: o['status'] for o in engine.get_all_orders(SYMBOL)}
+    assert statuses[better['id']] == 'FILLED'
+    assert statuses[first['id']] == 'FILLED'
+    assert statuses[second['id']] == 'NEW'
+
+
+def test_market_order_capped_by_tick_volume(engine):
+    engine.set_price(SYMBOL, Decimal('100'), volume=Decimal('2'))
+
+    order = engine.create_order(SYMBOL, 'buy', 'market', Decimal('5'))
+
+    assert order['status'] == 'EXPIRED'
+    assert order['filled_qty'] == Decimal('2')
+    assert order['avg_price'] == Decimal('100')
+    assert engine.get_balance('USDT') == Decimal('9800')
+    # Объем тика израсходован - следующий рыночный ордер ждет нового тика
+    assert engine.create_order(SYMBOL, 'buy', 'market', Decimal('1'))['filled_qty'] == 0
+
+
+def test_market_order_without_volume_fills_fully(engine):
+    order = engine.create_order(SYMBOL, 'buy', 'market', Decimal('5'))
+    assert order['status'] == 'FILLED'
+    assert order['filled_qty'] == Decimal('5')
+
+
+def test_cancel_unlocks_remaining(engine):
+    engine.deposit('BTC', Decimal('2'))
+    order = engine.create_order(SYMBOL, 'sell', 'limit', Decimal('2'), Decimal('110'))
+    engine.set_price(SYMBOL, Decimal('111'), volume=Decimal('0.5'))
+
+    cancelled = engine.cancel_order(order['id'], SYMBOL)
+
+    assert cancelled['status'] == 'CANCELED'
+    assert cancelled['filled_qty'] == Decimal('0.5')
+    assert engine.get_locked('BTC') == 0
+    assert engine.get_balance('BTC') == Decimal('1.5')
+    assert engine.get_open_orders(SYMBOL) == []
+    with pytest.raises(ValueError):
+        engine.cancel_order(order['id'], SYMBOL)
+
+
+def test_replay_emits_execution_reports(engine):
+    events = []
+    engine.add_listener(events.append)
+    engine.create_order(SYMBOL, 'buy', 'limit', Decimal('1'), Decimal('98'))
+    feed = PriceFeed(SYMBOL, [(1000, Decimal('99'), None), (2000, Decimal('97'), None)])
+
+    engine.replay(feed)
+
+    assert [e['X'] for e in events] == ['NEW', 'FILLED']
+    assert events[-1]['T'] == 2000
+    assert engine.get_price(SYMBOL) == Decimal('97')
+
+
+def test_feed_ticks_replay_and_ticker(engine):
+    replay = PriceFeed(SYMBOL, [(1000, Decimal('101'), None), (2000, Decimal('99'), None)])
+    prices = iter([Decimal('10'), ConnectionError("timeout"), Decimal('11')])
+
+    def fetch_price(symbol):
+        price = next(prices)
+        if isinstance(price, Exception):
+            raise price
+        return price
+
+    feed = EmulatorFeed(engine, [SYMBOL], feeds={SYMBOL: replay}, fetch_price=fetch_price, interval=60)
+    feed.start()
+    try:
+        # Первый тик применяется до запуска потока
+        assert engine.get_price(SYMBOL) == Decimal('101')
+        feed.subscribe(['ETHUSDT'])
+        assert engine.get_price('ETHUSDT') == Decimal('10')
+
+        # Ошибка тикера не останавливает ленту, цена остается прежней
+        feed.tick()
+        assert (engine.get_price(SYMBOL), engine.get_price('ETHUSDT')) == (Decimal('99'), Decimal('10'))
+        feed.tick()
+        assert (engine.get_price(SYMBOL), engine.get_price('ETHUSDT')) == (Decimal('99'), Decimal('11'))
+        # Время ордеров не переходит на время записанной ленты
+        assert engine.now() > 2000
+    finally:
+        feed.stop()
@@ -0,0 +1,106 @@
+import os
+import time
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip('PyQt6.QtWidgets')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtWidgets import QApplication
+
+from core.order_manager import Order, OrderStatus
+from gui.orders_model import OrdersTableModel, OrdersUpdateBridge
+
+WAITS = {
+    'wait_after_market': 0,
+    'wait_after_dca': 0,
+    'wait_after_tp_cancel': 0,
+    'wait_between_cycles': 0,
+}
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def _process_until(app, condition, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        app.processEvents()
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("Условие не выполнено за отведенное время")
+
+
+def test_bridge_sends_snapshot_taken_at_push(app):
+    model = OrdersTableModel()
+    bridge = OrdersUpdateBridge(max_rate=100)
+    bridge.orders_changed.connect(model.set_orders)
+    order = Order(id='1', symbol='BTCUSDT', side='buy', type='limit', amount=Decimal('1'), price=Decimal('95'))
+
+    bridge.push('BTCUSDT', [order])
+    # Торговый поток меняет ордер уже после push - в таблицу уходит снимок
+    order.status = OrderStatus.FILLED
+    _process_until(app, lambda: model.rowCount() == 1)
+
+    assert model.data(model.index(0, 6)) == "Открыт"
+
+
+def test_window_shows_orders_of_two_symbols(app, tmp_path, monkeypatch):
+    pytest.importorskip('cryptography')
+    monkeypatch.chdir(tmp_path)
+    from exchange.binance_adapter import BinanceAdapter
+    from gui.main_window import ZefirMainWindow
+
+    # Лента эмулятора берет цены из тикера, а не из сети
+    prices = {'BTCUSDT': Decimal('100'), 'ETHUSDT': Decimal('10')}
+    monkeypatch.setattr(BinanceAdapter, '_fetch_public_price', lambda self, symbol: prices[symbol])
+    window = ZefirMainWindow()
+    try:
+        service = window.service
+        assert service is not None
+        service.update_config(WAITS)
+        window.deposit_percent.setValue(40)
+
+        for symbol in ('BTCUSDT', 'ETHUSDT'):
+            window.symbol_combo.setCurrentText(symbol)
+            window.start_strategy()
+
+        model = window.orders_model
+        symbols = lambda: {model.data(model.index(row, 0)) for row in range(model.rowCount())}
+        _process_until(app, lambda: symbols() == {'BTCUSDT', 'ETHUSDT'})
+        assert set(service.managers) == {'BTCUSDT', 'ETHUSDT'}
+        assert all(manager.on_orders_update is not None for manager in service.managers.values())
+
+        window.hard_stop_strategy()
+        assert not service.is_running()
+    finally:
+        window.close()
+    assert window.service is None
+
+
+def test_info_block_shows_stats(app, tmp_path, monkeypatch):
+    pytest.importorskip('cryptography')
+    monkeypatch.chdir(tmp_path)
+    from gui.main_window import ZefirMainWindow
+
+    window = ZefirMainWindow()
+    try:
+        stats = window.service.stats
+        stats.on_fill('BTCUSDT', 'buy', 1, 100, 0.1)
+        stats.on_fill('BTCUSDT', 'sell', 1, 110, 0.1)
+        window.symbol_combo.setCurrentText('BTCUSDT')
+
+        window._refresh_info()
+
+        info = window.info_block
+        assert info.mode_label.text() == "Эмуляция"
+        assert info.pnl_label.text() == "+9.80"
+        assert info.cycle_pnl_label.text() == "+9.80"
+        assert info.start_balance_label.text() == "10000.00 USDT"
+        assert info.current_balance_label.text() == "10009.80 USDT"
+    finally:
+        window.close()
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from core.indicator_engine import (ATR, EMA, RSI, VWAP, Bollinger, IndicatorEngine, RollingMax, RollingMin,
+                                   atr, bollinger, ema, rolling_max, rolling_min, rsi, vwap)
+
+TOLERANCE = 1e-8
+
+
+@pytest.fixture(scope='module')
+def candles():
+    rng = np.random.default_rng(7)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 500)))
+    spread = np.abs(rng.normal(0, 0.5, 500))
+    return {
+        'close': close,
+        'high': close + spread,
+        'low': close - spread,
+        'volume': rng.uniform(1, 10, 500),
+    }
+
+
+def _stream(indicator, *columns) -> np.ndarray:
+    """Значения потокового индикатора после каждого обновления (None -> NaN)"""
+    out = []
+    for values in zip(*columns):
+        value = indicator.update(*map(float, values))
+        out.append(np.nan if value is None else value)
+    return np.array(out)
+
+
+def test_batch_matches_incremental(candles):
+    close, high, low, volume = candles['close'], candles['high'], candles['low'], candles['volume']
+
+    np.testing.assert_allclose(ema(close, 20), _stream(EMA(20), close), rtol=TOLERANCE)
+    np.testing.assert_allclose(rsi(close, 14), _stream(RSI(14), close), rtol=TOLERANCE)
+    np.testing.assert_allclose(atr(high, low, close, 14), _stream(ATR(14), high, low, close), rtol=TOLERANCE)
+    np.testing.assert_allclose(vwap(close, volume), _stream(VWAP(), close, volume), rtol=TOLERANCE)
+    np.testing.assert_allclose(vwap(close, volume, 30), _stream(VWAP(30), close, volume), rtol=TOLERANCE)
+    np.testing.assert_array_equal(rolling_min(low, 60), _stream(RollingMin(60), low))
+    np.testing.assert_array_equal(rolling_max(high, 60), _stream(RollingMax(60), high))
+
+    band = Bollinger(20)
+    rows = np.array([band.update(float(x)) or (np.nan,) * 3 for x in close])
+    for batch, stream in zip(bollinger(close, 20), rows.T):
+        np.testing.assert_allclose(batch, stream, rtol=TOLERANCE)
+
+
+def test_warm_up_matches_incremental(candles):
+    close, high, low, volume = candles['close'], candles['high'], candles['low'], candles['volume']
+    history = 300
+
+    warmed = IndicatorEngine(vwap_period=30)
+    warmed.warm_up(close[:history], high[:history], low[:history], volume[:history])
+    streamed = IndicatorEngine(vwap_period=30)
+    for i in range(history):
+        streamed.update(close[i], volume[i], high[i], low[i])
+    assert warmed.snapshot() == pytest.approx(streamed.snapshot(), rel=TOLERANCE)
+
+    # После прогрева тики продолжают ряд так же, как без него
+    for i in range(history, len(close)):
+        warmed.update(close[i], volume[i], high[i], low[i])
+        streamed.update(close[i], volume[i], high[i], low[i])
+    assert warmed.snapshot() == pytest.approx(streamed.snapshot(), rel=TOLERANCE)
+
+
+def test_short_history_warm_up(candles):
+    close = candles['close'][:5]
+    engine = IndicatorEngine()
+    engine.warm_up(close)
+
+    snapshot = engine.snapshot()
+    assert snapshot['price'] == close[-1]
+    assert snapshot['ema'] is None and snapshot['rsi'] is None
+    assert snapshot['rolling_min'] == close.min()
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from core.backtester import Candles
+from core.optimizer import ParameterSweep, ResultStore
+
+
+@pytest.fixture(scope='module')
+def candles():
+    # Колебания цены +-6%: циклы доходят и до DCA, и до TP
+    n = 600
+    close = 100 * (1 + 0.06 * np.sin(np.arange(n) / 15))
+    return Candles(
+        open_time=np.arange(n, dtype=np.int64) * 60000,
+        open=close,
+        high=close * 1.002,
+        low=close * 0.998,
+        close=close,
+    )
+
+
+@pytest.fixture
+def sweep(candles, tmp_path):
+    return ParameterSweep(candles, str(tmp_path / 'results'), workers=1, checkpoint_every=2)
+
+
+def test_grid_search_stores_full_settings(sweep):
+    assert sweep.grid_search({'dca_count': [2, 3], 'dca_step_percent': [1.5, 3.0]}) == 4
+
+    results = sweep.store.load()
+    assert len(results['key']) == 4
+    # Параметры вне пространства записаны значениями по умолчанию
+    assert set(results['martingale_coef']) == {1.0}
+    assert {'tp3_volume', 'deposit_percent', 'total_return_percent'} <= set(results)
+    best = sweep.best(top=4)
+    scores = [row['total_return_percent'] for row in best]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_resume_skips_completed_combinations(sweep, candles, tmp_path):
+    sweep.grid_search({'dca_count': [2, 3]})
+
+    resumed = ParameterSweep(candles, str(tmp_path / 'results'), workers=1)
+    assert resumed.grid_search({'dca_count': [2, 3]}) == 0
+    # Явно заданное значение по умолчанию - та же комбинация
+    assert resumed.grid_search({'dca_count': [3], 'martingale_coef': [1.0]}) == 0
+    assert resumed.grid_search({'dca_count': [2, 3, 4]}) == 1
+    assert len(resumed.store.load()['key']) == 3
+
+
+def test_mixed_spaces_share_one_schema(sweep):
+    sweep.grid_search({'dca_count': [2, 3]})
+    sweep.grid_search({'martingale_coef': [1.0, 1.5]})
+
+    results = sweep.store.load()
+    assert len({len(values) for values in results.values()}) == 1
+    assert len(sweep.best()) == 3
+
+    space = {'dca_step_percent': (1.0, 4.0), 'martingale_coef': (1.0, 2.0)}
+    assert len(sweep._observed(space)) == 3
+    assert sweep.bayesian_search(space, iterations=2, initial=2, batch=1, candidates=4) >= 4
+
+
+def test_load_fills_missing_columns_with_nan(tmp_path):
+    store = ResultStore(str(tmp_path / 'results'))
+    store.append([{'key': 'a', 'dca_count': 2.0, 'total_return_percent': 1.0}])
+    store.append([{'key': 'b', 'martingale_coef': 1.5, 'total_return_percent': 2.0},
+                  {'key': 'c', 'martingale_coef': 2.0, 'total_return_percent': 3.0}])
+
+    results = store.load()
+
+    assert results['key'].tolist() == ['a', 'b', 'c']
+    np.testing.assert_array_equal(results['dca_count'], [2.0, np.nan, np.nan])
+    np.testing.assert_array_equal(results['martingale_coef'], [np.nan, 1.5, 2.0])
@@ -0,0 +1,80 @@
+from decimal import Decimal
+
+from exchange.order_book import DepthStream, OrderBookMirror
+
+SYMBOL = 'BTCUSDT'
+
+SNAPSHOT = {
+    'lastUpdateId': 100,
+    'bids': [['99.0', '1'], ['98.0', '2']],
+    'asks': [['101.0', '1'], ['102.0', '2']],
+}
+
+
+def _diff(first: int, last: int, bids=(), asks=()) -> dict:
+    return {'e': 'depthUpdate', 's': SYMBOL, 'U': first, 'u': last, 'b': list(bids), 'a': list(asks)}
+
+
+def test_buffered_events_applied_after_snapshot():
+    book = OrderBookMirror(SYMBOL)
+    book.apply_diff(_diff(95, 99, bids=[['99.0', '5']]))
+    book.apply_diff(_diff(100, 102, bids=[['99.5', '1']]))
+    book.apply_diff(_diff(103, 104, asks=[['101.0', '0']]))
+
+    assert book.apply_snapshot(SNAPSHOT)
+
+    assert book.synced
+    assert book.last_update_id == 104
+    assert book.best_bid() == Decimal('99.5')
+    assert book.best_ask() == Decimal('102.0')
+    # Событие до снимка отброшено
+    assert book.bids.levels[Decimal('99.0')] == Decimal('1')
+
+
+def test_snapshot_older_than_buffer_needs_new_snapshot():
+    book = OrderBookMirror(SYMBOL)
+    book.apply_diff(_diff(105, 110))
+
+    assert not book.apply_snapshot(SNAPSHOT)
+
+    assert not book.synced
+    assert book.apply_snapshot(dict(SNAPSHOT, lastUpdateId=104))
+    assert book.last_update_id == 110
+
+
+def test_gap_in_stream_unsyncs_book():
+    book = OrderBookMirror(SYMBOL)
+    book.apply_snapshot(SNAPSHOT)
+
+    assert book.apply_diff(_diff(101, 103))
+    assert book.apply_diff(_diff(90, 103))  # устаревшее событие игнорируется
+    assert not book.apply_diff(_diff(105, 106))
+
+    assert not book.synced
+    assert book.last_update_id == 103
+    # После нового снимка буфер с событием разрыва догоняется
+    assert book.apply_snapshot(dict(SNAPSHOT, lastUpdateId=104))
+    assert book.last_update_id == 106
+
+
+def test_stream_requests_snapshot_on_gap():
+    snapshots = []
+
+    def snapshot(symbol):
+        snapshots.append(symbol)
+        return dict(SNAPSHOT, lastUpdateId=104)
+
+    stream = DepthStream([SYMBOL], snapshot)
+    book = stream.books[SYMBOL]
+    book.apply_snapshot(SNAPSHOT)
+    assert stream.get_book(SYMBOL) is book
+
+    stream.handle_message({'stream': 'btcusdt@depth@100ms', 'data': _diff(105, 106)})
+
+    for _ in range(100):
+        if book.synced:
+            break
+        stream._stop_event.wait(0.01)
+    assert snapshots == [SYMBOL]
+    assert stream.get_book(SYMBOL) is book
+    assert book.last_update_id == 106
@@ -0,0 +1,264 @@
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from core.order_manager import CycleStage, OrderManager, OrderStatus
+from exchange.binance_adapter import EMULATION_FILTERS
+from exchange.symbol_filters import SymbolFilterRegistry
+from tests.conftest import CONFIG, SYMBOL, step_until
+from utils.fixed_point import FixedFilters, from_fixed, to_fixed
+
+
+class SplitBook:
+    """Стакан, по которому вход всегда делится на две равные части"""
+
+    @staticmethod
+    def estimate_quote_fill(side, quote_amount):
+        return SimpleNamespace(levels=0)
+
+    @staticmethod
+    def split_order(side, quantity, max_slippage, max_children):
+        return [quantity / 2, quantity / 2]
+
+
+@pytest.fixture
+def monitoring(adapter):
+    """Цикл без потока исполнений, дошедший до мониторинга TP"""
+    manager = OrderManager(adapter, dict(CONFIG))
+    manager._prepare_start()
+    step_until(manager, CycleStage.MONITORING)
+    return manager
+
+
+def test_entry_children_are_timer_steps(adapter, monkeypatch):
+    monkeypatch.setattr(adapter, 'get_depth_book', lambda symbol: SplitBook())
+    manager = OrderManager(adapter, dict(CONFIG, max_entry_slippage_percent=0.1, entry_child_interval=30))
+    manager._prepare_start()
+
+    started = time.monotonic()
+    delay = manager.step()
+
+    # Шаг не ждет интервал, а возвращает его планировщику
+    assert time.monotonic() - started < 1
+    assert delay == pytest.approx(30, abs=1)
+    assert manager.current_stage == CycleStage.MARKET_ORDER
+    assert len(manager.position.entry_orders) == 1
+    assert manager.step() == pytest.approx(30, abs=1)
+    assert len(manager.position.entry_orders) == 1
+
+    manager._stage_deadline = 0
+    manager.step()
+    first, second = manager.position.entry_orders
+    assert first.amount == second.amount
+    assert manager.current_stage == CycleStage.WAITING_MARKET
+
+
+def test_stop_drops_pending_children(adapter, monkeypatch):
+    monkeypatch.setattr(adapter, 'get_depth_book', lambda symbol: SplitBook())
+    manager = OrderManager(adapter, dict(CONFIG, max_entry_slippage_percent=0.1, entry_child_interval=30))
+    manager._prepare_start()
+    manager.step()
+
+    manager.stop()
+
+    assert manager.step() is None
+    manager._finish()
+    assert manager._entry_children == []
+    assert len(manager.position.entry_orders) == 1
+
+
+@pytest.mark.parametrize('split, expected', [
+    # 3 USDT и 4 USDT меньше minNotional: первая присоединяется к следующей, хвост - к предыдущей
+    (['0.9', '0.03', '0.03', '0.04'], ['0.9', '0.1']),
+    (['0.01', '0.99'], ['1']),
+    (['0.5', '0.5'], ['0.5', '0.5']),
+])
+def test_split_entry_folds_children_below_filters(adapter, split, expected):
+    book = SimpleNamespace(split_order=lambda *args: [Decimal(child) for child in split])
+    fixed = FixedFilters.from_filters(dict(EMULATION_FILTERS, minNotional=Decimal('5')))
+    manager = OrderManager(adapter, dict(CONFIG, max_entry_slippage_percent=0.1))
+
+    children = manager._split_entry(book, Decimal('1'), Decimal('100'), fixed)
+
+    assert children == [Decimal(child) for child in expected]
+
+
+def test_tp_cancel_applies_fill_before_cancel(adapter, monitoring):
+    manager = monitoring
+    tp = manager.position.tp_orders[0]
+    size_before = manager.position.size
+    # Частичное исполнение, о котором менеджер еще не знает (потока нет)
+    adapter.emulator.set_price(SYMBOL, tp.price, volume=tp.amount / 2)
+
+    manager._cancel_tp_orders()
+
+    assert tp.status == OrderStatus.CANCELLED
+    assert tp.filled_amount == tp.amount / 2
+    assert manager.position.size == size_before - tp.amount / 2
+    assert manager.position.tp_orders == []
+    assert manager._cancels_acknowledged()
+
+
+def test_failed_tp_cancel_keeps_order_until_confirmed(adapter, monitoring, monkeypatch):
+    manager = monitoring
+    stuck, *others = manager.position.tp_orders
+    cancel_orders = adapter.cancel_orders
+
+    def cancel_all_but_stuck(orders):
+        results = cancel_orders([o for o in orders if o[0] != stuck.id])
+        return [ConnectionError("timeout")] + results
+
+    monkeypatch.setattr(adapter, 'cancel_orders', cancel_all_but_stuck)
+    manager._cancel_tp_orders()
+
+    assert manager.position.tp_orders == [stuck]
+    assert manager._cancelling == [stuck]
+    assert not manager._cancels_acknowledged()
+    assert all(order.status == OrderStatus.CANCELLED for order in others)
+
+    # Новая лестница не продает объем, который еще стоит в неотмененном TP
+    manager._create_tp_orders()
+    new_orders = manager.position.tp_orders[1:]
+    assert new_orders
+    sold = sum(order.amount for order in manager.position.tp_orders)
+    assert sold <= manager.position.size
+
+
+def test_failed_tp_cancel_survives_recovery(adapter, monitoring, monkeypatch, tmp_path):
+    from infra.state import StateStore
+
+    store = StateStore(tmp_path / 'state.db')
+    manager = monitoring
+    manager.attach_state_store(store)
+    manager.save_snapshot()
+    stuck = manager.position.tp_orders[0]
+    cancel_orders = adapter.cancel_orders
+    monkeypatch.setattr(adapter, 'cancel_orders', lambda orders: [ConnectionError("timeout")]
+                        + cancel_orders(orders[1:]))
+
+    manager._cancel_tp_orders()
+    store.flush()
+
+    restored = OrderManager(adapter, dict(CONFIG))
+    restored.attach_state_store(store)
+    assert restored.recover_state()
+    assert [order.id for order in restored.position.tp_orders] == [stuck.id]
+    store.close()
+
+
+def _fail_first_attempt(adapter, monkeypatch, level: int = 1):
+    """Первая попытка выставить лестницу теряет уровень level, следующие проходят"""
+    create_orders = adapter.create_orders
+    attempts = []
+
+    def flaky(requests):
+        attempts.append([request.quantity for request in requests])
+        results = create_orders(requests)
+        if len(attempts) == 1:
+            for order in results[level:level + 1]:
+                adapter.cancel_order(order['id'], SYMBOL)
+            results[level] = ConnectionError("timeout")
+        return results
+
+    monkeypatch.setattr(adapter, 'create_orders', flaky)
+    return attempts
+
+
+def test_tp_rollback_drops_cancelled_orders(adapter, monitoring, monkeypatch):
+    manager = monitoring
+    manager._cancel_tp_orders()
+    attempts = _fail_first_attempt(adapter, monkeypatch)
+
+    manager._create_tp_orders()
+
+    assert len(attempts) == 2
+    assert len(manager.position.tp_orders) == 3
+    assert all(order.is_open for order in manager.position.tp_orders)
+    # Все TP исполнены - цикл видит это, отмененные при откате ордера не мешают
+    for order in manager.position.tp_orders:
+        order.status = OrderStatus.FILLED
+    assert manager._tp_orders_filled()
+
+
+def test_tp_retry_uses_position_after_rollback(adapter, monitoring, monkeypatch):
+    manager = monitoring
+    manager._cancel_tp_orders()
+    size_before = manager.position.size
+    create_orders = adapter.create_orders
+    attempts = []
+
+    def fill_then_fail(requests):
+        attempts.append([request.quantity for request in requests])
+        results = create_orders(requests)
+        if len(attempts) == 1:
+            # Первый уровень успел исполниться до отката, второй не принят
+            adapter.emulator.set_price(SYMBOL, requests[0].price, volume=requests[0].quantity)
+            adapter.cancel_order(results[1]['id'], SYMBOL)
+            results[1] = ConnectionError("timeout")
+        return results
+
+    monkeypatch.setattr(adapter, 'create_orders', fill_then_fail)
+    manager._create_tp_orders()
+
+    sold = attempts[0][0]
+    assert manager.position.size == size_before - sold
+    assert sum(attempts[1]) <= manager.position.size
+    assert attempts[1][0] < attempts[0][0]
+    assert all(order.is_open for order in manager.position.tp_orders)
+
+
+def test_dca_retry_buys_only_remaining_level(adapter, monkeypatch):
+    manager = OrderManager(adapter, dict(CONFIG))
+    manager._prepare_start()
+    step_until(manager, CycleStage.WAITING_MARKET)
+    create_orders = adapter.create_orders
+    attempts = []
+
+    def fill_then_fail(requests):
+        attempts.append([request.quantity for request in requests])
+        results = create_orders(requests)
+        if len(attempts) == 1:
+            adapter.emulator.set_price(SYMBOL, requests[0].price, volume=requests[0].quantity / 2)
+            adapter.cancel_order(results[1]['id'], SYMBOL)
+            results[1] = ConnectionError("timeout")
+            adapter.emulator.set_price(SYMBOL, Decimal('100'))
+        return results
+
+    monkeypatch.setattr(adapter, 'create_orders', fill_then_fail)
+    manager._create_dca_orders()
+
+    fixed = adapter.get_fixed_filters(SYMBOL)
+    remaining = attempts[0][0] - attempts[0][0] / 2
+    assert attempts[1][0] == from_fixed(fixed.round_quantity(to_fixed(remaining)))
+    assert attempts[1][1:] == attempts[0][1:]
+    open_dca = [order for order in manager.position.entry_orders if order.type == 'limit' and order.is_open]
+    assert len(open_dca) == len(attempts[1])
+    assert all(order.is_open or order.type == 'market' for order in manager.position.entry_orders)
+
+
+def test_tp_levels_below_min_notional_are_merged(adapter):
+    adapter.filters = SymbolFilterRegistry(defaults=dict(EMULATION_FILTERS, minNotional=Decimal('10')))
+    manager = OrderManager(adapter, dict(CONFIG, tp1_volume=10, tp2_volume=30, tp3_volume=60))
+    manager.position.size = Decimal('0.3')
+    manager.position.avg_price = Decimal('100')
+
+    levels = manager._tp_levels()
+
+    # 10% позиции (~3 USDT) переносится на второй уровень
+    assert [i for i, _ in levels] == [2, 3]
+    assert levels[0][1].quantity == Decimal('0.12')
+    assert sum(request.quantity for _, request in levels) == Decimal('0.3')
+
+
+def test_tp_tail_below_min_notional_joins_last_level(adapter):
+    adapter.filters = SymbolFilterRegistry(defaults=dict(EMULATION_FILTERS, minNotional=Decimal('10')))
+    manager = OrderManager(adapter, dict(CONFIG, tp1_volume=55, tp2_volume=35, tp3_volume=10))
+    manager.position.size = Decimal('0.3')
+    manager.position.avg_price = Decimal('100')
+
+    levels = manager._tp_levels()
+
+    assert [i for i, _ in levels] == [1, 2]
+    assert levels[-1][1].quantity == Decimal('0.135')
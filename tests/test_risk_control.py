@@ -0,0 +1,104 @@
+from decimal import Decimal
+
+import pytest
+
+from core.order_manager import CycleStage, OrderManager
+from core.risk_control import RiskCheckError, RiskEngine, RiskLimits
+from tests.conftest import CONFIG, SYMBOL, step_until
+
+
+def _engine(**limits) -> RiskEngine:
+    engine = RiskEngine(RiskLimits(**limits))
+    engine.update_price(SYMBOL, Decimal('100'))
+    return engine
+
+
+def test_price_band_rejects_far_limit():
+    engine = _engine(price_band_percent=Decimal('10'))
+
+    engine.check_order(SYMBOL, 'sell', 'limit', Decimal('1'), Decimal('109'))
+    with pytest.raises(RiskCheckError, match='отклоняется'):
+        engine.check_order(SYMBOL, 'sell', 'limit', Decimal('1'), Decimal('111'))
+
+
+def test_default_limits_accept_deep_dca_ladder():
+    engine = RiskEngine(RiskLimits.from_settings({'dca_count': 10, 'dca_step_percent': 5}))
+    engine.update_price(SYMBOL, Decimal('100'))
+
+    assert engine.limits.price_band_percent is None
+    engine.check_order(SYMBOL, 'buy', 'limit', Decimal('1'), Decimal('50'))
+
+
+def test_symbol_notional_counts_whole_batch():
+    engine = _engine(max_symbol_notional=Decimal('500'))
+    engine.update_exposure(SYMBOL, Decimal('200'))
+
+    engine.check_orders(SYMBOL, [('buy', 'limit', Decimal('1'), Decimal('95')),
+                                 ('buy', 'limit', Decimal('2'), Decimal('90'))])
+    with pytest.raises(RiskCheckError, match='экспозиция'):
+        engine.check_orders(SYMBOL, [('buy', 'limit', Decimal('2'), Decimal('95')),
+                                     ('buy', 'limit', Decimal('2'), Decimal('90'))])
+
+
+def test_market_buy_priced_by_last_trade():
+    engine = _engine(max_symbol_notional=Decimal('250'))
+
+    engine.check_order(SYMBOL, 'buy', 'market', Decimal('2'))
+    with pytest.raises(RiskCheckError):
+        engine.check_order(SYMBOL, 'buy', 'market', Decimal('3'))
+    with pytest.raises(RiskCheckError, match='нет цены'):
+        engine.check_order('ETHUSDT', 'buy', 'market', Decimal('1'))
+
+
+def test_portfolio_exposure_and_open_cycles():
+    engine = _engine(max_portfolio_exposure=Decimal('1000'), max_open_cycles=1)
+    engine.update_price('ETHUSDT', Decimal('10'))
+    engine.update_exposure('ETHUSDT', Decimal('900'))
+
+    with pytest.raises(RiskCheckError, match='Суммарная'):
+        engine.check_order(SYMBOL, 'buy', 'market', Decimal('2'))
+
+    engine.update_exposure('ETHUSDT', Decimal('100'))
+    with pytest.raises(RiskCheckError, match='циклов'):
+        engine.check_order(SYMBOL, 'buy', 'market', Decimal('1'))
+    # Докупка по уже открытому циклу лимитом циклов не ограничена
+    engine.check_order('ETHUSDT', 'buy', 'market', Decimal('1'))
+
+
+def test_daily_loss_blocks_buys_only():
+    engine = RiskEngine(RiskLimits(daily_loss_limit=Decimal('50')), pnl_source=lambda: -50.0)
+    engine.update_price(SYMBOL, Decimal('100'))
+
+    with pytest.raises(RiskCheckError, match='Дневной убыток'):
+        engine.check_order(SYMBOL, 'buy', 'market', Decimal('0.1'))
+    engine.check_order(SYMBOL, 'sell', 'limit', Decimal('1'), Decimal('101'))
+
+
+def test_kill_switch_stops_managers_and_cancels_orders(adapter):
+    engine = RiskEngine()
+    manager = OrderManager(adapter, dict(CONFIG))
+    manager.attach_risk_engine(engine)
+    manager._prepare_start()
+    step_until(manager, CycleStage.MONITORING)
+    assert adapter.get_open_orders(SYMBOL)
+
+    engine.kill_switch('тест')
+
+    assert manager.step() is None
+    assert adapter.get_open_orders(SYMBOL) == []
+    with pytest.raises(RiskCheckError, match='kill-switch'):
+        engine.check_order(SYMBOL, 'sell', 'limit', Decimal('1'), Decimal('101'))
+    engine.reset_kill_switch()
+    engine.check_order(SYMBOL, 'sell', 'limit', Decimal('1'), Decimal('101'))
+
+
+def test_rejected_entry_places_no_orders(adapter):
+    manager = OrderManager(adapter, dict(CONFIG))
+    manager.attach_risk_engine(_engine(max_symbol_notional=Decimal('1')))
+    manager._prepare_start()
+
+    manager.step()
+
+    assert manager.position.entry_orders == []
+    assert adapter.get_open_orders(SYMBOL) == []
+    assert manager.position.size == 0
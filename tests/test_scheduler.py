@@ -0,0 +1,49 @@
+import threading
+import time
+
+from core.order_manager import CycleStage, OrderManager
+from core.scheduler import CycleScheduler
+from tests.conftest import CONFIG
+
+
+def _wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("Условие не выполнено за отведенное время")
+
+
+def test_stale_step_does_not_finish_restarted_manager(adapter):
+    manager = OrderManager(adapter, dict(CONFIG))
+    release = threading.Event()
+    steps = []
+
+    def step():
+        steps.append(manager.current_stage)
+        if len(steps) == 1:
+            # Первый шаг висит на бирже, пока менеджер останавливают и запускают снова,
+            # и завершается как остановленный
+            release.wait(5)
+            return None
+        return 60 if manager._running else None
+
+    manager.step = step
+    scheduler = CycleScheduler(workers=2)
+    scheduler.start()
+    try:
+        scheduler.add(manager)
+        _wait_for(lambda: len(steps) == 1)
+        manager.stop()
+        scheduler.add(manager)
+        release.set()
+
+        # Новый запуск продолжается: шаг прежнего не завершил его
+        _wait_for(lambda: len(steps) == 2)
+        assert manager.is_running()
+        assert manager.current_stage == CycleStage.IDLE
+        assert scheduler.managers() == [manager]
+    finally:
+        scheduler.stop()
+    assert not manager.is_running()
@@ -0,0 +1,108 @@
+import json
+import time
+from urllib.request import Request, urlopen
+
+import pytest
+
+from core.service import TradingService
+from exchange.binance_adapter import BinanceAdapter
+from infra.control_api import ControlServer
+from tests.conftest import CONFIG
+
+
+@pytest.fixture
+def streams(adapter, monkeypatch):
+    """Вызовы запуска потоков рыночных данных адаптера"""
+    calls = {'market': [], 'depth': [], 'closed': 0}
+    monkeypatch.setattr(adapter, 'start_market_data', lambda symbols: calls['market'].append(list(symbols)))
+    monkeypatch.setattr(adapter, 'start_depth_stream', lambda symbols: calls['depth'].append(list(symbols)))
+    close = adapter.close
+
+    def closed():
+        calls['closed'] += 1
+        close()
+
+    monkeypatch.setattr(adapter, 'close', closed)
+    return calls
+
+
+def test_open_starts_market_data_for_symbols(adapter, streams):
+    service = TradingService(adapter, CONFIG, ['BTCUSDT', 'ethusdt'])
+
+    service.open()
+    service.start('SOLUSDT')
+    service.close()
+
+    assert streams['market'] == [['BTCUSDT', 'ETHUSDT'], ['SOLUSDT']]
+    # Поток стакана перезапускается на полный список символов
+    assert streams['depth'] == [['BTCUSDT', 'ETHUSDT'], ['BTCUSDT', 'ETHUSDT', 'SOLUSDT']]
+    assert streams['closed'] == 1
+
+
+def test_symbols_before_open_are_subscribed_once(adapter, streams):
+    service = TradingService(adapter, CONFIG)
+    service.start('BTCUSDT')
+    assert streams['market'] == []
+
+    service.open()
+    service.close()
+
+    assert streams['market'] == [['BTCUSDT']]
+    assert streams['depth'] == [['BTCUSDT']]
+
+
+def _call(control: ControlServer, method: str, path: str) -> dict:
+    request = Request(f"http://{control.host}:{control.port}{path}", method=method)
+    with urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def test_headless_emulation_runs_cycle_from_ticker(stub_server):
+    pytest.importorskip('aiohttp')
+    stub_server.default = (200, {}, {'symbol': 'BTCUSDT', 'price': '100.00'})
+    adapter = BinanceAdapter('EMULATION', base_url=stub_server.url, feed_interval=0.05)
+    service = TradingService(adapter, CONFIG, ['BTCUSDT'])
+    control = ControlServer(service, port=0)
+    service.open()
+    control.start()
+    try:
+        assert _call(control, 'POST', '/start?symbol=BTCUSDT')['symbols'] == ['BTCUSDT']
+
+        deadline = time.monotonic() + 10
+        while _call(control, 'GET', '/positions')['BTCUSDT']['stage'] != 'monitoring':
+            assert time.monotonic() < deadline, "Цикл не дошел до мониторинга TP"
+            time.sleep(0.05)
+
+        position = _call(control, 'GET', '/positions')['BTCUSDT']
+        assert float(position['size']) > 0
+        assert any(order['side'] == 'sell' for order in position['open_orders'])
+        assert set(stub_server.paths()) == {'/api/v3/ticker/price'}
+    finally:
+        control.stop()
+        service.close()
+
+
+def test_kill_switch_through_control_api(adapter, streams):
+    service = TradingService(adapter, CONFIG, ['BTCUSDT'])
+    control = ControlServer(service, port=0)
+    service.open()
+    control.start()
+    try:
+        _call(control, 'POST', '/start')
+        deadline = time.monotonic() + 10
+        while service.managers['BTCUSDT'].get_current_stage() != 'monitoring':
+            assert time.monotonic() < deadline, "Цикл не дошел до мониторинга TP"
+            time.sleep(0.05)
+
+        assert _call(control, 'POST', '/kill?reason=test')['symbols'] == ['BTCUSDT']
+
+        assert not service.is_running()
+        assert adapter.get_open_orders('BTCUSDT') == []
+        assert _call(control, 'GET', '/status')['risk'] == {'killed': True, 'reason': 'test'}
+        assert _call(control, 'POST', '/start')['symbols'] == []
+
+        _call(control, 'POST', '/reset_kill')
+        assert _call(control, 'POST', '/start')['symbols'] == ['BTCUSDT']
+    finally:
+        control.stop()
+        service.close()
@@ -0,0 +1,130 @@
+import threading
+
+import pytest
+
+from core.order_manager import CycleStage, OrderManager, OrderStatus
+from infra.state import StateStore
+from tests.conftest import CONFIG, SYMBOL, step_until
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = StateStore(tmp_path / 'state.db')
+    yield store
+    store.close()
+
+
+def _run_to_monitoring(manager: OrderManager):
+    manager._prepare_start()
+    step_until(manager, CycleStage.MONITORING)
+
+
+def test_load_returns_events_after_snapshot(store):
+    store.record(SYMBOL, 'stage', {'stage': 'idle'})
+    store.snapshot(SYMBOL, {'stage': 'monitoring'})
+    store.record(SYMBOL, 'position', {'size': '1', 'avg_price': '100'})
+    store.record('ETHUSDT', 'stage', {'stage': 'idle'})
+    assert store.flush()
+
+    snapshot, events = store.load(SYMBOL)
+
+    assert snapshot == {'stage': 'monitoring'}
+    assert events == [('position', {'size': '1', 'avg_price': '100'})]
+    assert store.symbols() == ['BTCUSDT', 'ETHUSDT']
+
+
+def test_snapshot_compacts_journal(store):
+    store.snapshot_every = 3
+    for i in range(3):
+        store.record(SYMBOL, 'stage', {'stage': str(i)})
+    assert store.needs_snapshot(SYMBOL)
+
+    store.snapshot(SYMBOL, {'stage': '2'})
+    assert store.flush()
+
+    assert not store.needs_snapshot(SYMBOL)
+    assert store.load(SYMBOL) == ({'stage': '2'}, [])
+
+
+def test_recovery_replays_journal_without_snapshot(adapter, store):
+    manager = OrderManager(adapter, dict(CONFIG))
+    manager.attach_state_store(store)
+    _run_to_monitoring(manager)
+    assert store.flush()
+
+    # Процесс упал до снимка: состояние восстанавливается только из журнала
+    restored = OrderManager(adapter, dict(CONFIG))
+    restored.attach_state_store(store)
+
+    assert restored.recover_state()
+    assert restored.current_stage == CycleStage.MONITORING
+    assert restored.position.size == manager.position.size
+    assert restored.position.avg_price == manager.position.avg_price
+    assert [o.id for o in restored.position.tp_orders] == [o.id for o in manager.position.tp_orders]
+    assert [o.id for o in restored.position.entry_orders] == [o.id for o in manager.position.entry_orders]
+
+
+def test_recovery_reconciles_fills_missed_while_down(adapter, store):
+    manager = OrderManager(adapter, dict(CONFIG))
+    manager.attach_state_store(store)
+    _run_to_monitoring(manager)
+    manager.save_snapshot()
+    assert store.flush()
+    tp = manager.position.tp_orders[0]
+
+    # Пока бота нет, первый TP исполняется на бирже
+    adapter.emulator.set_price(SYMBOL, tp.price, volume=tp.amount)
+
+    restored = OrderManager(adapter, dict(CONFIG))
+    restored.attach_state_store(store)
+    assert restored.recover_state()
+
+    order = next(o for o in restored.position.tp_orders if o.id == tp.id)
+    assert order.status == OrderStatus.FILLED
+    assert restored.position.size == manager.position.size - tp.amount
+
+    # Сверка записана в журнал: повторное восстановление видит то же состояние
+    assert store.flush()
+    again = OrderManager(adapter, dict(CONFIG))
+    again.attach_state_store(store)
+    assert again.recover_state()
+    assert again.position.size == restored.position.size
+
+
+def test_recovery_without_state_returns_false(adapter, store):
+    manager = OrderManager(adapter, dict(CONFIG))
+    manager.attach_state_store(store)
+
+    assert not manager.recover_state()
+    assert manager.current_stage == CycleStage.IDLE
+
+
+def test_event_during_snapshot_is_not_lost(adapter, store, monkeypatch):
+    manager = OrderManager(adapter, dict(CONFIG))
+    manager.attach_state_store(store)
+    _run_to_monitoring(manager)
+    tp = manager.position.tp_orders[0]
+    event = {'e': 'executionReport', 's': SYMBOL, 'i': tp.id, 'X': 'PARTIALLY_FILLED',
+             'z': str(tp.amount / 2), 'Z': str(tp.amount / 2 * tp.price)}
+    capture = manager._snapshot_state
+    streams = []
+
+    def capture_then_fill():
+        state = capture()
+        # Исполнение из потока приходит сразу после снятия состояния
+        stream = threading.Thread(target=manager._on_user_event, args=(event,))
+        stream.start()
+        stream.join(0.2)
+        streams.append(stream)
+        return state
+
+    monkeypatch.setattr(manager, '_snapshot_state', capture_then_fill)
+    manager.save_snapshot()
+    streams[0].join()
+    assert store.flush()
+
+    restored = OrderManager(adapter, dict(CONFIG))
+    restored.attach_state_store(store)
+    assert restored.recover_state()
+    assert restored.position.size == manager.position.size
+    assert next(o for o in restored.position.tp_orders if o.id == tp.id).filled_amount == tp.amount / 2
@@ -0,0 +1,98 @@
+from decimal import Decimal
+
+import pytest
+
+from core.order_manager import CycleStage, OrderManager
+from infra.stats import StatsEngine
+from tests.conftest import CONFIG, SYMBOL
+
+DAY = 1_700_000_000.0
+
+
+def _trade_cycle(stats: StatsEngine, symbol: str, start: float, buy: float, sell: float):
+    stats.on_fill(symbol, 'buy', 1, buy, 0.1, timestamp=start)
+    stats.on_fill(symbol, 'sell', 1, sell, 0.1, timestamp=start + 60)
+    stats.on_cycle_complete(symbol, timestamp=start + 60)
+
+
+def test_aggregates_rebuilt_from_history(tmp_path):
+    stats = StatsEngine(capital=1000, history_path=tmp_path)
+    _trade_cycle(stats, 'BTCUSDT', DAY, 100, 110)
+    _trade_cycle(stats, 'ETHUSDT', DAY + 120, 100, 90)
+    # Открытый цикл на момент остановки
+    stats.on_fill('BTCUSDT', 'buy', 2, 50, 0.1, timestamp=DAY + 300)
+    expected = stats.summary()
+    stats.close()
+
+    restored = StatsEngine(capital=1000, history_path=tmp_path)
+
+    assert restored.summary() == pytest.approx(expected)
+    assert restored.cycle_pnl('BTCUSDT') == pytest.approx(-0.1)
+    assert restored.invested == pytest.approx(100)
+    # Восстановление не дописывает историю повторно
+    assert len(restored.trades) == 5
+    assert len(restored.cycles) == 2
+
+    # Продажа после перезапуска закрывает цикл, начатый до него
+    restored.on_fill('BTCUSDT', 'sell', 2, 60, 0.1, timestamp=DAY + 400)
+    restored.on_cycle_complete('BTCUSDT', timestamp=DAY + 400)
+    assert restored.cycles_count == 3
+    assert restored.last_cycle_pnl == pytest.approx(19.8)
+    restored.close()
+
+
+def test_engine_without_history_starts_empty(tmp_path):
+    stats = StatsEngine(capital=1000, history_path=tmp_path)
+
+    assert stats.trades_count == 0
+    assert stats.summary()['total_pnl'] == 0
+    stats.close()
+
+
+def test_leftover_position_carries_into_next_cycle(tmp_path):
+    stats = StatsEngine(capital=1000, history_path=tmp_path)
+    # Последний TP продал 99%: остаток позиции не мешает закрыть цикл
+    stats.on_fill('BTCUSDT', 'buy', 1, 100, 0, timestamp=DAY)
+    stats.on_fill('BTCUSDT', 'sell', 0.99, 110, 0, timestamp=DAY + 60)
+    stats.on_cycle_complete('BTCUSDT', timestamp=DAY + 60)
+
+    assert (stats.cycles_count, stats.wins) == (1, 1)
+    assert stats.last_cycle_pnl == pytest.approx(9.9)
+    assert stats.invested == pytest.approx(1)
+
+    # Следующий цикл считает PnL заново, продажа остатка идет по его цене
+    stats.on_fill('BTCUSDT', 'buy', 1, 100, 0, timestamp=DAY + 120)
+    stats.on_fill('BTCUSDT', 'sell', 1.01, 90, 0, timestamp=DAY + 180)
+    assert stats.cycle_pnl('BTCUSDT') == pytest.approx(-10.1)
+    stats.on_cycle_complete('BTCUSDT', timestamp=DAY + 180)
+    expected = stats.summary()
+    stats.close()
+
+    restored = StatsEngine(capital=1000, history_path=tmp_path)
+    assert restored.summary() == pytest.approx(expected)
+    assert restored.cycles_count == 2
+    assert restored.last_cycle_pnl == pytest.approx(-10.1)
+    restored.close()
+
+
+def test_order_manager_cycle_closes_stats_cycle(adapter):
+    stats = StatsEngine(capital=10000)
+    manager = OrderManager(adapter, dict(CONFIG))
+    manager.on_fill = stats.on_fill
+    manager.on_cycle_complete = stats.on_cycle_complete
+    manager._prepare_start()
+
+    for _ in range(50):
+        if manager.current_stage == CycleStage.MONITORING:
+            # Цена выше всех TP: лестница исполняется целиком
+            adapter.emulator.set_price(SYMBOL, Decimal('200'))
+        if manager.current_stage == CycleStage.CYCLE_WAIT:
+            break
+        manager.step()
+
+    assert manager.current_stage == CycleStage.CYCLE_WAIT
+    summary = stats.summary()
+    assert summary['cycles'] == 1
+    assert summary['win_rate'] == 1
+    assert summary['last_cycle_pnl'] > 0
+    assert stats.cycle_pnl(SYMBOL) == summary['last_cycle_pnl']
@@ -0,0 +1,86 @@
+import pytest
+
+from infra.telegram_notify import TelegramNotifier
+
+CHAT_ID = 42
+
+
+@pytest.fixture
+def notifier(stub_server):
+    stub_server.default = (200, {}, {'ok': True})
+    notifier = TelegramNotifier('test-token', CHAT_ID, base_url=stub_server.url)
+    notifier.COALESCE_WINDOW = 0.2
+    notifier.CHAT_INTERVAL = 0
+    yield notifier
+    notifier.close()
+
+
+def _bodies(stub_server):
+    return [request[5] for request in stub_server.requests]
+
+
+def test_messages_in_window_are_coalesced(notifier, stub_server):
+    notifier.send("Покупка BTCUSDT", silent=True)
+    notifier.send("Продажа BTCUSDT", silent=True)
+    notifier.send("Другой чат", chat_id=7)
+
+    assert notifier.flush()
+
+    bodies = sorted(_bodies(stub_server), key=lambda body: body['chat_id'])
+    assert [body['chat_id'] for body in bodies] == [7, CHAT_ID]
+    assert bodies[1]['text'] == "Покупка BTCUSDT\nПродажа BTCUSDT"
+    assert bodies[1]['disable_notification'] is True
+    assert stub_server.paths() == ['/bottest-token/sendMessage'] * 2
+    assert notifier.sent == 2
+
+
+def test_429_waits_retry_after(notifier, stub_server):
+    stub_server.reply(429, {'ok': False, 'parameters': {'retry_after': 1}})
+
+    notifier.send("сообщение")
+    assert notifier.flush()
+
+    first, second = stub_server.requests
+    assert second[0] - first[0] >= 0.9
+    assert (notifier.sent, notifier.failed) == (1, 0)
+
+
+def test_5xx_retried_with_growing_backoff(notifier, stub_server):
+    stub_server.reply(500, {'ok': False})
+    stub_server.reply(502, {'ok': False})
+
+    notifier.send("сообщение")
+    assert notifier.flush()
+
+    first, second, third = (request[0] for request in stub_server.requests)
+    assert second - first >= 0.9
+    assert third - second >= 1.9
+    assert notifier.sent == 1
+
+
+def test_client_error_is_not_retried(notifier, stub_server):
+    stub_server.reply(400, {'ok': False, 'description': 'chat not found'})
+
+    notifier.send("сообщение")
+    assert notifier.flush()
+
+    assert len(stub_server.requests) == 1
+    assert (notifier.sent, notifier.failed) == (0, 1)
+
+
+def test_long_batch_split_by_lines(notifier, stub_server):
+    notifier.MAX_MESSAGE_LENGTH = 20
+    for i in range(4):
+        notifier.send(f"строка {i:02d} ....")
+
+    assert notifier.flush()
+
+    texts = [body['text'] for body in _bodies(stub_server)]
+    assert all(len(text) <= 20 for text in texts)
+    assert '\n'.join(texts).split('\n') == [f"строка {i:02d} ...." for i in range(4)]
+
+
+def test_send_after_close_is_rejected(notifier):
+    notifier.close()
+
+    assert not notifier.send("поздно")
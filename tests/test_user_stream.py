@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+import pytest
+
+from core.order_manager import CycleStage, Order, OrderManager, OrderStatus
+from exchange.user_stream import BaseUserStream, LocalUserStream
+from tests.conftest import CONFIG, SYMBOL, step_until
+
+
+def _no_rest(*args, **kwargs):
+    raise AssertionError("при подключенном потоке REST-опрос ордеров не нужен")
+
+
+@pytest.fixture
+def manager(adapter):
+    manager = OrderManager(adapter, dict(CONFIG))
+    stream = adapter.create_user_stream()
+    stream.start()
+    manager.attach_user_stream(stream)
+    manager._prepare_start()
+    step_until(manager, CycleStage.MONITORING)
+    return manager
+
+
+def test_base_stream_is_abstract():
+    with pytest.raises(TypeError):
+        BaseUserStream()
+
+
+def test_stream_fill_updates_position_without_rest(adapter, manager, monkeypatch):
+    monkeypatch.setattr(adapter, 'get_open_orders', _no_rest)
+    monkeypatch.setattr(adapter, 'get_order_info', _no_rest)
+    size_before = manager.position.size
+    dca = min((o for o in manager.position.entry_orders if o.type == 'limit'), key=lambda o: -o.price)
+
+    adapter.emulator.set_price(SYMBOL, dca.price)
+    manager.step()
+
+    assert dca.status == OrderStatus.FILLED
+    assert dca.filled_amount == dca.amount
+    assert manager.position.size == size_before + dca.amount
+    assert manager.position.avg_price < Decimal('100')
+
+
+def test_event_before_ack_is_applied_on_registration(adapter):
+    manager = OrderManager(adapter, dict(CONFIG))
+    stream = LocalUserStream()
+    stream.start()
+    manager.attach_user_stream(stream)
+    stream.emit({'e': 'executionReport', 's': SYMBOL, 'i': 42, 'X': 'FILLED', 'z': '0.5', 'Z': '50'})
+    assert manager.position.size == 0
+
+    order = Order(id='42', symbol=SYMBOL, side='buy', type='limit', amount=Decimal('0.5'), price=Decimal('100'))
+    manager._register_order(order, manager.position.entry_orders,
+                            {'status': 'NEW', 'filled_qty': Decimal('0'), 'price': Decimal('100')})
+
+    assert order.status == OrderStatus.FILLED
+    assert manager.position.size == Decimal('0.5')
+    assert manager.position.avg_price == Decimal('100')
+
+
+def test_reconnect_reconciles_missed_fills(adapter, manager):
+    stream = manager.user_stream
+    tp = manager.position.tp_orders[0]
+    size_before = manager.position.size
+
+    # Исполнение во время обрыва потока не доходит до менеджера
+    stream.stop()
+    adapter.emulator.set_price(SYMBOL, tp.price)
+    assert tp.status == OrderStatus.PENDING
+
+    stream.reconnect()
+
+    assert tp.status == OrderStatus.FILLED
+    assert manager.position.size == size_before - tp.amount
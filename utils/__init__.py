@@ -1,3 +1,3 @@
-from .calculator import calculate_order_amounts
+from .calculator import calculate_order_amounts, plan_ladder, plan_ladder_batch, split_deposit
 
-__all__ = ['calculate_order_amounts']
\ No newline at end of file
+__all__ = ['calculate_order_amounts', 'plan_ladder', 'plan_ladder_batch', 'split_deposit']
\ No newline at end of file
@@ -1,4 +1,42 @@
+from dataclasses import dataclass
 from decimal import Decimal
+from functools import lru_cache
+from typing import List, Tuple
+
+from .fixed_point import FixedFilters, as_decimal, from_fixed, to_fixed
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_COMMISSION_RATE = Decimal('0.0015')  # 0.15% (0.11% + запас)
+
+
+@lru_cache(maxsize=256)
+def share_weights(dca_count: int, martingale_multiplier: Decimal) -> Tuple[Decimal, ...]:
+    """
+    Веса долей входа (сумма = 1): основной ордер и dca_count усреднений,
+    каждая следующая доля в martingale_multiplier раз больше предыдущей.
+    Кэшируется по (dca_count, martingale_multiplier) - набор настроек в работе невелик.
+    """
+    if dca_count < 0:
+        raise ValueError(f"Некорректное число DCA: {dca_count}")
+    if martingale_multiplier <= 0:
+        raise ValueError(f"Некорректный коэффициент мартингейла: {martingale_multiplier}")
+    powers = [Decimal('1')]
+    for _ in range(dca_count):
+        powers.append(powers[-1] * martingale_multiplier)
+    total = sum(powers)
+    return tuple(power / total for power in powers)
+
+
+def split_deposit(total_quote, dca_count: int, martingale_multiplier,
+                  commission_rate=DEFAULT_COMMISSION_RATE) -> List[Decimal]:
+    """Доли депозита [main, dca1, dca2, ...] за вычетом комиссии"""
+    available = as_decimal(total_quote) * (Decimal('1') - as_decimal(commission_rate))
+    return [available * weight for weight in share_weights(int(dca_count), as_decimal(martingale_multiplier))]
+
 
 def calculate_order_amounts(total_quote, dca_count, martingale_multiplier, commission_rate=Decimal('0.0015')):
     """
@@ -7,13 +45,117 @@ def calculate_order_amounts(total_quote, dca_count, martingale_multiplier, commi
     Возвращает список сумм для каждого ордера: [main, dca1, dca2, ...]
     Все суммы уже уменьшены на комиссию.
     """
-    if dca_count < 1:
-        return [total_quote * (Decimal('1') - commission_rate)]
-    amounts = []
-    coef_sum = sum(martingale_multiplier ** i for i in range(dca_count + 1))
-    base_amount = total_quote / coef_sum
-    for i in range(dca_count + 1):
-        amt = base_amount * (martingale_multiplier ** i)
-        amt = amt * (Decimal('1') - commission_rate)
-        amounts.append(amt)
-    return amounts
\ No newline at end of file
+    return split_deposit(total_quote, max(int(dca_count), 0), martingale_multiplier, commission_rate)
+
+
+@dataclass
+class LadderLevel:
+    """Уровень лестницы входа: 0 - рыночный вход, 1..N - DCA"""
+    index: int
+    price: Decimal
+    quote_amount: Decimal
+    quantity: Decimal  # 0, если меньше minQty или стоимость ниже minNotional
+
+    @property
+    def valid(self) -> bool:
+        return self.quantity > 0
+
+
+@dataclass
+class LadderPlan:
+    """План цикла: доли, цены и количества всех ордеров входа"""
+    total_deposit: Decimal
+    base_price: Decimal
+    levels: List[LadderLevel]
+
+    @property
+    def shares(self) -> List[Decimal]:
+        return [level.quote_amount for level in self.levels]
+
+    @property
+    def entry(self) -> LadderLevel:
+        return self.levels[0]
+
+    @property
+    def dca(self) -> List[LadderLevel]:
+        return self.levels[1:]
+
+    def reprice_entry(self, price, filters: FixedFilters, commission_rate=DEFAULT_COMMISSION_RATE):
+        """Пересчет количества входа по ожидаемой цене исполнения (например, VWAP по стакану)"""
+        entry = self.entry
+        entry.price = as_decimal(price)
+        entry.quantity = _level_quantity(entry.quote_amount, entry.price, filters,
+                                         Decimal('1') - as_decimal(commission_rate))
+
+
+def _level_quantity(quote_amount: Decimal, price: Decimal, filters: FixedFilters, net: Decimal) -> Decimal:
+    if price <= 0:
+        return Decimal('0')
+    units = filters.quantity_for(quote_amount * net, price)
+    if units and not filters.meets_notional(units, to_fixed(price)):
+        return Decimal('0')
+    return from_fixed(units)
+
+
+def plan_ladder(total_deposit, base_price, dca_count: int, martingale_multiplier, dca_step_percent,
+                filters: FixedFilters, commission_rate=DEFAULT_COMMISSION_RATE) -> LadderPlan:
+    """
+    Полный план лестницы на цикл: вход по base_price, цены DCA ниже на
+    dca_step_percent * i и округлены по тику; количества - доля за вычетом
+    комиссии по цене уровня, вниз до шага лота. Уровень дешевле minNotional
+    получает количество 0 и не выставляется.
+    """
+    total_deposit = as_decimal(total_deposit)
+    base_price = as_decimal(base_price)
+    commission_rate = as_decimal(commission_rate)
+    net = Decimal('1') - commission_rate
+    step = as_decimal(dca_step_percent) / Decimal('100')
+    shares = split_deposit(total_deposit, dca_count, martingale_multiplier, commission_rate)
+
+    levels = []
+    for i, share in enumerate(shares):
+        if i == 0:
+            price = base_price
+        else:
+            price_units = to_fixed(base_price * (Decimal('1') - step * i))
+            price = from_fixed(filters.round_price(price_units)) if price_units > 0 else Decimal('0')
+        levels.append(LadderLevel(i, price, share, _level_quantity(share, price, filters, net)))
+    return LadderPlan(total_deposit, base_price, levels)
+
+
+@lru_cache(maxsize=256)
+def share_weights_array(dca_count: int, martingale_multiplier: float):
+    """share_weights для float64 (бэктесты и перебор параметров); массив только для чтения"""
+    if np is None:
+        raise RuntimeError("Для пакетного расчета нужен numpy")
+    weights = float(martingale_multiplier) ** np.arange(dca_count + 1, dtype=np.float64)
+    weights /= weights.sum()
+    weights.setflags(write=False)
+    return weights
+
+
+def plan_ladder_batch(total_deposits, base_prices, dca_count: int, martingale_multiplier: float,
+                      dca_step_percent: float, step_size: float = 0.0, min_qty: float = 0.0,
+                      commission_rate: float = float(DEFAULT_COMMISSION_RATE)):
+    """
+    Векторный plan_ladder для массивов депозитов и цен (float64).
+    Возвращает три массива формы (n, dca_count + 1): суммы, цены, количества.
+    Количества округлены вниз до step_size, меньше min_qty - обнулены.
+    """
+    if np is None:
+        raise RuntimeError("Для пакетного расчета нужен numpy")
+    deposits = np.asarray(total_deposits, dtype=np.float64).reshape(-1, 1)
+    prices = np.asarray(base_prices, dtype=np.float64).reshape(-1, 1)
+    weights = share_weights_array(int(dca_count), float(martingale_multiplier))
+    offsets = 1 - dca_step_percent / 100 * np.arange(dca_count + 1, dtype=np.float64)
+
+    quote = deposits * (1 - commission_rate) * weights
+    level_prices = prices * offsets
+    with np.errstate(divide='ignore', invalid='ignore'):
+        quantities = np.where(level_prices > 0, quote * (1 - commission_rate) / level_prices, 0.0)
+    if step_size:
+        # Небольшой допуск, чтобы 0.3 / 0.1 не округлялось до 2 шагов
+        quantities = np.floor(quantities / step_size + 1e-9) * step_size
+    if min_qty:
+        quantities[quantities < min_qty] = 0.0
+    return quote, level_prices, quantities
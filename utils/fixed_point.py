@@ -0,0 +1,132 @@
+"""
+Целочисленная арифметика с фиксированной точкой для горячего пути.
+
+Количества и цены хранятся как int в единицах 1e-8 (как в ответах Binance,
+где все значения имеют не больше 8 знаков после точки). Шаг лота и тик цены
+в тех же единицах, поэтому округление по фильтрам - это целочисленный остаток
+от деления без Decimal и quantize. В строку значение переводится только на
+границе с API биржи.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional, Union
+
+SCALE_DIGITS = 8
+SCALE = 10 ** SCALE_DIGITS
+
+Number = Union[int, float, str, Decimal]
+
+
+def as_decimal(value: Number) -> Decimal:
+    """Decimal без лишней конвертации через str, если значение уже Decimal"""
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def to_fixed(value: Number) -> int:
+    """Значение -> int в единицах 1e-8; разряды мельче 1e-8 отбрасываются"""
+    if isinstance(value, Decimal):
+        return int(value * SCALE)
+    if isinstance(value, int):
+        return value * SCALE
+    if isinstance(value, float):
+        value = repr(value)
+    return _parse(value)
+
+
+def _parse(text: str) -> int:
+    """Разбор десятичной строки вида '-0.00100000' без Decimal"""
+    text = text.strip()
+    if 'e' in text or 'E' in text:
+        return int(Decimal(text) * SCALE)
+    negative = text.startswith('-')
+    if negative or text.startswith('+'):
+        text = text[1:]
+    whole, _, fraction = text.partition('.')
+    units = int(whole or '0') * SCALE + int((fraction + '00000000')[:SCALE_DIGITS])
+    return -units if negative else units
+
+
+def from_fixed(units: int) -> Decimal:
+    """int в единицах 1e-8 -> Decimal с 8 знаками"""
+    return Decimal(units).scaleb(-SCALE_DIGITS)
+
+
+def to_str(units: int) -> str:
+    """Строка для API биржи: '0.00100000'"""
+    if units < 0:
+        return '-' + to_str(-units)
+    whole, fraction = divmod(units, SCALE)
+    return f"{whole}.{fraction:08d}"
+
+
+def floor_to(units: int, step: int) -> int:
+    """Округление вниз до кратного step"""
+    return units - units % step if step else units
+
+
+def mul(a: int, b: int) -> int:
+    """Произведение двух значений с фиксированной точкой"""
+    return a * b // SCALE
+
+
+def div(a: int, b: int) -> int:
+    """Частное двух значений с фиксированной точкой"""
+    return a * SCALE // b
+
+
+@dataclass(frozen=True)
+class FixedFilters:
+    """Фильтры инструмента (LOT_SIZE, PRICE_FILTER, MIN_NOTIONAL) в единицах 1e-8"""
+    min_qty: int
+    max_qty: int
+    step: int
+    min_price: int
+    max_price: int
+    tick: int
+    min_notional: int
+    # Исходный словарь фильтров - по нему кэш понимает, что фильтры обновились
+    source: Optional[dict] = None
+
+    @classmethod
+    def from_filters(cls, filters: dict) -> 'FixedFilters':
+        return cls(
+            min_qty=to_fixed(filters['minQty']),
+            max_qty=to_fixed(filters['maxQty']),
+            step=to_fixed(filters['stepSize']),
+            min_price=to_fixed(filters.get('minPrice', '0.01')),
+            max_price=to_fixed(filters.get('maxPrice', '1000000')),
+            tick=to_fixed(filters.get('tickSize', '0.01')),
+            min_notional=to_fixed(filters.get('minNotional', '0')),
+            source=filters
+        )
+
+    def round_quantity(self, units: int) -> int:
+        """Количество вниз до шага лота; 0, если меньше minQty, maxQty - если больше"""
+        units = floor_to(units, self.step)
+        if units < self.min_qty:
+            return 0
+        if self.max_qty and units > self.max_qty:
+            return self.max_qty
+        return units
+
+    def round_price(self, units: int) -> int:
+        """Цена вниз до тика в пределах minPrice..maxPrice"""
+        units = floor_to(units, self.tick)
+        if units < self.min_price:
+            return self.min_price
+        if self.max_price and units > self.max_price:
+            return self.max_price
+        return units
+
+    def quantity_for(self, quote_amount: Number, price: Number) -> int:
+        """Количество монет на сумму quote_amount по цене price, округленное по шагу лота"""
+        price_units = to_fixed(price)
+        if price_units <= 0:
+            return 0
+        return self.round_quantity(div(to_fixed(quote_amount), price_units))
+
+    def meets_notional(self, quantity: int, price: int) -> bool:
+        """Стоимость ордера не ниже MIN_NOTIONAL"""
+        return mul(quantity, price) >= self.min_notional